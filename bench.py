@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench.py
+Мікробенчмарки і набір бенчмарків для parse_json_to_csv.py.
+
+Використання:
+  python bench.py namespace --rows 50000 --keys 500
+  python bench.py backends --files 300
+  python bench.py rowstore --files 3000
+  python bench.py walk --files 5000 --latency 1 [--corpus DIR]
+  python bench.py dispatch --files 2000
+  python bench.py stream --values 20000
+  python bench.py suite --files 2000 --depth 2 [--corpus DIR] [--save-baseline]
+
+suite пише звіт у bench_output.txt і порівнює його з bench_baseline.json (якщо є).
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+try:
+    import resource
+except ImportError:
+    # Windows: пікову пам'ять конвеєра не вимірюємо
+    resource = None
+
+import gen_ue_corpus
+import parse_json_to_csv as p
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "bench_output.txt")
+DEFAULT_BASELINE = os.path.join(HERE, "bench_baseline.json")
+HANDLERS = ("handle_dialog_line", "handle_property_node", "handle_user_defined_enum",
+            "handle_data_table", "handle_script_textconst")
+# Метрики, для яких більше — краще; решта — час (менше — краще)
+HIGHER_IS_BETTER = ("files_per_s", "rows_per_s")
+REGRESSION_THRESHOLD = 0.10
+
+
+def make_namespace_corpus(rows, keys, seed=1):
+    """Повертає (key_to_ns, final_keys): StringTable-ключі з вкладеними хвостами і ключі рядків,
+    з яких частина збігається через '.', '::' або ':', а частина — ні."""
+    rnd = random.Random(seed)
+    key_to_ns = {}
+    table_keys = []
+    for i in range(keys):
+        # частина ключів — хвости інших ("Name", "Item12.Tooltip" і "Menu.Item12.Tooltip"), щоб перевірити порядок першого збігу
+        k = rnd.choice([f"Item{i}.Name", f"Item{i}.Description", f"Menu.Item{i}.Tooltip", f"Item{i}.Tooltip", "Name", "Tooltip"])
+        if k not in key_to_ns:
+            key_to_ns[k] = rnd.choice(["ST_UI", "ST_Items", "ST_Menu"])
+            table_keys.append(k)
+    final_keys = []
+    for _ in range(rows):
+        c = rnd.random()
+        k = rnd.choice(table_keys)
+        if c < 0.2:
+            final_keys.append(k)
+        elif c < 0.4:
+            final_keys.append(f"Table.{k}")
+        elif c < 0.55:
+            final_keys.append(f"Table::{k}")
+        elif c < 0.6:
+            final_keys.append(f"Table:{k}")
+        else:
+            final_keys.append("".join(rnd.choice("0123456789ABCDEF") for _ in range(32)))
+    return key_to_ns, final_keys
+
+
+def bench_namespace(rows, keys, seed=1):
+    key_to_ns, final_keys = make_namespace_corpus(rows, keys, seed)
+
+    t0 = time.perf_counter()
+    st_index = p.build_stringtable_index(key_to_ns)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indexed = [p.match_stringtable_namespace_indexed(k, st_index) for k in final_keys]
+    t_indexed = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    linear = [p.match_stringtable_namespace_for_key(k, key_to_ns) for k in final_keys]
+    t_linear = time.perf_counter() - t0
+
+    if indexed != linear:
+        bad = next(i for i, (a, b) in enumerate(zip(indexed, linear)) if a != b)
+        print(f"ERROR: результати різняться для ключа {final_keys[bad]!r}: {indexed[bad]} != {linear[bad]}", file=sys.stderr)
+        return 1
+    matched = sum(1 for ns, _ in indexed if ns)
+    print(f"namespace: рядків {len(final_keys)}, ключів StringTable {len(key_to_ns)}, збігів {matched}")
+    print(f"  лінійний перебір: {t_linear:.3f} с")
+    print(f"  індекс:           {t_indexed:.3f} с (+ побудова {t_build:.4f} с)")
+    print(f"  прискорення:      x{t_linear / max(t_indexed + t_build, 1e-9):.1f}")
+    return 0
+
+
+def bench_backends(files, seed=1):
+    """Розбір одного корпусу кожним встановленим JSON-бекендом: результати мусять збігатися з stdlib."""
+    backends = ["stdlib"] + [b for b in ("orjson", "simdjson") if getattr(p, b) is not None]
+    with tempfile.TemporaryDirectory() as tmp:
+        root = gen_ue_corpus.write_corpus(tmp, files, seed, mesh_size=50)
+        reference = None
+        for backend in backends:
+            t0 = time.perf_counter()
+            files_by_root, results, key_to_ns = p.scan_roots([root], prefilter=False, json_backend=backend)
+            elapsed = time.perf_counter() - t0
+            rows = sum(len(r[1]) for r in results.values())
+            if reference is None:
+                reference = (results, key_to_ns)
+            elif (results, key_to_ns) != reference:
+                bad = next(path for path in results if results[path] != reference[0][path])
+                print(f"ERROR: бекенд {backend} дав інший результат для {bad}", file=sys.stderr)
+                return 1
+            print(f"  {backend:<9} {elapsed:.3f} с, файлів {len(results)}, кандидатів {rows}")
+    print(f"backends: результати {', '.join(backends)} однакові")
+    return 0
+
+
+def traced_size(build):
+    """(результат build(), МБ, які він займає в пам'яті)."""
+    tracemalloc.start()
+    try:
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_rowstore(files, seed=1):
+    """Пам'ять рядків: списки з CSV (як раніше в compare_csv_keys) проти RowStore; вміст мусить збігатися."""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = gen_ue_corpus.write_corpus(os.path.join(tmp, "corpus"), files, seed, rows=20, mesh_size=5)
+        csv_path = os.path.join(tmp, "rows.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(p.CSV_HEADER)
+            writer.writerows(row[:4] for row in p.iter_rows(root, json_backend="stdlib"))
+
+        def read_lists():
+            with open(csv_path, encoding="utf-8", newline="") as f:
+                reader = csv.reader(f)
+                next(reader)
+                return [(row[0].strip(), row) for row in reader]
+
+        def read_store():
+            store = p.RowStore()
+            with open(csv_path, encoding="utf-8", newline="") as f:
+                reader = csv.reader(f)
+                next(reader)
+                for row in reader:
+                    store.append_values(row)
+            return store
+
+        entries, lists_mb = traced_size(read_lists)
+        t0 = time.perf_counter()
+        store, store_mb = traced_size(read_store)
+        elapsed = time.perf_counter() - t0
+    if any(store.values(i) != row for i, (_, row) in enumerate(entries)):
+        print("ERROR: RowStore повернув інші рядки, ніж CSV", file=sys.stderr)
+        return 1
+    print(f"rowstore: рядків {len(store)}")
+    print(f"  списки:   {lists_mb:.1f} МБ")
+    print(f"  RowStore: {store_mb:.1f} МБ ({elapsed:.2f} с з tracemalloc), у x{lists_mb / max(store_mb, 1e-9):.1f} менше")
+    return 0
+
+
+def bench_walk(files, seed=1, latency_ms=0.0, threads=p.WALK_THREADS, corpus=None):
+    """
+    Обхід тек: os.walk + stat кожного файлу (як раніше) проти маніфесту (пул потоків os.scandir) і
+    повторного запуску зі збереженим маніфестом. latency_ms додає затримку до кожного os.scandir/os.stat,
+    імітуючи мережевий диск. Списки файлів і stat мусять збігатися.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        root = corpus or gen_ue_corpus.write_corpus(os.path.join(tmp, "corpus"), files, seed, depth=0, mesh_size=5)
+        real_scandir, real_stat = os.scandir, os.stat
+        if latency_ms > 0:
+            delay = latency_ms / 1000.0
+
+            def slow_scandir(*args, **kwargs):
+                time.sleep(delay)
+                return real_scandir(*args, **kwargs)
+
+            def slow_stat(*args, **kwargs):
+                time.sleep(delay)
+                return real_stat(*args, **kwargs)
+
+            os.scandir, os.stat = slow_scandir, slow_stat
+        try:
+            t0 = time.perf_counter()
+            paths = list(p.iter_json_files(root))
+            old_stats = {path: p.stat_pair(path) for path in paths}
+            walk_time = time.perf_counter() - t0
+            timings = {}
+            for n in sorted({1, threads}):
+                t0 = time.perf_counter()
+                manifest = p.build_manifest([root], n)
+                timings[n] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            reused = p.build_manifest([root], threads, previous=manifest)
+            reuse_time = time.perf_counter() - t0
+        finally:
+            os.scandir, os.stat = real_scandir, real_stat
+    for m in (manifest, reused):
+        if m.files(root) != paths or any(m.stat(path) != old_stats[path] for path in paths):
+            print("ERROR: маніфест дав інші файли або stat, ніж os.walk", file=sys.stderr)
+            return 1
+    print(f"walk: файлів {len(paths)}, тек {len(manifest.dirs)}, затримка {latency_ms:g} мс на scandir/stat")
+    print(f"  os.walk + stat:            {walk_time:.3f} с")
+    for n, elapsed in timings.items():
+        print(f"  маніфест, потоків {n:<3}:     {elapsed:.3f} с (x{walk_time / max(elapsed, 1e-9):.1f})")
+    print(f"  маніфест зі збереженого:   {reuse_time:.3f} с (x{walk_time / max(reuse_time, 1e-9):.1f})")
+    return 0
+
+
+def legacy_extract_candidates(source_nodes, path, handlers, ancestries=None):
+    """
+    Колишній if-ланцюжок extract_candidates (до HANDLER_REGISTRY) з обробниками з handlers
+    ({kind: функція}); без повідомлень UNEXPECTED — лише для порівняння вартості вибору обробника.
+    ancestries — {id(node): [(контейнер, ключ), ...]}: тоді Type предків і EX_TextConst-контекст
+    шукаються перебором ancestry на кожному вузлі, як у первісному process_file.
+    """
+    searched_values = []
+    contexts = {}
+    for node, parent, parent_key, frame in source_nodes:
+        if ancestries is None:
+            dialog_ancestor = frame.dialog
+            data_table_ancestor = frame.data_table
+            user_enum_ancestor = frame.user_enum
+            in_textconst_context = (
+                (isinstance(node, dict) and ("KeyString" in node and "Namespace" in node))
+                or frame.textconst
+            )
+        else:
+            ancestry = ancestries[id(node)]
+            dialog_ancestor = data_table_ancestor = user_enum_ancestor = None
+            for anc_obj, _ in reversed(ancestry):
+                if isinstance(anc_obj, dict):
+                    t = anc_obj.get("Type")
+                    if t == "DialogAsset" and dialog_ancestor is None:
+                        dialog_ancestor = anc_obj
+                    if t == "DataTable" and data_table_ancestor is None:
+                        data_table_ancestor = anc_obj
+                    if t == "UserDefinedEnum" and user_enum_ancestor is None:
+                        user_enum_ancestor = anc_obj
+            in_textconst_context = (
+                (isinstance(node, dict) and ("KeyString" in node and "Namespace" in node))
+                or any(isinstance(a_obj, dict) and ("KeyString" in a_obj and "Namespace" in a_obj)
+                       for a_obj, _ in ancestry)
+            )
+        if dialog_ancestor is not None:
+            key, source, translation, context = handlers["dialog"](node, parent, parent_key, frame, path)
+            src_val = p.get_text(source)
+            if key and src_val is not None:
+                yield key, src_val, translation, contexts.setdefault(context, context), False, "dialog"
+                searched_values.append(node.get("SourceString", ""))
+            continue
+        if not in_textconst_context and data_table_ancestor is None:
+            key, source, translation, context = handlers["property"](node, parent, parent_key, frame, path)
+            src_val = p.get_text(source)
+            if key and src_val is not None:
+                yield key, src_val, translation, contexts.setdefault(context, context), False, "property"
+                searched_values.append(node.get("SourceString", ""))
+                continue
+        if data_table_ancestor is not None:
+            key, source, translation, context = handlers["datatable"](node, parent, parent_key, frame, path)
+            src_val = p.get_text(source)
+            if not key or src_val is None:
+                raise RuntimeError("UNEXPECTED")
+            yield key, src_val, translation, contexts.setdefault(context, context), True, "datatable"
+            searched_values.append(node.get("SourceString", ""))
+            continue
+        if user_enum_ancestor is not None:
+            key, source, translation, context = handlers["enum"](node, parent, parent_key, frame, path)
+            src_val = p.get_text(source)
+            if not key or src_val is None:
+                raise RuntimeError("UNEXPECTED")
+            yield key, src_val, translation, contexts.setdefault(context, context), True, "enum"
+            searched_values.append(node.get("SourceString", ""))
+            continue
+        if isinstance(node, dict) and "SourceString" in node:
+            key, source, translation, context = handlers["script"](node, parent, parent_key, frame, path)
+            src_val = p.get_text(source)
+            if key and src_val is not None:
+                yield key, src_val, translation, contexts.setdefault(context, context), True, "script"
+                searched_values.append(node.get("SourceString", ""))
+            continue
+        raise RuntimeError("UNEXPECTED BLOCK")
+
+
+def bench_dispatch(files, seed=1, repeat=5):
+    """
+    Вартість вибору обробника на вузол: первісний перебір ancestry, колишній if-ланцюжок за прапорцями
+    NodeFrame і HANDLER_REGISTRY. Обробники замінено заготовленими результатами справжніх обробників
+    (однакова ціна для всіх), тож різниця — це сам вибір. Кандидати всіх варіантів мусять збігатися,
+    а пріоритети вбудованих типів — бути DialogAsset > DataTable > UserDefinedEnum.
+    """
+    expected_rank = {"DialogAsset": 3, "DataTable": 2, "UserDefinedEnum": 1}
+    if p.HANDLER_REGISTRY.type_rank != expected_rank:
+        print(f"ERROR: пріоритети типів {p.HANDLER_REGISTRY.type_rank}, очікувалось {expected_rank}", file=sys.stderr)
+        return 1
+    with tempfile.TemporaryDirectory() as tmp:
+        root = gen_ue_corpus.write_corpus(os.path.join(tmp, "corpus"), files, seed, depth=2, rows=20, mesh_size=5)
+        per_file = []
+        for path in p.iter_json_files(root):
+            _, data = p.load_json_file(path)
+            per_file.append((path, list(p.find_source_nodes(data))))
+    nodes = sum(len(source_nodes) for _, source_nodes in per_file)
+    empty = (None, None, None, None)
+    prepared = {}
+    for spec in p.HANDLER_REGISTRY.specs:
+        results = prepared[spec.kind] = {}
+        for path, source_nodes in per_file:
+            for node, parent, parent_key, frame in source_nodes:
+                try:
+                    results[id(node)] = spec.handler(node, parent, parent_key, frame, path)
+                except Exception:
+                    results[id(node)] = empty
+
+    def stub(kind):
+        results = prepared[kind]
+        return lambda node, parent, parent_key, frame, path: results[id(node)]
+
+    stubs = {kind: stub(kind) for kind in prepared}
+    # ancestry кожного вузла (контейнери від кореня до батька), як її будував первісний обхід
+    ancestries = {}
+    for _, source_nodes in per_file:
+        for node, _, _, frame in source_nodes:
+            ancestry = []
+            while frame is not None and frame.obj is not None:
+                ancestry.append((frame.obj, frame.key))
+                frame = frame.parent
+            ancestries[id(node)] = ancestry[::-1]
+
+    def run_ancestry():
+        return [list(legacy_extract_candidates(source_nodes, path, stubs, ancestries)) for path, source_nodes in per_file]
+    originals = {spec: spec.handler for spec in p.HANDLER_REGISTRY.specs}
+
+    def run_legacy():
+        return [list(legacy_extract_candidates(source_nodes, path, stubs)) for path, source_nodes in per_file]
+
+    def run_registry():
+        return [list(p.extract_candidates(None, path, source_nodes=source_nodes)) for path, source_nodes in per_file]
+
+    timings = {}
+    try:
+        for spec in p.HANDLER_REGISTRY.specs:
+            spec.handler = stubs[spec.kind]
+        p.HANDLER_REGISTRY.chains.clear()
+        expected = run_registry()
+        if run_legacy() != expected or run_ancestry() != expected:
+            print("ERROR: реєстр обробників дав інших кандидатів, ніж if-ланцюжок", file=sys.stderr)
+            return 1
+        # варіанти чергуються, щоб фонове навантаження однаково впливало на обидва; береться найкращий час
+        for _ in range(repeat):
+            for name, fn in (("ancestry", run_ancestry), ("if-ланцюжок", run_legacy), ("реєстр", run_registry)):
+                t0 = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - t0
+                timings[name] = min(timings.get(name, elapsed), elapsed)
+    finally:
+        for spec, fn in originals.items():
+            spec.handler = fn
+        p.HANDLER_REGISTRY.chains.clear()
+    print(f"dispatch: файлів {len(per_file)}, вузлів з SourceString {nodes}")
+    base = timings["ancestry"]
+    for name, elapsed in timings.items():
+        print(f"  {name:<12} {elapsed * 1e9 / max(nodes, 1):8.0f} нс/вузол (x{base / max(elapsed, 1e-9):.2f})")
+    return 0
+
+
+def write_float_arrays(path, values, seed=1):
+    """Файл з діалогом, мешем і плоскими масивами чисел з дробами й експонентами (-55.0109, 1e-07, 3.2e+21)."""
+    rnd = random.Random(seed)
+    st_keys = []
+    curve = [rnd.choice((rnd.uniform(-1, 1) * 10 ** rnd.randint(-30, 30), rnd.uniform(-1e3, 1e3), 1e-7, -0.0,
+                         rnd.randint(-10 ** 6, 10 ** 6))) for _ in range(values)]
+    exports = (gen_ue_corpus.make_export(rnd, "dialog", "dialog_0", st_keys)
+               + gen_ue_corpus.make_export(rnd, "mesh", "mesh_0", st_keys, mesh_size=max(values // 3, 1))
+               + [{"Type": "CurveFloat", "Name": "curve_0", "Keys": curve, "Nested": [curve[:50], [curve[50:100]]]}])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(exports, f)
+
+
+def bench_stream(values, seed=1):
+    """
+    Потоковий розбір масивів чисел дрібними шматками і бюджетами: межа шматка посеред числа не
+    повинна давати StreamSyntaxError (тоді scan_file мовчки декодує файл цілком), а кандидати
+    мусять збігатися з повним декодуванням.
+    """
+    settings = [(budget, chunk) for budget in (16, 256, p.STREAM_PIECE_BUDGET) for chunk in (1, 7, p._STREAM_CHUNK)]
+    saved = p.STREAM_PIECE_BUDGET, p._STREAM_CHUNK
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "floats.json")
+        write_float_arrays(path, values, seed)
+        t0 = time.perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            expected = p.scan_data(path, json.load(f))
+        full = time.perf_counter() - t0
+        try:
+            for budget, chunk in settings:
+                p.STREAM_PIECE_BUDGET, p._STREAM_CHUNK = budget, chunk
+                t0 = time.perf_counter()
+                try:
+                    result = p.scan_file_streaming(path)
+                except p.StreamSyntaxError as e:
+                    print(f"ERROR: бюджет {budget}, шматок {chunk}: потоковий розбір відступив до повного ({e})",
+                          file=sys.stderr)
+                    return 1
+                elapsed = time.perf_counter() - t0
+                if result != expected:
+                    print(f"ERROR: бюджет {budget}, шматок {chunk}: кандидати відрізняються від повного декодування",
+                          file=sys.stderr)
+                    return 1
+                print(f"  бюджет {budget:>8}, шматок {chunk:>8}: {elapsed:.3f} с")
+        finally:
+            p.STREAM_PIECE_BUDGET, p._STREAM_CHUNK = saved
+    print(f"stream: чисел {values}, кандидатів {len(expected[1])}, повне декодування {full:.3f} с; результати однакові")
+    return 0
+
+
+def timed_iter(iterable, times, name):
+    """Ітерує iterable, додаючи до times[name] лише час, витрачений усередині next()."""
+    it = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            times[name] += time.perf_counter() - t0
+            return
+        times[name] += time.perf_counter() - t0
+        yield item
+
+
+def measure_stages(root):
+    """
+    Час окремих етапів на корпусі: collect_stringtables, декодування JSON, обхід find_source_nodes
+    і кожен handle_* (обгортки на час вимірювання). Повертає (times, calls, errors).
+    """
+    times = defaultdict(float)
+    calls = Counter()
+
+    t0 = time.perf_counter()
+    p.collect_stringtables([root])
+    times["collect_stringtables"] = time.perf_counter() - t0
+
+    def timed(name, fn):
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                times[name] += time.perf_counter() - t
+                calls[name] += 1
+        return wrapper
+
+    # extract_candidates викликає обробники через HANDLER_REGISTRY — обгортаємо їх там
+    originals = {spec: spec.handler for spec in p.HANDLER_REGISTRY.specs}
+    for spec, fn in originals.items():
+        spec.handler = timed(fn.__name__, fn)
+    p.HANDLER_REGISTRY.chains.clear()
+    errors = 0
+    try:
+        for path in p.iter_json_files(root):
+            t0 = time.perf_counter()
+            try:
+                _, data = p.load_json_file(path)
+            except Exception:
+                errors += 1
+                continue
+            finally:
+                times["decode"] += time.perf_counter() - t0
+            for _ in timed_iter(p.find_source_nodes(data), times, "find_source_nodes"):
+                pass
+            try:
+                for _ in timed_iter(p.extract_candidates(data, path), times, "extract_candidates"):
+                    pass
+            except Exception:
+                errors += 1
+    finally:
+        for spec, fn in originals.items():
+            spec.handler = fn
+        p.HANDLER_REGISTRY.chains.clear()
+    return times, calls, errors
+
+
+def measure_pipeline(root, pipeline_args=()):
+    """Повний запуск parse_json_to_csv.py в окремому процесі: (секунди, рядків CSV, пікова пам'ять МБ або None)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out_csv = os.path.join(tmp, "bench.csv")
+        cmd = [sys.executable, os.path.join(HERE, "parse_json_to_csv.py"), "--root", root, "--out", out_csv, *pipeline_args]
+        t0 = time.perf_counter()
+        subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - t0
+        with open(out_csv, newline="", encoding="utf-8") as f:
+            rows = sum(1 for _ in csv.reader(f)) - 1
+    peak_mb = None
+    if resource is not None:
+        # ru_maxrss дочірніх процесів у КБ (Linux); бенчмарк запускає лише цей конвеєр
+        peak_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return elapsed, rows, peak_mb
+
+
+def compare_with_baseline(metrics, baseline):
+    """Рядки звіту: метрика, значення, базове значення, зміна; позначає погіршення понад REGRESSION_THRESHOLD."""
+    lines = []
+    for name, value in metrics.items():
+        old = baseline.get(name)
+        if value is None:
+            lines.append(f"  {name:<32} {'н/д':>12}")
+            continue
+        if old is None:
+            lines.append(f"  {name:<32} {value:>12.4f}")
+            continue
+        change = (value - old) / old if old else 0.0
+        worse = -change if name in HIGHER_IS_BETTER else change
+        mark = "  ГІРШЕ" if worse > REGRESSION_THRESHOLD else ""
+        lines.append(f"  {name:<32} {value:>12.4f} {old:>12.4f} {change:+8.1%}{mark}")
+    return lines
+
+
+def bench_suite(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        params = {"corpus": os.path.abspath(corpus)} if corpus else {
+            "files": args.files, "depth": args.depth, "mix": args.mix, "rows": args.rows,
+            "mesh_size": args.mesh_size, "seed": args.seed,
+        }
+        if not corpus:
+            corpus = gen_ue_corpus.write_corpus(tmp, args.files, args.seed, args.depth,
+                                                gen_ue_corpus.parse_mix(args.mix), args.rows, args.mesh_size)
+        params["pipeline_args"] = args.pipeline_args
+        files = sum(1 for _ in p.iter_json_files(corpus))
+
+        times, calls, errors = measure_stages(corpus)
+        elapsed, rows, peak_mb = measure_pipeline(corpus, shlex.split(args.pipeline_args))
+
+    metrics = {
+        "pipeline_s": elapsed,
+        "files_per_s": files / elapsed,
+        "rows_per_s": rows / elapsed,
+        "peak_mb": peak_mb,
+    }
+    for name in ("collect_stringtables", "decode", "find_source_nodes", "extract_candidates") + HANDLERS:
+        metrics[f"{name}_s"] = times.get(name, 0.0)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("params") == params:
+            baseline = stored.get("metrics", {})
+        else:
+            print(f"WARNING: базовий результат {args.baseline} знято з іншими параметрами, порівняння пропущено.")
+
+    report = [
+        f"bench suite {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"параметри: {json.dumps(params, ensure_ascii=False)}",
+        f"файлів {files}, рядків CSV {rows}, помилок екстракції {errors}",
+        "виклики: " + ", ".join(f"{name} {calls[name]}" for name in HANDLERS),
+        f"  {'метрика':<32} {'значення':>12} {'база':>12} {'зміна':>8}",
+    ]
+    report.extend(compare_with_baseline(metrics, baseline))
+    text = "\n".join(report) + "\n"
+    print(text, end="")
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(text)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"params": params, "metrics": metrics}, f, ensure_ascii=False, indent=2)
+        print(f"Базовий результат збережено у {args.baseline}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Мікробенчмарки parse_json_to_csv.py")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    ns_parser = sub.add_parser("namespace", help="Підбір StringTable-namespace: лінійний перебір проти індексу")
+    ns_parser.add_argument("--rows", type=int, default=50000)
+    ns_parser.add_argument("--keys", type=int, default=500)
+    ns_parser.add_argument("--seed", type=int, default=1)
+    be_parser = sub.add_parser("backends", help="JSON-бекенди: однаковість результатів і швидкість розбору")
+    be_parser.add_argument("--files", type=int, default=300)
+    be_parser.add_argument("--seed", type=int, default=1)
+    rs_parser = sub.add_parser("rowstore", help="Пам'ять рядків: списки з CSV проти компактного RowStore")
+    rs_parser.add_argument("--files", type=int, default=3000)
+    rs_parser.add_argument("--seed", type=int, default=1)
+    walk_parser = sub.add_parser("walk", help="Обхід тек: os.walk + stat проти маніфесту з пулом потоків")
+    walk_parser.add_argument("--files", type=int, default=5000)
+    walk_parser.add_argument("--seed", type=int, default=1)
+    walk_parser.add_argument("--latency", type=float, default=0.0, help="Штучна затримка os.scandir/os.stat, мс")
+    walk_parser.add_argument("--threads", type=int, default=p.WALK_THREADS)
+    walk_parser.add_argument("--corpus", help="Готова тека з JSON замість згенерованого корпусу")
+    dispatch_parser = sub.add_parser("dispatch", help="Вибір обробника вузла: колишній if-ланцюжок проти реєстру")
+    dispatch_parser.add_argument("--files", type=int, default=2000)
+    dispatch_parser.add_argument("--seed", type=int, default=1)
+    dispatch_parser.add_argument("--repeat", type=int, default=5)
+    stream_parser = sub.add_parser("stream", help="Потоковий розбір масивів чисел дрібними шматками: без відступу до повного")
+    stream_parser.add_argument("--values", type=int, default=20000)
+    stream_parser.add_argument("--seed", type=int, default=1)
+    suite_parser = sub.add_parser("suite", help="Етапи і повний конвеєр на синтетичному корпусі, порівняння з базою")
+    suite_parser.add_argument("--corpus", help="Готова тека з JSON замість згенерованого корпусу")
+    suite_parser.add_argument("--files", type=int, default=2000)
+    suite_parser.add_argument("--depth", type=int, default=2)
+    suite_parser.add_argument("--mix", default="", help="Ваги видів ассетів (див. gen_ue_corpus.py --mix)")
+    suite_parser.add_argument("--rows", type=int, default=6)
+    suite_parser.add_argument("--mesh-size", type=int, default=200)
+    suite_parser.add_argument("--seed", type=int, default=1)
+    suite_parser.add_argument("--pipeline-args", default="", help="Додаткові аргументи parse_json_to_csv.py, напр. \"-j 4\"")
+    suite_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    suite_parser.add_argument("--save-baseline", action="store_true", help="Зберегти цей запуск як базовий")
+    suite_parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    if args.bench == "namespace":
+        sys.exit(bench_namespace(args.rows, args.keys, args.seed))
+    if args.bench == "backends":
+        sys.exit(bench_backends(args.files, args.seed))
+    if args.bench == "rowstore":
+        sys.exit(bench_rowstore(args.files, args.seed))
+    if args.bench == "walk":
+        sys.exit(bench_walk(args.files, args.seed, args.latency, args.threads, args.corpus))
+    if args.bench == "dispatch":
+        sys.exit(bench_dispatch(args.files, args.seed, args.repeat))
+    if args.bench == "stream":
+        sys.exit(bench_stream(args.values, args.seed))
+    if args.bench == "suite":
+        sys.exit(bench_suite(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,13 +13,38 @@ compare_csv_keys.py
   python compare_csv_keys.py fileA.csv fileB.csv
   або з іменованими аргументами:
   python compare_csv_keys.py --a fileA.csv --b fileB.csv
+  замість CSV можна вказати теку з JSON-експортами — рядки витягуються parse_json_to_csv.iter_rows
+  без проміжного CSV:
+  python compare_csv_keys.py fileA.csv ExportsB/
+  або бази parse_json_to_csv.py --format sqlite (дві бази порівнюються SQL-запитами за індексами,
+  без завантаження рядків у пам'ять):
+  python compare_csv_keys.py parsedA.sqlite parsedB.sqlite
+  для мільйонів рядків — зовнішнє сортування з обмеженою пам'яттю (порції на диску і злиття):
+  python compare_csv_keys.py fileA.csv fileB.csv --external-sort [--run-rows 50000] [--tmp-dir DIR]
+  N-way: три й більше входи (або --nway) читаються по одному разу в спільний індекс суфіксів
+  з бітовою маскою присутності; результат — матриця присутності та "Only in X"/"Missing from X":
+  python compare_csv_keys.py patch1.csv patch2.csv patch3.csv "Переклад.csv"
+  зміни source після патча — за відбитками (8-байтові хеші source за суфіксом ключа) у sidecar-базі
+  поруч із входом, без повторного читання старого CSV; відбитки оновлюються після звіту:
+  python compare_csv_keys.py parsed.csv --fingerprints [parsed.csv.fp.sqlite] [--with-context] [--no-update]
 """
 
 import argparse
 import csv
+import hashlib
+import heapq
 import os
+import pickle
+import sqlite3
 import sys
-from typing import Set, Tuple, List, Optional, Dict
+import tempfile
+import time
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Collection, Iterable, Iterator, NamedTuple, Tuple, List, Optional, Dict
+
+from parse_json_to_csv import CSV_HEADER, RowStore, connect_output_db, is_output_db, iter_output_db_rows, iter_rows
 
 # Optional GUI for file selection
 try:
@@ -30,12 +55,12 @@ except Exception:
     filedialog = None
 
 
-def read_csv_entries(csv_path: str) -> Tuple[Optional[List[str]], List[Tuple[str, List[str]]]]:
-    """Зчитує CSV і повертає (header, entries), де entries — список (key, full_row) у вихідному порядку.
-    Header може бути None, якщо заголовка немає.
+def read_csv_store(csv_path: str) -> Tuple[Optional[List[str]], RowStore]:
+    """Зчитує CSV у компактне RowStore (спільні частини context, ключі й тексти в суцільних буферах)
+    і повертає (header, store); header може бути None, якщо заголовка немає.
     """
     header: Optional[List[str]] = None
-    entries: List[Tuple[str, List[str]]] = []
+    store = RowStore()
     with open(csv_path, "r", encoding="utf-8") as f:
         reader = csv.reader(f)
         first_row = True
@@ -47,9 +72,35 @@ def read_csv_entries(csv_path: str) -> Tuple[Optional[List[str]], List[Tuple[str
                 if row[0].strip().lower() == "key":
                     header = row
                     continue
-            key_val = row[0].strip()
-            entries.append((key_val, row))
-    return header, entries
+            store.append_values(row)
+    return header, store
+
+
+def read_export_store(root: str) -> Tuple[List[str], RowStore]:
+    """Рядки з теки JSON-експортів, витягнуті в пам'яті (parse_json_to_csv.iter_rows), без проміжного CSV."""
+    return list(CSV_HEADER), RowStore(iter_rows(root))
+
+
+def read_store(path: str) -> Tuple[Optional[List[str]], RowStore]:
+    """CSV-файл, база --format sqlite або тека з JSON-експортами."""
+    if os.path.isdir(path):
+        return read_export_store(path)
+    if is_output_db(path):
+        return list(CSV_HEADER), RowStore(iter_output_db_rows(path))
+    return read_csv_store(path)
+
+
+def index_by_suffix(store: RowStore) -> Dict[str, int]:
+    """Суфікс ключа -> номер першого рядка з ним (рядки з порожнім ключем пропускаються)."""
+    by_suffix: Dict[str, int] = {}
+    for index, key in enumerate(store.keys):
+        key = key.strip()
+        if not key:
+            continue
+        _, s = split_key(key)
+        if s not in by_suffix:
+            by_suffix[s] = index
+    return by_suffix
 
 
 def split_key(key: str) -> Tuple[str, str]:
@@ -60,17 +111,595 @@ def split_key(key: str) -> Tuple[str, str]:
     return "", key
 
 
+class KeyComparison(NamedTuple):
+    """Результат порівняння A і B за суфіксами ключів: числа і ключі для звіту, рядки для трьох CSV."""
+    rows_a: int
+    unique_a: int
+    rows_b: int
+    unique_b: int
+    # ключі перших рядків суфіксів, яких немає в іншому файлі (відсортовані за суфіксом)
+    only_a: Collection[str]
+    only_b: Collection[str]
+    common: int
+    header_a: Optional[List[str]]
+    header_b: Optional[List[str]]
+    # рядки A зі спільним суфіксом (порядок A, ключ повністю з B) і рядки лише з A / лише з B
+    common_rows: Callable[[], Iterator[List[str]]]
+    only_a_rows: Callable[[], Iterator[List[str]]]
+    only_b_rows: Callable[[], Iterator[List[str]]]
+
+
+def compare_stores(header_a: Optional[List[str]], store_a: RowStore,
+                   header_b: Optional[List[str]], store_b: RowStore) -> KeyComparison:
+    # множини ключів потрібні лише для підрахунку — будуються по одній і не тримаються
+    unique_a = len({k for k in (key.strip() for key in store_a.keys) if k})
+    unique_b = len({k for k in (key.strip() for key in store_b.keys) if k})
+    rows_a = sum(1 for key in store_a.keys if key.strip())
+    rows_b = sum(1 for key in store_b.keys if key.strip())
+
+    # Побудувати мапи за суфіксом ключа (частина після '::') -> номер рядка у сховищі
+    a_by_suffix = index_by_suffix(store_a)
+    b_by_suffix = index_by_suffix(store_b)
+
+    # Порівнювати за суфіксами: збіг — якщо суфікс однаковий, навіть якщо префікси різні
+    only_suffix_in_a = sorted(s for s in a_by_suffix if s not in b_by_suffix)
+    only_suffix_in_b = sorted(s for s in b_by_suffix if s not in a_by_suffix)
+    common = sum(1 for s in a_by_suffix if s in b_by_suffix)
+
+    def rows_without_suffix_in(store: RowStore, other_by_suffix: Dict[str, int]) -> Iterator[List[str]]:
+        for index, key in enumerate(store.keys):
+            key = key.strip()
+            if not key:
+                continue
+            _, s = split_key(key)
+            if s not in other_by_suffix:
+                yield store.values(index)
+
+    def common_rows() -> Iterator[List[str]]:
+        # Порядок як у A; ключ беремо ПОВНІСТЮ з B (і префікс, і суфікс від другого файлу)
+        for index_a, key_a in enumerate(store_a.keys):
+            key_a = key_a.strip()
+            if not key_a:
+                continue
+            _, s = split_key(key_a)
+            if s in b_by_suffix:
+                new_key = store_b.keys[b_by_suffix[s]].strip()
+                # замінити першу колонку у рядку A на new_key
+                out_row = store_a.values(index_a)
+                if out_row:
+                    out_row[0] = new_key
+                yield out_row
+
+    return KeyComparison(
+        rows_a, unique_a, rows_b, unique_b,
+        [store_a.keys[a_by_suffix[s]].strip() for s in only_suffix_in_a],
+        [store_b.keys[b_by_suffix[s]].strip() for s in only_suffix_in_b],
+        common, header_a, header_b, common_rows,
+        lambda: rows_without_suffix_in(store_a, b_by_suffix),
+        lambda: rows_without_suffix_in(store_b, a_by_suffix),
+    )
+
+
+def compare_databases(path_a: str, path_b: str) -> KeyComparison:
+    """
+    Порівняння двох баз parse_json_to_csv.py --format sqlite без завантаження рядків у пам'ять:
+    перші рядки кожного суфікса збираються в тимчасові таблиці з унікальним індексом, решта —
+    з'єднання за індексом entries.key_suffix. Результат той самий, що й compare_stores (унікальні
+    ключі рахуються з trim пробілів і \\t\\r\\n, а не повного str.strip).
+    """
+    conn = connect_output_db(path_a)
+    conn.execute("ATTACH DATABASE ? AS b", (Path(path_b).as_uri() + "?mode=ro",))
+    counts = []
+    for schema in ("main", "b"):
+        counts.append(conn.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT trim(key, ' \t\r\n')) FROM {schema}.entries "
+            "WHERE key_suffix IS NOT NULL").fetchone())
+        conn.execute(
+            f"CREATE TEMP TABLE first_{schema} AS SELECT e.key_suffix AS key_suffix, e.key AS key "
+            f"FROM (SELECT key_suffix, MIN(id) AS id FROM {schema}.entries WHERE key_suffix IS NOT NULL "
+            f"GROUP BY key_suffix) f JOIN {schema}.entries e ON e.id = f.id")
+        conn.execute(f"CREATE UNIQUE INDEX temp.first_{schema}_suffix ON first_{schema} (key_suffix)")
+
+    def only_keys(schema: str, other: str) -> List[str]:
+        return [key.strip() for (key,) in conn.execute(
+            f"SELECT f.key FROM temp.first_{schema} f WHERE NOT EXISTS "
+            f"(SELECT 1 FROM temp.first_{other} g WHERE g.key_suffix = f.key_suffix) ORDER BY f.key_suffix")]
+
+    def only_rows(schema: str, other: str) -> Iterator[List[str]]:
+        for row in conn.execute(
+                f"SELECT e.key, e.source, e.translation, e.context FROM {schema}.entries e "
+                f"WHERE e.key_suffix IS NOT NULL AND NOT EXISTS "
+                f"(SELECT 1 FROM temp.first_{other} g WHERE g.key_suffix = e.key_suffix) ORDER BY e.id"):
+            yield list(row)
+
+    def common_rows() -> Iterator[List[str]]:
+        for key_b, source, translation, context in conn.execute(
+                "SELECT g.key, e.source, e.translation, e.context FROM main.entries e "
+                "JOIN temp.first_b g ON g.key_suffix = e.key_suffix ORDER BY e.id"):
+            yield [key_b.strip(), source, translation, context]
+
+    common = conn.execute(
+        "SELECT COUNT(*) FROM temp.first_main f JOIN temp.first_b g ON g.key_suffix = f.key_suffix").fetchone()[0]
+    return KeyComparison(
+        counts[0][0], counts[0][1], counts[1][0], counts[1][1],
+        only_keys("main", "b"), only_keys("b", "main"), common,
+        list(CSV_HEADER), list(CSV_HEADER), common_rows,
+        lambda: only_rows("main", "b"), lambda: only_rows("b", "main"),
+    )
+
+
+# ---------------- Зовнішнє сортування (--external-sort) ----------------
+EXTERNAL_RUN_ROWS = 50000
+_RUN_BATCH = 256
+
+
+class ExternalSorter:
+    """
+    Зовнішнє сортування записів-кортежів: до run_rows записів тримаються в пам'яті, кожна
+    відсортована порція (run) пишеться у tmp_dir пакетами pickle, ітерація — злиття порцій через
+    heapq.merge. Початок запису (ключ сортування) має бути унікальним, тож порівняння не доходить
+    до решти полів. value — що видавати замість усього запису.
+    """
+
+    def __init__(self, tmp_dir: str, run_rows: int = EXTERNAL_RUN_ROWS, value: Optional[Callable[[tuple], Any]] = None):
+        self.tmp_dir = tmp_dir
+        self.run_rows = run_rows
+        self.value = value
+        self.buffer: List[tuple] = []
+        self.runs: List[str] = []
+        self.count = 0
+
+    def add(self, record: tuple):
+        self.buffer.append(record)
+        self.count += 1
+        if len(self.buffer) >= self.run_rows:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort()
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self.tmp_dir)
+        with os.fdopen(fd, "wb") as f:
+            for start in range(0, len(self.buffer), _RUN_BATCH):
+                pickle.dump(self.buffer[start:start + _RUN_BATCH], f, pickle.HIGHEST_PROTOCOL)
+        self.runs.append(path)
+        self.buffer = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.runs:
+            # остання порція теж на диск: під час злиття в пам'яті лише по пакету з кожної порції
+            if self.buffer:
+                self._spill()
+            merged = heapq.merge(*(read_run(path) for path in self.runs))
+        else:
+            self.buffer.sort()
+            merged = iter(self.buffer)
+        return merged if self.value is None else map(self.value, merged)
+
+
+def read_run(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def iter_input_rows(path: str) -> Tuple[Optional[List[str]], Iterator[List[str]]]:
+    """(header, рядки) CSV, бази --format sqlite або теки з JSON-експортами без завантаження всього файлу."""
+    if os.path.isdir(path):
+        return list(CSV_HEADER), (list(row[:4]) for row in iter_rows(path))
+    if is_output_db(path):
+        return list(CSV_HEADER), (list(row[:4]) for row in iter_output_db_rows(path))
+    f = open(path, "r", encoding="utf-8")
+    reader = (row for row in csv.reader(f) if row)
+    first = next(reader, None)
+    if first is not None and first[0].strip().lower() == "key":
+        header, pending = first, []
+    else:
+        header, pending = None, ([first] if first is not None else [])
+
+    def rows() -> Iterator[List[str]]:
+        with f:
+            yield from pending
+            yield from reader
+
+    return header, rows()
+
+
+def sort_by_suffix(rows: Iterable[List[str]], tmp_dir: str, run_rows: int) -> ExternalSorter:
+    """Рядки з непорожнім ключем як (суфікс, номер рядка, ключ, рядок), зовнішньо відсортовані."""
+    sorter = ExternalSorter(tmp_dir, run_rows)
+    for index, row in enumerate(rows):
+        key = row[0].strip()
+        if not key:
+            continue
+        _, s = split_key(key)
+        sorter.add((s, index, key, row))
+    return sorter
+
+
+def compare_external(path_a: str, path_b: str, tmp_dir: str, run_rows: int = EXTERNAL_RUN_ROWS) -> KeyComparison:
+    """
+    Порівняння з обмеженою пам'яттю: обидва входи зовнішньо сортуються за (суфікс, номер рядка) і
+    зливаються за один прохід. Перший рядок суфікса — найменший номер, тож "перший рядок перемагає"
+    зберігається; рядки-результати повертаються до порядку входу ще одним сортуванням за номером.
+    В пам'яті — лише порції по run_rows записів (до трьох одночасно) і рядки одного суфікса.
+    """
+    header_a, rows_a = iter_input_rows(path_a)
+    header_b, rows_b = iter_input_rows(path_b)
+    groups_a = groupby(sort_by_suffix(rows_a, tmp_dir, run_rows), key=itemgetter(0))
+    groups_b = groupby(sort_by_suffix(rows_b, tmp_dir, run_rows), key=itemgetter(0))
+    only_a = ExternalSorter(tmp_dir, run_rows, value=itemgetter(1))
+    only_b = ExternalSorter(tmp_dir, run_rows, value=itemgetter(1))
+    common_rows = ExternalSorter(tmp_dir, run_rows, value=itemgetter(1))
+    only_a_rows = ExternalSorter(tmp_dir, run_rows, value=itemgetter(1))
+    only_b_rows = ExternalSorter(tmp_dir, run_rows, value=itemgetter(1))
+    counts = {"rows_a": 0, "unique_a": 0, "rows_b": 0, "unique_b": 0}
+    common = 0
+
+    def consume(group: Iterator[tuple], side: str, sink: Optional[ExternalSorter], new_key: Optional[str] = None) -> str:
+        """Рахує рядки й унікальні ключі суфікса, передає рядки в sink; повертає ключ першого рядка."""
+        keys = set()
+        first_key = None
+        for s, index, key, row in group:
+            if first_key is None:
+                first_key = key
+            keys.add(key)
+            counts["rows_" + side] += 1
+            if sink is not None:
+                if new_key is not None:
+                    # замінити першу колонку у рядку A на ключ першого рядка B
+                    row = [new_key] + row[1:]
+                sink.add((index, row))
+        counts["unique_" + side] += len(keys)
+        return first_key
+
+    current_a = next(groups_a, None)
+    current_b = next(groups_b, None)
+    while current_a is not None or current_b is not None:
+        if current_b is None or (current_a is not None and current_a[0] < current_b[0]):
+            only_a.add((current_a[0], consume(current_a[1], "a", only_a_rows)))
+            current_a = next(groups_a, None)
+        elif current_a is None or current_b[0] < current_a[0]:
+            only_b.add((current_b[0], consume(current_b[1], "b", only_b_rows)))
+            current_b = next(groups_b, None)
+        else:
+            common += 1
+            key_b = consume(current_b[1], "b", None)
+            consume(current_a[1], "a", common_rows, new_key=key_b)
+            current_a = next(groups_a, None)
+            current_b = next(groups_b, None)
+
+    return KeyComparison(
+        counts["rows_a"], counts["unique_a"], counts["rows_b"], counts["unique_b"],
+        only_a, only_b, common, header_a, header_b,
+        lambda: iter(common_rows), lambda: iter(only_a_rows), lambda: iter(only_b_rows),
+    )
+
+
+# ---------------- N-way порівняння ----------------
+class PresenceIndex(NamedTuple):
+    """
+    Спільний індекс суфіксів N входів: номер суфікса -> маска присутності (біт i — вхід i) і
+    перший рядок з цим суфіксом (з першого входу, де він є) у first_rows під тим самим номером.
+    """
+    paths: List[str]
+    headers: List[Optional[List[str]]]
+    suffix_ids: Dict[str, int]
+    presence: List[int]
+    first_rows: RowStore
+    rows: List[int]
+    unique: List[int]
+
+
+def build_presence_index(paths: List[str]) -> PresenceIndex:
+    """Читає кожен вхід рівно один раз (потоково) і заповнює спільний індекс суфіксів."""
+    headers: List[Optional[List[str]]] = []
+    suffix_ids: Dict[str, int] = {}
+    presence: List[int] = []
+    first_rows = RowStore()
+    rows: List[int] = []
+    unique: List[int] = []
+    for file_index, path in enumerate(paths):
+        bit = 1 << file_index
+        header, input_rows = iter_input_rows(path)
+        headers.append(header)
+        keys = set()
+        row_count = 0
+        for row in input_rows:
+            key = row[0].strip()
+            if not key:
+                continue
+            row_count += 1
+            keys.add(key)
+            _, s = split_key(key)
+            sid = suffix_ids.get(s)
+            if sid is None:
+                sid = suffix_ids[s] = len(presence)
+                presence.append(bit)
+                first_rows.append_values(row, path=path)
+            else:
+                presence[sid] |= bit
+        rows.append(row_count)
+        unique.append(len(keys))
+    return PresenceIndex(paths, headers, suffix_ids, presence, first_rows, rows, unique)
+
+
+def output_names(paths: List[str]) -> List[str]:
+    """Короткі імена входів для назв файлів і стовпчиків; однакові базові імена отримують номер."""
+    bases = [os.path.splitext(os.path.basename(path.rstrip("\\/")))[0] for path in paths]
+    return [f"{i + 1}_{base}" if bases.count(base) > 1 else base for i, base in enumerate(bases)]
+
+
+def write_nway_outputs(index: PresenceIndex, out_dir: str) -> List[str]:
+    """
+    Пише матрицю присутності (за суфіксом: ключ першого рядка і 1 у стовпчиках входів, де він є)
+    та для кожного входу X: "Only in X" — рядки X із суфіксами, яких більше ніде немає, і
+    "Missing from X" — перші рядки суфіксів, що є в інших входах, але не в X. Повертає шляхи.
+    """
+    names = output_names(index.paths)
+    n = len(names)
+    all_files = (1 << n) - 1
+    # заголовок для "Missing from X": рядки беруться з різних входів — перший наявний заголовок
+    any_header = next((h for h in index.headers if h is not None), None)
+    matrix_path = os.path.join(out_dir, f"Presence {n} files.csv")
+    written = [matrix_path]
+    with open(matrix_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["suffix", "key"] + names)
+        for s in sorted(index.suffix_ids):
+            sid = index.suffix_ids[s]
+            mask = index.presence[sid]
+            w.writerow([s, index.first_rows.keys[sid].strip()] + ["1" if mask >> i & 1 else "" for i in range(n)])
+    files = []
+    try:
+        only_writers = []
+        missing_writers = []
+        for i, name in enumerate(names):
+            for title, header, writers in ((f"Only in {name}.csv", index.headers[i], only_writers),
+                                           (f"Missing from {name}.csv", any_header, missing_writers)):
+                path = os.path.join(out_dir, title)
+                f = open(path, "w", newline="", encoding="utf-8")
+                files.append(f)
+                written.append(path)
+                w = csv.writer(f)
+                if header is not None:
+                    w.writerow(header)
+                writers.append(w)
+        # один прохід по суфіксах у порядку першої появи (для "Only in X" — порядок рядків X)
+        for sid, mask in enumerate(index.presence):
+            missing = all_files & ~mask
+            if not missing:
+                continue
+            values = index.first_rows.values(sid)
+            if mask & (mask - 1) == 0:
+                only_writers[mask.bit_length() - 1].writerow(values)
+            while missing:
+                low = missing & -missing
+                missing_writers[low.bit_length() - 1].writerow(values)
+                missing ^= low
+    finally:
+        for f in files:
+            f.close()
+    return written
+
+
+def run_nway(paths: List[str]):
+    index = build_presence_index(paths)
+    names = output_names(paths)
+    n = len(paths)
+    all_files = (1 << n) - 1
+    print(f"=== N-way порівняння ключів ({n} входів) ===")
+    only = [0] * n
+    missing = [0] * n
+    in_all = 0
+    for mask in index.presence:
+        if mask == all_files:
+            in_all += 1
+            continue
+        if mask & (mask - 1) == 0:
+            only[mask.bit_length() - 1] += 1
+        for i in range(n):
+            if not mask >> i & 1:
+                missing[i] += 1
+    for i, path in enumerate(paths):
+        print(f"{names[i]}: {path}")
+        print(f"  рядків {index.rows[i]}, унікальних ключів {index.unique[i]}, "
+              f"лише тут (за суфіксами) {only[i]}, бракує {missing[i]}")
+    print(f"Усього суфіксів: {len(index.presence)}, у всіх входах: {in_all}")
+    print("")
+    print("Створені файли:")
+    for path in write_nway_outputs(index, os.path.dirname(os.path.abspath(__file__))):
+        print(f"  {path}")
+
+
+# ---------------- Відбитки source (sidecar) ----------------
+# Формат sidecar-бази відбитків; зміна схеми — нове значення, стара база не читається
+FINGERPRINT_VERSION = "1"
+_DIGEST_MASK = (1 << 64) - 1
+
+
+def row_digest(row: List[str], with_context: bool = False) -> int:
+    """8-байтовий blake2b-хеш source рядка (і context, якщо with_context) як беззнакове ціле."""
+    text = row[1] if len(row) > 1 else ""
+    if with_context:
+        text += "\0" + (row[3] if len(row) > 3 else "")
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+
+def to_signed(digest: int) -> int:
+    """SQLite INTEGER — знакове 64-бітне."""
+    return digest - (1 << 64) if digest >= 1 << 63 else digest
+
+
+class Fingerprints(NamedTuple):
+    """
+    Відбитки входу за суфіксом ключа: digest — сума хешів усіх рядків суфікса за модулем 2**64
+    (не залежить від порядку рядків, але чутлива до дублікатів), key — перший ключ суфікса.
+    """
+    with_context: bool
+    suffix_ids: Dict[str, int]
+    digests: List[int]
+    first_rows: RowStore
+    header: Optional[List[str]]
+
+
+def fingerprint_input(path: str, with_context: bool = False) -> Fingerprints:
+    header, rows = iter_input_rows(path)
+    suffix_ids: Dict[str, int] = {}
+    digests: List[int] = []
+    first_rows = RowStore()
+    for row in rows:
+        key = row[0].strip()
+        if not key:
+            continue
+        _, s = split_key(key)
+        digest = row_digest(row, with_context)
+        sid = suffix_ids.get(s)
+        if sid is None:
+            suffix_ids[s] = len(digests)
+            digests.append(digest)
+            first_rows.append_values(row, path=path)
+        else:
+            digests[sid] = (digests[sid] + digest) & _DIGEST_MASK
+    return Fingerprints(with_context, suffix_ids, digests, first_rows, header)
+
+
+def read_fingerprints(path: str) -> Tuple[bool, Dict[str, Tuple[str, int]]]:
+    """(with_context, {суфікс: (ключ, відбиток)}) зі sidecar-бази; ValueError — інша версія формату."""
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT name, value FROM meta"))
+        if meta.get("version") != FINGERPRINT_VERSION:
+            raise ValueError(f"{path}: невідома версія відбитків {meta.get('version')!r}")
+        old = {s: (s if prefix is None else prefix + "::" + s, digest & _DIGEST_MASK)
+               for s, prefix, digest in conn.execute("SELECT suffix, prefix, digest FROM fingerprints")}
+        return meta.get("with_context") == "1", old
+    finally:
+        conn.close()
+
+
+def write_fingerprints(path: str, fp: Fingerprints):
+    """Пише sidecar у тимчасовий файл поруч і атомарно замінює ним старий."""
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+        # ключ зберігається як префікс простору імен (NULL — ключ без '::'), щоб не дублювати суфікс
+        conn.execute("CREATE TABLE fingerprints (suffix TEXT PRIMARY KEY, prefix TEXT, digest INTEGER) WITHOUT ROWID")
+        conn.executemany("INSERT INTO meta (name, value) VALUES (?, ?)",
+                         [("version", FINGERPRINT_VERSION), ("with_context", "1" if fp.with_context else "0")])
+        keys = fp.first_rows.keys
+        conn.executemany("INSERT INTO fingerprints (suffix, prefix, digest) VALUES (?, ?, ?)",
+                         ((s, split_key(keys[sid].strip())[0] if "::" in keys[sid] else None, to_signed(fp.digests[sid]))
+                          for s, sid in fp.suffix_ids.items()))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def diff_fingerprints(old: Dict[str, Tuple[str, int]], fp: Fingerprints) -> Tuple[List[int], List[int], List[Tuple[str, str]]]:
+    """(змінені, додані) — номери суфіксів нового входу в порядку першої появи; вилучені — (ключ, суфікс)."""
+    changed: List[int] = []
+    added: List[int] = []
+    for s, sid in fp.suffix_ids.items():
+        prev = old.get(s)
+        if prev is None:
+            added.append(sid)
+        elif prev[1] != fp.digests[sid]:
+            changed.append(sid)
+    removed = [(key, s) for s, (key, _) in old.items() if s not in fp.suffix_ids]
+    return changed, added, removed
+
+
+def run_fingerprint_diff(path: str, sidecar: str, with_context: bool, update: bool = True):
+    started = time.perf_counter()
+    fp = fingerprint_input(path, with_context)
+    print("=== Зміни source за відбитками ===")
+    print(f"Вхід: {path} ({len(fp.digests)} суфіксів)")
+    print(f"Відбитки: {sidecar}")
+    if not os.path.isfile(sidecar):
+        print("Попередніх відбитків немає — це базова версія, звіт змін не створено.")
+    else:
+        old_context, old = read_fingerprints(sidecar)
+        if old_context != with_context:
+            print("ERROR: відбитки створені " + ("з" if old_context else "без") +
+                  " --with-context; запустіть з тим самим режимом", file=sys.stderr)
+            sys.exit(2)
+        changed, added, removed = diff_fingerprints(old, fp)
+        print(f"Змінено source: {len(changed)}, додано: {len(added)}, вилучено: {len(removed)} "
+              f"(з {len(old)} попередніх суфіксів)")
+        out_dir = os.path.dirname(os.path.abspath(__file__))
+        header = fp.header or list(CSV_HEADER)
+        written = []
+        for title, sids in (("Changed source.csv", changed), ("Added keys.csv", added)):
+            out_path = os.path.join(out_dir, title)
+            with open(out_path, "w", newline="", encoding="utf-8") as f:
+                w = csv.writer(f)
+                w.writerow(header)
+                for sid in sids:
+                    w.writerow(fp.first_rows.values(sid))
+            written.append(out_path)
+        out_path = os.path.join(out_dir, "Removed keys.csv")
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["key", "suffix"])
+            w.writerows(removed)
+        written.append(out_path)
+        print("Створені файли:")
+        for out_path in written:
+            print(f"  {out_path}")
+    if update:
+        write_fingerprints(sidecar, fp)
+        print("Відбитки оновлено.")
+    print(f"Час: {time.perf_counter() - started:.2f} с")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Порівняння ключів двох CSV-файлів (колонка 'key').")
-    parser.add_argument("a", nargs="?", help="Шлях до першого CSV-файлу")
-    parser.add_argument("b", nargs="?", help="Шлях до другого CSV-файлу")
+    parser.add_argument("a", nargs="?", help="Шлях до першого CSV-файлу (або теки з JSON-експортами)")
+    parser.add_argument("b", nargs="?", help="Шлях до другого CSV-файлу (або теки з JSON-експортами)")
+    parser.add_argument("more", nargs="*", help="Ще входи: з трьома й більше — N-way порівняння")
     parser.add_argument("--a", dest="a_named", help="Шлях до першого CSV-файлу (іменований)")
     parser.add_argument("--b", dest="b_named", help="Шлях до другого CSV-файлу (іменований)")
+    parser.add_argument("--external-sort", action="store_true",
+                        help="Зовнішнє сортування на диску з обмеженою пам'яттю (для мільйонів рядків).")
+    parser.add_argument("--run-rows", type=int, default=EXTERNAL_RUN_ROWS,
+                        help="Скільки записів тримати в пам'яті на одну порцію зовнішнього сортування.")
+    parser.add_argument("--tmp-dir", help="Тека для тимчасових порцій --external-sort (типово системна).")
+    parser.add_argument("--nway", action="store_true",
+                        help="N-way звіт (матриця присутності, Only in/Missing from) навіть для двох входів.")
+    parser.add_argument("--fingerprints", nargs="?", const="", default=None,
+                        help="Зміни source одного входу проти sidecar-відбитків попереднього запуску. "
+                             "Без значення — <вхід>.fp.sqlite поруч із входом.")
+    parser.add_argument("--with-context", action="store_true",
+                        help="З --fingerprints: враховувати у відбитку також context.")
+    parser.add_argument("--no-update", action="store_true",
+                        help="З --fingerprints: лише звіт, не перезаписувати відбитки.")
     args = parser.parse_args()
 
     path_a = args.a_named or args.a
     path_b = args.b_named or args.b
 
+    if args.fingerprints is not None:
+        if not path_a or path_b or args.more:
+            parser.error("--fingerprints порівнює один вхід із його відбитками: вкажіть рівно один шлях")
+        path_a = os.path.abspath(path_a)
+        if not os.path.isfile(path_a) and not os.path.isdir(path_a):
+            print(f"ERROR: Файл не знайдено: {path_a}", file=sys.stderr)
+            sys.exit(2)
+        sidecar = os.path.abspath(args.fingerprints or path_a.rstrip("\\/") + ".fp.sqlite")
+        run_fingerprint_diff(path_a, sidecar, args.with_context, update=not args.no_update)
+        return
+
     # If not provided, open GUI dialogs to select files
     if (not path_a or not path_b) and filedialog is not None:
         start_dir = os.path.dirname(os.path.abspath(__file__))
@@ -84,13 +713,13 @@ def main():
             path_a = filedialog.askopenfilename(
                 title="Оберіть перший CSV (A)",
                 initialdir=start_dir,
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                filetypes=[("CSV files", "*.csv"), ("SQLite", "*.sqlite *.db"), ("All files", "*.*")],
             ) or None
         if not path_b:
             path_b = filedialog.askopenfilename(
                 title="Оберіть другий CSV (B)",
                 initialdir=start_dir,
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                filetypes=[("CSV files", "*.csv"), ("SQLite", "*.sqlite *.db"), ("All files", "*.*")],
             ) or None
         if root is not None:
             try:
@@ -109,14 +738,14 @@ def main():
     path_a = os.path.abspath(path_a)
     path_b = os.path.abspath(path_b)
 
-    if not os.path.isfile(path_a):
+    if not os.path.isfile(path_a) and not os.path.isdir(path_a):
         print(f"ERROR: Файл не знайдено: {path_a}", file=sys.stderr)
         try:
             input("\nНатисніть Enter, щоб вийти...")
         except EOFError:
             pass
         sys.exit(2)
-    if not os.path.isfile(path_b):
+    if not os.path.isfile(path_b) and not os.path.isdir(path_b):
         print(f"ERROR: Файл не знайдено: {path_b}", file=sys.stderr)
         try:
             input("\nНатисніть Enter, щоб вийти...")
@@ -124,54 +753,52 @@ def main():
             pass
         sys.exit(2)
 
-    header_a, entries_a = read_csv_entries(path_a)
-    header_b, entries_b = read_csv_entries(path_b)
-    keys_a: Set[str] = {k for k, _ in entries_a if k}
-    keys_b: Set[str] = {k for k, _ in entries_b if k}
-    rows_a = len([1 for k, _ in entries_a if k])
-    rows_b = len([1 for k, _ in entries_b if k])
-
-    # Побудувати мапи за суфіксом ключа (частина після '::')
-    a_by_suffix: Dict[str, Tuple[str, List[str]]] = {}
-    for k, row in entries_a:
-        if not k:
-            continue
-        _, s = split_key(k)
-        if s not in a_by_suffix:
-            a_by_suffix[s] = (k, row)
-    b_by_suffix: Dict[str, Tuple[str, List[str]]] = {}
-    for k, row in entries_b:
-        if not k:
-            continue
-        _, s = split_key(k)
-        if s not in b_by_suffix:
-            b_by_suffix[s] = (k, row)
-
-    # Порівнювати за суфіксами: збіг — якщо суфікс однаковий, навіть якщо префікси різні
-    suffixes_a = set(a_by_suffix.keys())
-    suffixes_b = set(b_by_suffix.keys())
-    common_suffixes = sorted(suffixes_a & suffixes_b)
-    only_suffix_in_a = sorted(suffixes_a - suffixes_b)
-    only_suffix_in_b = sorted(suffixes_b - suffixes_a)
+    if args.more or args.nway:
+        paths = [path_a, path_b] + [os.path.abspath(p) for p in args.more]
+        for path in paths[2:]:
+            if not os.path.isfile(path) and not os.path.isdir(path):
+                print(f"ERROR: Файл не знайдено: {path}", file=sys.stderr)
+                try:
+                    input("\nНатисніть Enter, щоб вийти...")
+                except EOFError:
+                    pass
+                sys.exit(2)
+        run_nway(paths)
+        try:
+            input("\nГотово. Натисніть Enter, щоб закрити...")
+        except EOFError:
+            pass
+        return
+
+    tmp = None
+    if args.external_sort:
+        if args.tmp_dir:
+            os.makedirs(args.tmp_dir, exist_ok=True)
+        tmp = tempfile.TemporaryDirectory(prefix="compare_csv_keys_", dir=args.tmp_dir)
+        comparison = compare_external(path_a, path_b, tmp.name, max(1, args.run_rows))
+    elif is_output_db(path_a) and is_output_db(path_b):
+        comparison = compare_databases(path_a, path_b)
+    else:
+        comparison = compare_stores(*read_store(path_a), *read_store(path_b))
 
     print("=== Порівняння ключів CSV ===")
     print(f"A: {path_a}")
     print(f"B: {path_b}")
-    print(f"Рядків (A): {rows_a}, унікальних ключів (A): {len(keys_a)}")
-    print(f"Рядків (B): {rows_b}, унікальних ключів (B): {len(keys_b)}")
+    print(f"Рядків (A): {comparison.rows_a}, унікальних ключів (A): {comparison.unique_a}")
+    print(f"Рядків (B): {comparison.rows_b}, унікальних ключів (B): {comparison.unique_b}")
     print("")
 
-    print(f"Ключі лише у A (за суфіксами) ({len(only_suffix_in_a)}):")
-    for s in only_suffix_in_a:
-        print(a_by_suffix[s][0])
+    print(f"Ключі лише у A (за суфіксами) ({len(comparison.only_a)}):")
+    for key in comparison.only_a:
+        print(key)
     print("")
 
-    print(f"Ключі лише у B (за суфіксами) ({len(only_suffix_in_b)}):")
-    for s in only_suffix_in_b:
-        print(b_by_suffix[s][0])
+    print(f"Ключі лише у B (за суфіксами) ({len(comparison.only_b)}):")
+    for key in comparison.only_b:
+        print(key)
     print("")
 
-    print(f"Спільні ключі (перетин за суфіксами) — довідково ({len(common_suffixes)}):")
+    print(f"Спільні ключі (перетин за суфіксами) — довідково ({comparison.common}):")
     # За замовчуванням не друкуємо весь перелік, щоб не засмічувати вивід.
     # Розкоментуйте, щоб побачити всі спільні ключі:
     # for k in in_both:
@@ -185,43 +812,22 @@ def main():
     out_a_only = os.path.join(out_dir, f"Only {a_base}.csv")
     out_b_only = os.path.join(out_dir, f"Only {b_base}.csv")
 
-    def write_only(path_out: str, header: Optional[List[str]], entries: List[Tuple[str, List[str]]], allowed_suffixes: Set[str]):
-        with open(path_out, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            if header is not None:
-                w.writerow(header)
-            for key, row in entries:
-                if not key:
-                    continue
-                _, s = split_key(key)
-                if s in allowed_suffixes:
-                    w.writerow(row)
-
-    def write_common_with_b_prefix(path_out: str, header: Optional[List[str]]):
+    def write_rows(path_out: str, header: Optional[List[str]], rows: Iterator[List[str]]):
         with open(path_out, "w", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
             if header is not None:
                 w.writerow(header)
-            # Порядок як у A; ключ беремо ПОВНІСТЮ з B (і префікс, і суфікс від другого файлу)
-            for key_a, row_a in entries_a:
-                if not key_a:
-                    continue
-                _, s = split_key(key_a)
-                if s in b_by_suffix:
-                    key_b, _ = b_by_suffix[s]
-                    new_key = key_b
-                    # замінити першу колонку у рядку A на new_key
-                    out_row = list(row_a)
-                    if out_row:
-                        out_row[0] = new_key
-                    w.writerow(out_row)
+            for row in rows:
+                w.writerow(row)
 
     # 1) Спільні рядки (порядок як у A), ключ береться з префіксом із B при наявності
-    write_common_with_b_prefix(out_common, header_a)
+    write_rows(out_common, comparison.header_a, comparison.common_rows())
     # 2) Лише у A (за суфіксами)
-    write_only(out_a_only, header_a, entries_a, set(only_suffix_in_a))
+    write_rows(out_a_only, comparison.header_a, comparison.only_a_rows())
     # 3) Лише у B (за суфіксами)
-    write_only(out_b_only, header_b, entries_b, set(only_suffix_in_b))
+    write_rows(out_b_only, comparison.header_b, comparison.only_b_rows())
+    if tmp is not None:
+        tmp.cleanup()
 
     print("")
     print("Створені файли:")
@@ -238,5 +844,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
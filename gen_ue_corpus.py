@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gen_ue_corpus.py
+Генерує синтетичне дерево JSON-експортів у форматі FModel/CUE4Parse для бенчмарків і
+перевірок parse_json_to_csv.py: DialogAsset (Lines зі Speaker), DataTable (Rows з TableId),
+UserDefinedEnum, StringTable (KeysToEntries), байткод з EX_TextConst/EX_StringConst,
+віджети з властивостями і меші без тексту.
+
+Використання:
+  python gen_ue_corpus.py OUT_DIR --files 2000 --depth 3 --mix dialog=2,datatable=1,mesh=6
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+ASSET_KINDS = ("dialog", "datatable", "stringtable", "enum", "bytecode", "widget", "mesh")
+DEFAULT_MIX = {"dialog": 2, "datatable": 2, "stringtable": 1, "enum": 1, "bytecode": 2, "widget": 2, "mesh": 6}
+
+WORDS = ["Door", "Access", "Denied", "Доступ", "заборонено", "Шодан", "Цитадель", "Меню", "Health", "Ammo",
+         "Ї ґ є", "\"quoted\"", "line\nbreak", "comma, sep"]
+
+
+# ---------------- Дрібні значення ----------------
+def random_text(rnd):
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4)))
+
+
+def random_hex_key(rnd):
+    return "".join(rnd.choice("0123456789ABCDEF") for _ in range(32))
+
+
+def object_path(rnd, name):
+    return f"/Game/UnleashedPrototype/Content/Dir{rnd.randint(0, 3)}/{name}.{rnd.randint(0, 9)}"
+
+
+def ftext(rnd, namespace=None, key=None, table_id=None):
+    """FText-блок: Namespace/Key або TableId/Key, SourceString і (зазвичай) LocalizedString."""
+    block = {}
+    if table_id:
+        block["TableId"] = table_id
+    if namespace is not None:
+        block["Namespace"] = namespace
+    block["Key"] = key if key is not None else random_hex_key(rnd)
+    source = random_text(rnd)
+    block["SourceString"] = source
+    block["LocalizedString"] = source if rnd.random() < 0.7 else random_text(rnd)
+    return block
+
+
+def nest(rnd, value, depth):
+    """Загортає value у depth рівнів проміжних dict/list без тексту (глибина дерева)."""
+    for level in range(depth):
+        if rnd.random() < 0.5:
+            value = {"Outer": f"Level{level}", "Inner": value}
+        else:
+            value = [{"Padding": level}, value]
+    return value
+
+
+# ---------------- Експорти ----------------
+def dialog_asset(rnd, name, rows):
+    lines = []
+    for i in range(rnd.randint(1, rows)):
+        if rnd.random() < 0.5:
+            speaker = {"ObjectName": "Char", "ObjectPath": object_path(rnd, f"Char{i}")}
+        else:
+            speaker = {"AssetPathName": "/Game/Chars/Diego.Diego"}
+        lines.append({"Speaker": speaker, "DialogueText": ftext(rnd, namespace=rnd.choice(["", "Dlg", None]))})
+    return {"Type": "DialogAsset", "Name": name, "Properties": {"Lines": lines}}
+
+
+def data_table(rnd, name, rows, st_keys):
+    table_rows = {}
+    for i in range(rnd.randint(1, rows)):
+        row = {}
+        for field in ("Name", "Description"):
+            if st_keys and rnd.random() < 0.6:
+                row[field] = {"TableId": "/Game/ST/ST_Data.ST_Data", "Key": rnd.choice(st_keys),
+                              "SourceString": random_text(rnd), "LocalizedString": random_text(rnd)}
+            else:
+                row[field] = ftext(rnd, namespace=rnd.choice(["", "DT", None]), table_id=rnd.choice([None, "/Game/ST/Tbl.Tbl"]))
+        table_rows[f"Row{i}"] = row
+    return {"Type": "DataTable", "Name": name, "Rows": table_rows}
+
+
+def string_table(rnd, name, rows, st_keys):
+    keys = [f"{name}.K{i}" for i in range(rnd.randint(1, rows))]
+    st_keys.extend(keys)
+    return {"Type": "StringTable", "Name": name,
+            "StringTable": {"TableNamespace": rnd.choice([f"ST_{name}", "", "Shared"]),
+                            "KeysToEntries": {k: random_text(rnd) for k in keys}}}
+
+
+def user_defined_enum(rnd, name, rows):
+    names = [{"Key": f"{name}::NewEnumerator{i}", "Value": ftext(rnd, namespace=rnd.choice(["", "UE"]))}
+             for i in range(rnd.randint(1, rows))]
+    return {"Type": "UserDefinedEnum", "Name": name, "Properties": {"DisplayNameMap": names}}
+
+
+def bytecode_function(rnd, name, rows, st_keys):
+    code = []
+    for i in range(rnd.randint(1, rows)):
+        c = rnd.random()
+        if c < 0.4:
+            code.append({"StatementIndex": i, "Inst": "EX_Let", "Expression": {"Inst": "EX_TextConst", "Value": {
+                "SourceString": {"Inst": "EX_StringConst", "Value": random_text(rnd)},
+                "KeyString": {"Inst": "EX_StringConst", "Value": random_hex_key(rnd)},
+                "Namespace": {"Inst": "EX_StringConst", "Value": rnd.choice(["", "BP"])}}}})
+        elif c < 0.6:
+            code.append({"StatementIndex": i, "Inst": "EX_TextConst", "Value": {
+                "SourceString": random_text(rnd),
+                "KeyString": rnd.choice(st_keys) if st_keys else random_hex_key(rnd),
+                "Namespace": ""}})
+        elif c < 0.8:
+            code.append({"StatementIndex": i, "Inst": "EX_StringConst", "Value": "x", "Nested": {"SourceString": "y"}})
+        else:
+            code.append({"StatementIndex": i, "Inst": "EX_CallMath",
+                         "Parameters": [{"Inst": "EX_IntConst", "Value": rnd.randint(0, 9)} for _ in range(3)]})
+    return {"Type": "Function", "Name": name, "ScriptBytecode": code}
+
+
+def widget(rnd, name, st_keys):
+    props = {"DisplayName": ftext(rnd, namespace=rnd.choice(["", "UI"])), "Tooltip": ftext(rnd, namespace="UI")}
+    if st_keys:
+        props["Label"] = {"TableId": "/Game/ST/ST_UI.ST_UI", "Key": rnd.choice(st_keys),
+                          "SourceString": random_text(rnd), "LocalizedString": random_text(rnd)}
+        props["Plain"] = {"SelectedKeyName": rnd.choice(st_keys), "SourceString": random_text(rnd)}
+    props["Template"] = {"Owner": f"/Game/UnleashedPrototype/Content/UI/{name}.{rnd.randint(0, 5)}",
+                         "Inner": {"Caption": ftext(rnd)}}
+    return {"Type": "WidgetBlueprintGeneratedClass", "Name": name, "Properties": props}
+
+
+def static_mesh(rnd, name, mesh_size):
+    # Guid — зокрема цілі поза int64, які прискорені JSON-декодери розбирають інакше
+    return {"Type": "StaticMesh", "Name": name,
+            "Guid": rnd.choice([12345678901234567890123, -9223372036854775809, 7]),
+            "Vertices": [[rnd.uniform(-1e3, 1e3) for _ in range(3)] for _ in range(mesh_size)],
+            "Materials": [{"ObjectName": "M", "ObjectPath": "/Game/M.0"}]}
+
+
+def make_export(rnd, kind, name, st_keys, rows=6, mesh_size=200):
+    """Список експортів одного файлу заданого виду (як у FModel: масив об'єктів верхнього рівня)."""
+    if kind == "dialog":
+        return [dialog_asset(rnd, name, rows)]
+    if kind == "datatable":
+        return [data_table(rnd, name, rows, st_keys)]
+    if kind == "stringtable":
+        return [string_table(rnd, name, rows, st_keys)]
+    if kind == "enum":
+        return [user_defined_enum(rnd, "E_" + name, rows)]
+    if kind == "bytecode":
+        return [bytecode_function(rnd, name, rows, st_keys), bytecode_function(rnd, name + "_Ubergraph", rows, st_keys)]
+    if kind == "widget":
+        return [widget(rnd, name, st_keys)]
+    if kind == "mesh":
+        return [static_mesh(rnd, name, mesh_size)]
+    raise ValueError(f"невідомий вид ассету {kind!r}")
+
+
+def parse_mix(text):
+    """'dialog=2,mesh=6' -> {'dialog': 2, 'mesh': 6}; порожній рядок — DEFAULT_MIX."""
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ASSET_KINDS:
+            raise ValueError(f"невідомий вид ассету {kind!r} (доступні: {', '.join(ASSET_KINDS)})")
+        mix[kind] = float(weight) if weight else 1.0
+    return mix
+
+
+# ---------------- Запис корпусу ----------------
+def write_corpus(out_dir, files, seed=1, depth=0, mix=None, rows=6, mesh_size=200, bom_ratio=0.2, crlf_ratio=0.2):
+    """
+    Пише files JSON-файлів у out_dir/UnleashedPrototype/Content/<тека>/. Частина файлів — з BOM
+    (utf-8-sig) або '\\r\\n', кирилиця — як є або через \\u-екранування, відступи різні.
+    Кожен експорт загорнутий у depth рівнів проміжних вузлів. Повертає out_dir.
+    """
+    rnd = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    content = os.path.join(out_dir, "UnleashedPrototype", "Content")
+    st_keys = []
+    for i in range(files):
+        kind = rnd.choices(kinds, weights)[0]
+        folder = os.path.join(content, rnd.choice(["Core", "UI", "Maps", "Audio"]), rnd.choice(["A", "b", "C"]))
+        os.makedirs(folder, exist_ok=True)
+        exports = make_export(rnd, kind, f"{kind}_{i}", st_keys, rows, mesh_size)
+        data = [nest(rnd, export, depth) for export in exports] if depth else exports
+        text = json.dumps(data, indent=rnd.choice([None, 2]), ensure_ascii=rnd.random() < 0.3)
+        if rnd.random() < crlf_ratio:
+            text = text.replace("\n", "\r\n")
+        encoding = "utf-8-sig" if rnd.random() < bom_ratio else "utf-8"
+        with open(os.path.join(folder, f"{kind}_{i}.json"), "w", encoding=encoding, newline="") as f:
+            f.write(text)
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетичний корпус JSON-експортів UE для parse_json_to_csv.py")
+    parser.add_argument("out", help="Тека, куди писати корпус")
+    parser.add_argument("--files", type=int, default=1000, help="Кількість JSON-файлів")
+    parser.add_argument("--depth", type=int, default=0, help="Додаткова глибина вкладення кожного експорту")
+    parser.add_argument("--mix", default="", help=f"Ваги видів ассетів, напр. dialog=2,mesh=6 (види: {', '.join(ASSET_KINDS)})")
+    parser.add_argument("--rows", type=int, default=6, help="Найбільша кількість рядків/ліній/інструкцій в ассеті")
+    parser.add_argument("--mesh-size", type=int, default=200, help="Кількість вершин у мешах (об'єм файлів без тексту)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    write_corpus(args.out, args.files, args.seed, args.depth, mix, args.rows, args.mesh_size)
+    print(f"Записано {args.files} файлів у {os.path.abspath(args.out)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
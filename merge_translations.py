@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+merge_translations.py
+
+Заповнює порожню колонку Translation у результаті parse_json_to_csv.py з перекладацької пам'яті
+(таблиця key/source/Translation, напр. "System Shock Remake.xlsx - Переклад.csv"):
+ 1. збіг за ключем (суфікс після '::', як у compare_csv_keys.py), якщо source не змінився;
+ 2. збіг за точним текстом source;
+ 3. для решти — нечіткі кандидати з інвертованого індексу триграм (схожість Дайса не нижче
+    порогу); вони не вписуються в Translation, а пишуться окремим файлом для перекладачів.
+Рядки, що вже мають переклад, не змінюються.
+
+Використання:
+  python merge_translations.py parsed.csv [--memory "Переклад.csv"] [-o merged.csv]
+                               [--candidates merged.fuzzy.csv] [--threshold 0.75] [--top 3]
+  замість CSV можна вказати базу --format sqlite або теку з JSON-експортами.
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from compare_csv_keys import iter_input_rows, split_key
+from parse_json_to_csv import CSV_HEADER, discard_file
+
+DEFAULT_MEMORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "System Shock Remake.xlsx - Переклад.csv")
+DEFAULT_THRESHOLD = 0.75
+DEFAULT_TOP = 3
+NGRAM = 3
+
+
+# ---------------- Перекладацька пам'ять ----------------
+class MemoryEntry(NamedTuple):
+    key: str
+    source: str
+    translation: str
+
+
+def read_memory(path: str) -> List[MemoryEntry]:
+    """Записи пам'яті з непорожнім перекладом; колонки key, source, Translation (решта ігнорується)."""
+    _, rows = iter_input_rows(path)
+    entries = []
+    for row in rows:
+        if len(row) < 3 or not row[2].strip():
+            continue
+        entries.append(MemoryEntry(row[0].strip(), row[1], row[2]))
+    return entries
+
+
+def ngrams(text: str, n: int = NGRAM) -> frozenset:
+    """Множина символьних n-грам нормалізованого тексту (нижній регістр, пробіли стиснуті, з полями)."""
+    text = " ".join(text.lower().split())
+    if not text:
+        return frozenset()
+    text = f" {text} "
+    if len(text) <= n:
+        return frozenset((text,))
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class NgramIndex:
+    """
+    Інвертований індекс n-грам source пам'яті. Пошук не порівнює запит з усіма записами:
+    кандидати беруться лише зі списків найрідших n-грам запиту (префіксний фільтр — запис зі
+    схожістю Дайса >= t мусить мати хоча б одну з них), далі фільтр за довжиною і точний підрахунок.
+    """
+
+    def __init__(self, texts: Iterable[str], n: int = NGRAM):
+        self.n = n
+        self.grams: List[frozenset] = []
+        self.postings: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            grams = ngrams(text, n)
+            self.grams.append(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+        self.candidates_checked = 0
+
+    def search(self, text: str, threshold: float, top: int) -> List[Tuple[float, int]]:
+        """До top пар (схожість, номер запису) зі схожістю >= threshold, найкращі першими."""
+        query = ngrams(text, self.n)
+        size = len(query)
+        if not size:
+            return []
+        postings = self.postings
+        # спільних n-грам потрібно щонайменше t*|A|/(2-t) — досить перших |A|-min+1 найрідших
+        min_overlap = max(1, math.ceil(threshold * size / (2 - threshold) - 1e-9))
+        rare = sorted(query, key=lambda gram: len(postings.get(gram, ())))[:size - min_overlap + 1]
+        candidates = set()
+        for gram in rare:
+            candidates.update(postings.get(gram, ()))
+        low = threshold * size / (2 - threshold)
+        high = size * (2 - threshold) / threshold
+        found = []
+        for index in candidates:
+            grams = self.grams[index]
+            if not low <= len(grams) <= high:
+                continue
+            self.candidates_checked += 1
+            score = 2 * len(query & grams) / (size + len(grams))
+            if score >= threshold:
+                found.append((score, index))
+        found.sort(key=lambda item: (-item[0], item[1]))
+        return found[:top]
+
+
+# ---------------- Злиття ----------------
+class MergeStats:
+    def __init__(self):
+        self.rows = 0
+        self.existing = 0
+        self.by_key = 0
+        self.by_source = 0
+        self.stale_key = 0
+        self.fuzzy = 0
+        self.unmatched = 0
+        self.fuzzy_candidates = 0
+
+    def report(self, memory_size: int, elapsed: float, checked: int):
+        def rate(count):
+            return f"{count} ({100.0 * count / self.rows:.1f}%)" if self.rows else str(count)
+
+        filled = self.by_key + self.by_source
+        print(f"Пам'ять: {memory_size} записів з перекладом")
+        print(f"Рядків: {self.rows}")
+        print(f"  вже перекладено: {rate(self.existing)}")
+        print(f"  за ключем: {rate(self.by_key)}")
+        print(f"  за точним source: {rate(self.by_source)}")
+        print(f"  лише нечіткі кандидати: {rate(self.fuzzy)} ({self.fuzzy_candidates} кандидатів)")
+        print(f"  без збігу: {rate(self.unmatched)}")
+        print(f"Заповнено: {rate(filled)}; ключ є в пам'яті, але source змінився: {self.stale_key}")
+        print(f"Нечіткий пошук: перевірено {checked} кандидатів; час: {elapsed:.2f} с")
+
+
+def merge_rows(rows: Iterable[List[str]], memory: List[MemoryEntry], index: NgramIndex, stats: MergeStats,
+               threshold: float = DEFAULT_THRESHOLD, top: int = DEFAULT_TOP,
+               candidates_out=None) -> Iterable[List[str]]:
+    """
+    Генерує рядки з заповненим Translation. Для рядків без точного збігу пише в candidates_out
+    (csv.writer) по рядку на кандидата: key, source, схожість, key/source/Translation з пам'яті.
+    """
+    by_key: Dict[str, int] = {}
+    by_source: Dict[str, int] = {}
+    for i, entry in enumerate(memory):
+        by_key.setdefault(split_key(entry.key)[1], i)
+        by_source.setdefault(entry.source, i)
+    fuzzy_cache: Dict[str, List[Tuple[float, int]]] = {}
+    for row in rows:
+        key = row[0].strip()
+        if not key:
+            yield row
+            continue
+        stats.rows += 1
+        if len(row) < 3:
+            row = row + [""] * (3 - len(row))
+        source = row[1]
+        if row[2].strip():
+            stats.existing += 1
+            yield row
+            continue
+        hit = by_key.get(split_key(key)[1])
+        if hit is not None and memory[hit].source == source:
+            stats.by_key += 1
+            row[2] = memory[hit].translation
+            yield row
+            continue
+        if hit is not None:
+            stats.stale_key += 1
+        hit = by_source.get(source)
+        if hit is not None:
+            stats.by_source += 1
+            row[2] = memory[hit].translation
+            yield row
+            continue
+        found = fuzzy_cache.get(source)
+        if found is None:
+            found = fuzzy_cache[source] = index.search(source, threshold, top) if source.strip() else []
+        if found:
+            stats.fuzzy += 1
+            stats.fuzzy_candidates += len(found)
+            if candidates_out is not None:
+                for score, i in found:
+                    entry = memory[i]
+                    candidates_out.writerow([key, source, f"{score:.3f}", entry.key, entry.source, entry.translation])
+        else:
+            stats.unmatched += 1
+        yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заповнення Translation з перекладацької пам'яті (ключ, source, нечіткі кандидати).")
+    parser.add_argument("input", help="CSV parse_json_to_csv.py (або база --format sqlite / тека з JSON-експортами)")
+    parser.add_argument("--memory", default=DEFAULT_MEMORY, help="CSV пам'яті з колонками key, source, Translation")
+    parser.add_argument("-o", "--out", default="merged.csv", help="Куди писати CSV з заповненим Translation")
+    parser.add_argument("--candidates", help="CSV нечітких кандидатів (типово <out>.fuzzy.csv)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Найменша схожість Дайса за триграмами для нечіткого кандидата (0..1]")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Скільки нечітких кандидатів на рядок")
+    args = parser.parse_args()
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold має бути в межах (0, 1]")
+    for path in (args.input, args.memory):
+        if not os.path.isfile(path) and not os.path.isdir(path):
+            print(f"ERROR: Файл не знайдено: {path}", file=sys.stderr)
+            sys.exit(2)
+    candidates_path = args.candidates or os.path.splitext(args.out)[0] + ".fuzzy.csv"
+
+    started = time.perf_counter()
+    memory = read_memory(args.memory)
+    index = NgramIndex(entry.source for entry in memory)
+    header, rows = iter_input_rows(args.input)
+    stats = MergeStats()
+    tmp_out = args.out + ".tmp"
+    tmp_candidates = candidates_path + ".tmp"
+    # обидва файли пишуться поруч і замінюють готові лише після успішного злиття
+    try:
+        with open(tmp_out, "w", newline="", encoding="utf-8") as f, \
+                open(tmp_candidates, "w", newline="", encoding="utf-8") as fc:
+            writer = csv.writer(f)
+            writer.writerow(header or CSV_HEADER)
+            candidates_out = csv.writer(fc)
+            candidates_out.writerow(["key", "source", "similarity", "memory_key", "memory_source", "memory_translation"])
+            writer.writerows(merge_rows(rows, memory, index, stats, args.threshold, args.top, candidates_out))
+        os.replace(tmp_out, args.out)
+        os.replace(tmp_candidates, candidates_path)
+    except BaseException:
+        discard_file(tmp_out)
+        discard_file(tmp_candidates)
+        raise
+
+    print("=== Злиття з перекладацькою пам'яттю ===")
+    stats.report(len(memory), time.perf_counter() - started, index.candidates_checked)
+    print(f"Результат: {os.path.abspath(args.out)}")
+    print(f"Нечіткі кандидати: {os.path.abspath(candidates_path)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
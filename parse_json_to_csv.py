@@ -11,16 +11,76 @@ parse_json_to_csv.py
   на перше місце в context для всіх типів рядків.
 - збережено попередній функціонал: StringTable-збір, DataTable, UserDefinedEnum,
   Script EX_TextConst, властивості на одному рівні, уникнення дублікатів, drag&drop, чекання Enter.
+- однопрохідний рушій: кожен JSON читається і декодується один раз (StringTable-мапа і
+  кандидати збираються разом), підбір namespace і запис CSV — окремою фазою з пам'яті;
+- --jobs N: паралельний розбір файлів у пулі процесів з детермінованим злиттям у порядку обходу;
+- підбір StringTable-namespace через індекс хвостів ключа замість лінійного перебору key_to_ns;
+- --cache: інкрементальний SQLite-кеш розбору за відбитком файлу (розмір, mtime, опційно sha1);
+- ітеративний обхід з кадрами NodeFrame (найближчі DialogAsset/DataTable/UserDefinedEnum, TableId,
+  ObjectPath, ключ) замість копіювання ancestry на кожному рівні;
+- номер рядка SourceString шукається лише для повідомлення про помилку (bisect по зсувах '\n');
+- потоковий розбір великих файлів (--stream-threshold): масиви декодуються поелементно з mmap;
+- байтовий префільтр: файли без SourceString/StringTable не декодуються (--no-prefilter вимикає),
+  решта декодується прямо з mmap;
+- --json-backend: orjson/simdjson, якщо встановлені (з поверненням до stdlib на будь-якій їхній помилці);
+- --stats: час етапів (wall/CPU), вузли, рядки й дублікати за обробниками, найповільніші файли,
+  JSON-звіт; --profile-file — cProfile розбору одного файлу;
+- --watch: стан розбору лишається в пам'яті, змінені JSON розбираються повторно, CSV переписується атомарно;
+- iter_rows(roots, ...): ті самі рядки як ExtractedRow (key, source, translation, context, path, kind)
+  для використання з інших скриптів без запису і повторного читання CSV;
+- RowStore: компактне сховище рядків (ключі й тексти в суцільних UTF-8 буферах, інтерновані частини
+  context, шляхи й види), context збирається при читанні; однакові context одного файлу — один рядок;
+- --format sqlite: рядки в індексованій базі (key, суфікс ключа, source, нормалізована таблиця ассетів),
+  вставка пакетами в одній транзакції.
+- маніфест файлів: один обхід тек на запуск пулом потоків os.scandir (той самий порядок, що й
+  sorted_walk) з (size, mtime) кожного файлу для кешу і --watch; --manifest зберігає його між запусками.
+- реєстр обробників (HANDLER_REGISTRY): ланцюжок обробників вибирається одним пошуком за Type
+  ассету-предка і формою вузла; нові класи ассетів реєструються без зміни основного циклу.
+- відсікання піддерев без тексту (--prune, --prune-config): типовий профіль lossless пропускає лише
+  масиви скалярів (без втрат); --prune ue додатково не заходить у ключі на кшталт Vertices/RenderData
+  і ассети StaticMesh/AnimSequence; --verify-prune порівнює результат з відсіканням і без, --stats
+  показує, на скільки менше вузлів обійдено.
+- запис результату у фоновому потоці з обмеженою чергою пакетів і великим буфером; --format jsonl,
+  стиснення gzip/lzma за розширенням (.gz/.xz); при помилці готовий файл не замінюється, рядки до
+  неї лишаються у <out>.partial.csv, а будь-яка помилка (не лише RuntimeError) повідомляється.
 """
 
 import argparse
+import bisect
+import cProfile
 import csv
+import gzip
+import hashlib
+import io
 import json
+import lzma
 import os
+import mmap
+import pstats
+import queue
 import re
+import sqlite3
 import sys
+import threading
+import time
+from array import array
+from collections import Counter, namedtuple
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
 try:
     import tkinter as tk
     from tkinter import filedialog
@@ -35,79 +95,495 @@ def sorted_walk(top):
         files.sort(key=lambda s: s.lower())
         yield root, dirs, files
 
-def find_source_nodes(obj, parent=None, parent_key=None, ancestry=None):
-    if ancestry is None:
-        ancestry = []
-    if isinstance(obj, dict):
-        # 1. Якщо є "Expression" з EX_TextConst, беремо всю "Value"
-        expr = obj.get('Expression')
-        if (
-            isinstance(expr, dict) and expr.get('Inst') == 'EX_TextConst'
-            and isinstance(expr.get('Value'), dict)
-            and all(k in expr['Value'] for k in ("SourceString", "KeyString", "Namespace"))
-        ):
-            yield expr['Value'], expr, 'Value', ancestry.copy()
-        # 2. EX_TextConst вузол безпосередньо
-        elif (
-            obj.get("Inst") == "EX_TextConst" and isinstance(obj.get("Value"), dict)
-            and all(k in obj["Value"] for k in ("SourceString", "KeyString", "Namespace"))
-        ):
-            yield obj["Value"], obj, "Value", ancestry.copy()
-        # !!! ОНОВЛЕНО: не yield окремо SourceString, якщо parent має KeyString і Namespace (це частина EX_TextConst)
-        elif (
-            "SourceString" in obj and parent
-            and isinstance(parent, dict)
-            and ("KeyString" in parent and "Namespace" in parent)
-        ):
-            pass
-        # !!! Ще суворіше: не yield SourceString якщо ancestry (на всіх рівнях крім self) містить dict з KeyString і Namespace
-        elif (
-            "SourceString" in obj
-            and any(
-                isinstance(a_obj, dict)
-                and "KeyString" in a_obj and "Namespace" in a_obj
-                for a_obj, _ in ancestry[:-1]
-            )
-        ):
-            pass  # Пропускаємо такі вузли!
-        # !!! Абсолютний фільтр: не yield якщо parent EX_StringConst
-        elif (
-            "SourceString" in obj and parent
-            and isinstance(parent, dict)
-            and parent.get("Inst") == "EX_StringConst"
-        ):
-            pass
-        # 3. SourceString+KeyString+Namespace одночасно (але це не Value EX_TextConst)
-        elif (
-            "SourceString" in obj and "KeyString" in obj and "Namespace" in obj
-        ):
-            yield obj, parent, parent_key, ancestry.copy()
-        # 4. Просто SourceString як fallback
-        elif "SourceString" in obj:
-            yield obj, parent, parent_key, ancestry.copy()
-        for k, v in obj.items():
-            new_ancestry = ancestry.copy()
-            new_ancestry.append((obj, k))
-            yield from find_source_nodes(v, parent=obj, parent_key=k, ancestry=new_ancestry)
-    elif isinstance(obj, list):
-        for idx, item in enumerate(obj):
-            new_ancestry = ancestry.copy()
-            new_ancestry.append((obj, idx))
-            yield from find_source_nodes(item, parent=obj, parent_key=idx, ancestry=new_ancestry)
-
-def find_line_number(original_text, value, start_pos=0):
+def iter_json_files(top):
+    for dirpath, dirs, files in sorted_walk(top):
+        for fname in files:
+            if fname.lower().endswith(".json"):
+                yield os.path.join(dirpath, fname)
+
+# ---------------- Маніфест файлів ----------------
+# Один обхід тек на запуск: JSON-файли в порядку sorted_walk (теки й файли за іменем без урахування
+# регістру, symlink-теки не обходяться) разом із (size, mtime_ns) кожного файлу. Теки читаються
+# os.scandir у пулі потоків (на мережевих дисках час — це затримки scandir/stat, а не CPU); порядок
+# відновлюється з дерева вже після обходу. Маніфест можна зберегти (--manifest): при наступному
+# запуску тека з тим самим mtime не перечитується, оновлюються лише stat її файлів.
+MANIFEST_VERSION = 1
+WALK_THREADS = 8
+STAT_CHUNK = 64
+
+# Одна тека: mtime_ns, підтеки [(ім'я, symlink?)] і JSON-файли [(ім'я, size, mtime_ns)] у порядку sorted_walk
+DirListing = namedtuple("DirListing", ("mtime_ns", "subdirs", "files"))
+
+def stat_pair(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def list_directory(path, previous=None):
+    """
+    (mtime_ns, підтеки, імена JSON-файлів) теки у порядку sorted_walk, без stat файлів; None, якщо
+    теку не прочитати (як os.walk без onerror). previous — збережений DirListing цієї теки.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if previous is not None and previous.mtime_ns == mtime_ns:
+        return mtime_ns, previous.subdirs, [name for name, _, _ in previous.files]
+    subdirs, names = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    subdirs.append((entry.name, entry.is_symlink()))
+                elif entry.name.lower().endswith(".json"):
+                    names.append(entry.name)
+    except OSError:
+        return None
+    subdirs.sort(key=lambda item: item[0].lower())
+    names.sort(key=lambda s: s.lower())
+    return mtime_ns, subdirs, names
+
+def stat_files(path, names):
+    """[(ім'я, size, mtime_ns)]; для недоступного файлу size і mtime_ns — None."""
+    files = []
+    for name in names:
+        pair = stat_pair(os.path.join(path, name))
+        files.append((name,) + (pair if pair is not None else (None, None)))
+    return files
+
+class FileManifest:
+    """
+    Результат одного обходу: dirs — {тека: DirListing}; files(root) — шляхи JSON у порядку
+    iter_json_files(root); stat(path) — (size, mtime_ns) на момент обходу або None.
+    """
+
+    def __init__(self, dirs=None):
+        self.dirs = dirs or {}
+        self._stats = {}
+        for path, listing in self.dirs.items():
+            if listing is not None:
+                for name, size, mtime_ns in listing.files:
+                    self._stats[os.path.join(path, name)] = (size, mtime_ns) if size is not None else None
+
+    def files(self, root):
+        paths = []
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            listing = self.dirs.get(path)
+            if listing is None:
+                continue
+            paths.extend(os.path.join(path, name) for name, _, _ in listing.files)
+            stack.extend(os.path.join(path, name) for name, is_link in reversed(listing.subdirs) if not is_link)
+        return paths
+
+    def stat(self, path):
+        return self._stats.get(path)
+
+    def save(self, path):
+        data = {"version": MANIFEST_VERSION,
+                "dirs": {d: list(listing) for d, listing in self.dirs.items() if listing is not None}}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """Збережений маніфест або порожній, якщо файлу немає чи він іншої версії."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return FileManifest()
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return FileManifest()
+        return FileManifest({d: DirListing(mtime_ns, [tuple(x) for x in subdirs], [tuple(x) for x in files])
+                             for d, (mtime_ns, subdirs, files) in data["dirs"].items()})
+
+def build_manifest(roots, threads=WALK_THREADS, previous=None):
+    """
+    Обходить roots пулом потоків: теки читаються паралельно, stat файлів великої теки ділиться на
+    порції по STAT_CHUNK. previous (FileManifest) — теки з незміненим mtime не перечитуються.
+    """
+    old = previous.dirs if previous is not None else {}
+    dirs = {}
+    # тека -> [mtime_ns, підтеки, порції stat у порядку імен, скільки порцій ще не готово]
+    partial_dirs = {}
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        pending = {}
+        for root in dict.fromkeys(roots):
+            dirs[root] = None
+            pending[pool.submit(list_directory, root, old.get(root))] = (root, None)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, chunk = pending.pop(future)
+                if chunk is not None:
+                    state = partial_dirs[path]
+                    state[2][chunk] = future.result()
+                    state[3] -= 1
+                    if not state[3]:
+                        del partial_dirs[path]
+                        dirs[path] = DirListing(state[0], state[1], [f for part in state[2] for f in part])
+                    continue
+                listing = future.result()
+                if listing is None:
+                    continue
+                mtime_ns, subdirs, names = listing
+                chunks = [names[i:i + STAT_CHUNK] for i in range(0, len(names), STAT_CHUNK)]
+                if not chunks:
+                    dirs[path] = DirListing(mtime_ns, subdirs, [])
+                else:
+                    partial_dirs[path] = [mtime_ns, subdirs, [None] * len(chunks), len(chunks)]
+                    for i, part in enumerate(chunks):
+                        pending[pool.submit(stat_files, path, part)] = (path, i)
+                for name, is_link in subdirs:
+                    child = os.path.join(path, name)
+                    if not is_link and child not in dirs:
+                        dirs[child] = None
+                        pending[pool.submit(list_directory, child, old.get(child))] = (child, None)
+    return FileManifest(dirs)
+
+_MISSING = object()
+
+# ---------------- Відсікання піддерев ----------------
+# find_source_nodes заходить у кожне значення dict і кожен елемент list, зокрема у великі числові
+# масиви (вершини, індекси, ключі кривих, параметри матеріалів), де тексту не буває. Профіль
+# відсікання описує піддерева, у які обхід не спускається: за ключем, за Type ассету і масиви
+# скалярів. Останнє завжди без втрат (у масиві без dict немає SourceString), тому типовий профіль
+# lossless обмежується ним; ключі й типи профілю ue — припущення про формат експорту, яке може
+# мовчки загубити рядки, тож він вмикається лише явно і перевіряється на корпусі (--verify-prune).
+# StringTable-блоки збираються окремим обходом і відсіканням не зачіпаються.
+PruneProfile = namedtuple("PruneProfile", ("name", "skip_keys", "skip_types", "scalar_lists", "min_scalar_list"))
+
+PRUNE_PROFILES = {
+    "lossless": PruneProfile(
+        name="lossless",
+        skip_keys=frozenset(),
+        skip_types=frozenset(),
+        scalar_lists=True,
+        min_scalar_list=8,
+    ),
+    "ue": PruneProfile(
+        name="ue",
+        skip_keys=frozenset((
+            "Vertices", "Indices", "Normals", "Tangents", "UVs", "RenderData", "LODModels", "LODResources",
+            "ImportedModel", "PositionVertexBuffer", "StaticMeshVertexBuffer", "ColorVertexBuffer", "IndexBuffer",
+            "RefBonePose", "FinalRefBoneInfo", "CompressedTrackOffsets", "CompressedByteStream",
+            "CompressedCurveData", "FloatCurves", "VectorCurves", "TransformCurves", "CachedExpressionData",
+            "ScalarParameterValues", "VectorParameterValues", "TextureParameterValues", "Mips",
+        )),
+        skip_types=frozenset((
+            "StaticMesh", "SkeletalMesh", "Skeleton", "AnimSequence", "Texture2D", "PhysicsAsset",
+            "BodySetup", "NavCollision",
+        )),
+        scalar_lists=True,
+        min_scalar_list=8,
+    ),
+}
+PRUNE_CHOICES = tuple(PRUNE_PROFILES) + ("off",)
+DEFAULT_PRUNE = "lossless"
+
+def load_prune_profile(path):
+    """
+    Профіль з JSON-файлу: {"skip_keys": [...], "skip_types": [...], "scalar_lists": true,
+    "min_scalar_list": 8}; відсутні поля — порожні (масиви скалярів відсікаються, якщо не вимкнено).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: очікувався JSON-об'єкт")
+    return PruneProfile(
+        name=str(config.get("name") or os.path.basename(path)),
+        skip_keys=frozenset(config.get("skip_keys", ())),
+        skip_types=frozenset(config.get("skip_types", ())),
+        scalar_lists=bool(config.get("scalar_lists", True)),
+        min_scalar_list=int(config.get("min_scalar_list", 8)),
+    )
+
+def resolve_prune_profile(prune):
+    """None/"off" — без відсікання; ім'я з PRUNE_PROFILES або готовий PruneProfile."""
+    if prune is None or prune == "off":
+        return None
+    if isinstance(prune, PruneProfile):
+        return prune
     try:
-        json_val = json.dumps(value)
+        return PRUNE_PROFILES[prune]
+    except KeyError:
+        raise ValueError(f"невідомий профіль відсікання {prune!r} (доступні: {', '.join(PRUNE_CHOICES)})") from None
+
+def prune_signature(prune):
+    """Рядок, що однозначно описує профіль (для мети кешу розбору): зміна профілю — інші кандидати."""
+    if prune is None:
+        return "off"
+    return json.dumps([sorted(prune.skip_keys), sorted(prune.skip_types), prune.scalar_lists, prune.min_scalar_list])
+
+def is_scalar_list(lst):
+    """Чи масив складається лише зі скалярів або масивів скалярів (як вершини [[x, y, z], ...])."""
+    for item in lst:
+        if isinstance(item, list):
+            for inner in item:
+                if isinstance(inner, (dict, list, StreamedList)):
+                    return False
+        elif isinstance(item, (dict, StreamedList)):
+            return False
+    return True
+
+def pruned_child_frames(frame, obj, children, prune, counts=None):
+    """child_frames з профілем відсікання; counts["pruned"] рахує відкинуті піддерева."""
+    skip_keys = prune.skip_keys if isinstance(obj, dict) else ()
+    skip_types = prune.skip_types
+    min_list = prune.min_scalar_list if prune.scalar_lists else None
+    for k, v in children:
+        if isinstance(v, dict):
+            t = v.get("Type")
+            skip = k in skip_keys or (isinstance(t, str) and t in skip_types)
+        elif isinstance(v, list):
+            skip = k in skip_keys or (min_list is not None and len(v) >= min_list and is_scalar_list(v))
+        elif isinstance(v, StreamedList):
+            # вміст відкладеного масиву ще не декодовано — лише за ключем
+            skip = k in skip_keys
+        else:
+            continue
+        if skip:
+            if counts is not None:
+                counts["pruned"] += 1
+            continue
+        yield v, NodeFrame(frame, obj, k)
+
+# ---------------- Обхід вузлів ----------------
+class NodeFrame:
+    """
+    Один рівень шляху від кореня документа: контейнер obj і ключ/індекс key, яким спускаємось нижче.
+    Кадр без obj (корінь) відповідає порожньому ancestry.
+    dialog/data_table/user_enum/table_id/textconst/row_name уже враховують усіх предків (найближчий
+    збіг), тож кожна перевірка — O(1) замість зворотного перебору ancestry. Пошуки, які сканують
+    вміст dict (ObjectPath, ключ, Name, Property.Name), обчислюються ліниво і кешуються в кадрах.
+    asset_type — Type предка, за яким HANDLER_REGISTRY вибирає ланцюжок обробників (див. HandlerRegistry).
+    """
+    __slots__ = (
+        "parent", "obj", "key", "dialog", "data_table", "user_enum", "table_id",
+        "textconst", "row_name", "rows_state", "asset_type", "asset_rank", "_memo",
+    )
+
+    def __init__(self, parent, obj, key):
+        self.parent = parent
+        self.obj = obj
+        self.key = key
+        self._memo = None
+        if parent is None:
+            self.dialog = self.data_table = self.user_enum = self.table_id = None
+            self.textconst = False
+            self.row_name = None
+            self.rows_state = 0
+            self.asset_type = None
+            self.asset_rank = -1
+        else:
+            self.dialog = parent.dialog
+            self.data_table = parent.data_table
+            self.user_enum = parent.user_enum
+            self.table_id = parent.table_id
+            self.textconst = parent.textconst
+            self.asset_type = parent.asset_type
+            self.asset_rank = parent.asset_rank
+            # row_name — ключ одразу після першого "Rows" на шляху (rows_state: 0 — ще не було, 1 — щойно, 2 — знайдено)
+            self.row_name = parent.row_name
+            self.rows_state = parent.rows_state
+            if parent.rows_state == 1:
+                self.row_name = key
+                self.rows_state = 2
+            elif parent.rows_state == 0 and key == "Rows":
+                self.rows_state = 1
+        if isinstance(obj, dict):
+            t = obj.get("Type")
+            if t == "DialogAsset":
+                self.dialog = obj
+            elif t == "DataTable":
+                self.data_table = obj
+            elif t == "UserDefinedEnum":
+                self.user_enum = obj
+            rank = HANDLER_REGISTRY.type_rank.get(t) if isinstance(t, str) else None
+            if rank is not None and rank >= self.asset_rank:
+                self.asset_type = t
+                self.asset_rank = rank
+            if isinstance(obj.get("TableId"), str):
+                self.table_id = obj["TableId"]
+            if "KeyString" in obj and "Namespace" in obj:
+                self.textconst = True
+
+    def _resolve(self, memo_key, own_value):
+        # Піднімаємось до найближчого кадру з уже обчисленим значенням (ітеративно, без рекурсії),
+        # потім спускаємось назад: значення кадру — власне (якщо є) або успадковане від предка.
+        chain = []
+        frame = self
+        value = None
+        while frame is not None:
+            memo = frame._memo
+            if memo is not None and memo_key in memo:
+                value = memo[memo_key]
+                break
+            chain.append(frame)
+            frame = frame.parent
+        for frame in reversed(chain):
+            own = own_value(frame.obj)
+            if own is not None:
+                value = own
+            if frame._memo is None:
+                frame._memo = {}
+            frame._memo[memo_key] = value
+        return value
+
+    def objectpath(self):
+        return self._resolve("objectpath", find_objectpath_in_dict)
+
+    def key_candidate(self):
+        return self._resolve("key", find_key_string_in_dict)
+
+    def property_name(self):
+        return self._resolve("property", find_property_name_in_dict)
+
+    def ancestor_value(self, key_name):
+        # Значення може бути будь-яким (навіть null), тому власне значення загортаємо в кортеж
+        def own_value(obj):
+            return (obj.get(key_name),) if isinstance(obj, dict) and key_name in obj else None
+        found = self._resolve(("value", key_name), own_value)
+        return found[0] if found is not None else None
+
+def child_frames(frame, obj, children):
+    for k, v in children:
+        if isinstance(v, (dict, list, StreamedList)):
+            yield v, NodeFrame(frame, obj, k)
+
+def find_source_nodes(data, frame=None, prune=None, counts=None):
+    """
+    Ітеративний обхід у тому ж порядку (pre-order), що й колишній рекурсивний.
+    Повертає (node, parent, parent_key, frame), де frame — NodeFrame шляху до поточного dict
+    (його предки без нього самого). StreamedList-и (потоковий режим) розгортаються по одному елементу.
+    prune (PruneProfile) — піддерева, у які обхід не спускається (корінь не відсікається);
+    counts — dict, у якому "visited" рахує обійдені контейнери, а "pruned" — відкинуті піддерева.
+    """
+    if frame is None:
+        frame = NodeFrame(None, None, None)
+    # Стек ітераторів дітей: поточний контейнер обходиться повністю, перш ніж беремо наступного сусіда
+    stack = [iter(((data, frame),))]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            continue
+        obj, frame = item
+        if counts is not None:
+            counts["visited"] += 1
+        if isinstance(obj, dict):
+            parent = frame.obj
+            parent_key = frame.key
+            # 1. Якщо є "Expression" з EX_TextConst, беремо всю "Value"
+            expr = obj.get('Expression')
+            if (
+                isinstance(expr, dict) and expr.get('Inst') == 'EX_TextConst'
+                and isinstance(expr.get('Value'), dict)
+                and all(k in expr['Value'] for k in ("SourceString", "KeyString", "Namespace"))
+            ):
+                yield expr['Value'], expr, 'Value', frame
+            # 2. EX_TextConst вузол безпосередньо
+            elif (
+                obj.get("Inst") == "EX_TextConst" and isinstance(obj.get("Value"), dict)
+                and all(k in obj["Value"] for k in ("SourceString", "KeyString", "Namespace"))
+            ):
+                yield obj["Value"], obj, "Value", frame
+            # !!! ОНОВЛЕНО: не yield окремо SourceString, якщо parent має KeyString і Namespace (це частина EX_TextConst)
+            elif (
+                "SourceString" in obj and parent
+                and isinstance(parent, dict)
+                and ("KeyString" in parent and "Namespace" in parent)
+            ):
+                pass
+            # !!! Ще суворіше: не yield SourceString якщо предки (на всіх рівнях крім parent) містять dict з KeyString і Namespace
+            elif (
+                "SourceString" in obj
+                and frame.parent is not None and frame.parent.textconst
+            ):
+                pass  # Пропускаємо такі вузли!
+            # !!! Абсолютний фільтр: не yield якщо parent EX_StringConst
+            elif (
+                "SourceString" in obj and parent
+                and isinstance(parent, dict)
+                and parent.get("Inst") == "EX_StringConst"
+            ):
+                pass
+            # 3. SourceString+KeyString+Namespace одночасно (але це не Value EX_TextConst)
+            elif (
+                "SourceString" in obj and "KeyString" in obj and "Namespace" in obj
+            ):
+                yield obj, parent, parent_key, frame
+            # 4. Просто SourceString як fallback
+            elif "SourceString" in obj:
+                yield obj, parent, parent_key, frame
+            children = obj.items()
+        elif isinstance(obj, list):
+            children = enumerate(obj)
+        elif isinstance(obj, StreamedList):
+            children = obj.iter_items()
+        else:
+            continue
+        if prune is None:
+            stack.append(child_frames(frame, obj, children))
+        else:
+            stack.append(pruned_child_frames(frame, obj, children, prune, counts))
+
+def newline_offsets(text):
+    offsets = []
+    pos = text.find("\n")
+    while pos != -1:
+        offsets.append(pos)
+        pos = text.find("\n", pos + 1)
+    return offsets
+
+def find_line_number(original_text, value, start_pos=0, newlines=None):
+    try:
+        json_val = json.dumps(value, default=streamed_json_default)
     except Exception:
         json_val = '"' + str(value).replace('"', '\\"') + '"'
     pattern = re.escape('"SourceString"') + r'\s*:\s*' + re.escape(json_val)
-    m = re.search(pattern, original_text[start_pos:], flags=re.MULTILINE)
+    m = re.compile(pattern, flags=re.MULTILINE).search(original_text, start_pos)
     if not m:
         return None, None
-    match_start = start_pos + m.start()
-    line_no = original_text.count("\n", 0, match_start) + 1
+    match_start = m.start()
+    if newlines is None:
+        newlines = newline_offsets(original_text)
+    line_no = bisect.bisect_left(newlines, match_start) + 1
     return line_no, match_start
 
+def locate_source_string(path, searched_values, value, original_text=None):
+    """
+    Номер рядка SourceString value для повідомлення про помилку (або None).
+    Пошук іде після вже оброблених SourceString (searched_values, у порядку обходу), тому їх
+    позиції відтворюються тут, лише коли помилка справді сталася. Без original_text файл
+    перечитується з диска.
+    """
+    if original_text is None:
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                original_text = f.read()
+        except Exception:
+            return None
+    newlines = newline_offsets(original_text)
+    pos = 0
+    for searched in searched_values:
+        _, match_pos = find_line_number(original_text, searched, start_pos=pos, newlines=newlines)
+        if match_pos is not None:
+            pos = match_pos + 1
+    line_no, _ = find_line_number(original_text, value, start_pos=pos, newlines=newlines)
+    return line_no
+
 def relative_after_markers(path, markers=("UnleashedPrototype", "Content")):
     parts = Path(path).as_posix().split("/")
     lower_parts = [p.lower() for p in parts]
@@ -125,13 +601,10 @@ def extract_table_short_from_tableid(tableid_value):
         return tableid_value.rsplit(".", 1)[-1]
     return None
 
-def find_tableid_in_ancestry(node, ancestry):
+def find_tableid_in_ancestry(node, frame):
     if isinstance(node, dict) and "TableId" in node and isinstance(node.get("TableId"), str):
         return node.get("TableId")
-    for obj, _ in reversed(ancestry):
-        if isinstance(obj, dict) and "TableId" in obj and isinstance(obj.get("TableId"), str):
-            return obj.get("TableId")
-    return None
+    return frame.table_id
 
 def extract_string_from_maybe_obj(obj):
     # Рекурсивно/ітеративно занурюється по "Value", поки не string
@@ -139,18 +612,11 @@ def extract_string_from_maybe_obj(obj):
         obj = obj["Value"]
     return obj if isinstance(obj, str) else None
 
-def find_property_name_in_ancestry(ancestry):
-    for obj, _ in reversed(ancestry):
-        if isinstance(obj, dict):
-            prop = obj.get("Property")
-            if isinstance(prop, dict) and "Name" in prop and isinstance(prop.get("Name"), str):
-                return prop.get("Name")
-    return None
-
-def find_ancestor_value(ancestry, key_name):
-    for obj, _ in reversed(ancestry):
-        if isinstance(obj, dict) and key_name in obj:
-            return obj.get(key_name)
+def find_property_name_in_dict(obj):
+    if isinstance(obj, dict):
+        prop = obj.get("Property")
+        if isinstance(prop, dict) and "Name" in prop and isinstance(prop.get("Name"), str):
+            return prop.get("Name")
     return None
 
 # ключі: пріоритети — keystring -> selectedkeyname -> selectedkey -> key -> інші з 'key'
@@ -176,40 +642,29 @@ def find_key_candidate_in_dict(dct):
             return orig, dct.get(orig)
     return None, None
 
-def get_key_from_context(node, parent, ancestry):
-    if isinstance(node, dict):
-        fname, val = find_key_candidate_in_dict(node)
-        if fname and val is not None:
-            sval = extract_string_from_maybe_obj(val)
-            if sval:
-                return sval
-    if isinstance(parent, dict):
-        fname, val = find_key_candidate_in_dict(parent)
+def find_key_string_in_dict(obj):
+    if isinstance(obj, dict):
+        fname, val = find_key_candidate_in_dict(obj)
         if fname and val is not None:
             sval = extract_string_from_maybe_obj(val)
             if sval:
                 return sval
-    for anc_obj, _ in reversed(ancestry):
-        if isinstance(anc_obj, dict):
-            fname, val = find_key_candidate_in_dict(anc_obj)
-            if fname and val is not None:
-                sval = extract_string_from_maybe_obj(val)
-                if sval:
-                    return sval
     return None
 
-# знаходимо ObjectPath у предках (наприклад у MissionTree або Template.Owner...)
-def find_objectpath_in_ancestry(ancestry):
-    for obj, _ in reversed(ancestry):
-        if not isinstance(obj, dict):
-            continue
-        for candidate in ("ObjectPath", "Owner", "ObjectName"):
-            val = obj.get(candidate)
-            if isinstance(val, str) and "UnleashedPrototype" in val:
-                return format_objectpath(val)
-        for v in obj.values():
-            if isinstance(v, dict) and "ObjectPath" in v and isinstance(v.get("ObjectPath"), str) and "UnleashedPrototype" in v.get("ObjectPath"):
-                return format_objectpath(v.get("ObjectPath"))
+def get_key_from_context(node, parent, frame):
+    return find_key_string_in_dict(node) or find_key_string_in_dict(parent) or frame.key_candidate()
+
+# знаходимо ObjectPath у dict-предку (наприклад у MissionTree або Template.Owner...)
+def find_objectpath_in_dict(obj):
+    if not isinstance(obj, dict):
+        return None
+    for candidate in ("ObjectPath", "Owner", "ObjectName"):
+        val = obj.get(candidate)
+        if isinstance(val, str) and "UnleashedPrototype" in val:
+            return format_objectpath(val)
+    for v in obj.values():
+        if isinstance(v, dict) and "ObjectPath" in v and isinstance(v.get("ObjectPath"), str) and "UnleashedPrototype" in v.get("ObjectPath"):
+            return format_objectpath(v.get("ObjectPath"))
     return None
 
 def format_objectpath(raw):
@@ -239,48 +694,58 @@ def extract_speaker_name(speaker_obj):
     return last
 
 # ---------------- StringTable збір ----------------
+def find_stringtable_blocks(data):
+    """
+    Обходить дерево (стеком, у тому ж порядку, що й раніше) і повертає
+    список (TableNamespace або None, KeysToEntries) для кожного StringTable-блоку.
+    """
+    blocks = []
+    stack = [data] if isinstance(data, (dict, list, StreamedList)) else []
+    while stack:
+        nd = stack.pop()
+        if isinstance(nd, StreamedList):
+            # замість усіх елементів одразу — ледачий ітератор у тому ж (зворотному) порядку
+            stack.append(nd.iter_reversed())
+        elif isinstance(nd, Iterator):
+            it = next(nd, None)
+            if it is not None:
+                stack.append(nd)
+                if isinstance(it, (dict, list, StreamedList)):
+                    stack.append(it)
+        elif isinstance(nd, dict):
+            st = nd.get("StringTable")
+            if isinstance(st, dict):
+                ns = st.get("TableNamespace") if isinstance(st.get("TableNamespace"), str) else None
+                keysmap = st.get("KeysToEntries") if isinstance(st.get("KeysToEntries"), dict) else {}
+                blocks.append((ns, keysmap))
+            for v in nd.values():
+                if isinstance(v, (dict, list, StreamedList)):
+                    stack.append(v)
+        elif isinstance(nd, list):
+            for it in nd:
+                if isinstance(it, (dict, list, StreamedList)):
+                    stack.append(it)
+    return blocks
+
+def merge_stringtable_blocks(map_key_to_ns, blocks):
+    # Перший знайдений namespace для ключа має пріоритет
+    for ns, keysmap in blocks:
+        if ns:
+            for k in keysmap.keys():
+                if k not in map_key_to_ns:
+                    map_key_to_ns[k] = ns
+
 def collect_stringtables(roots):
     map_key_to_ns = {}
     for root in roots:
-        for dirpath, dirs, files in sorted_walk(root):
-            for fname in files:
-                if not fname.lower().endswith(".json"):
-                    continue
-                file_path = os.path.join(dirpath, fname)
-                try:
-                    with open(file_path, "r", encoding="utf-8-sig") as f:
-                        txt = f.read()
-                        data = json.loads(txt)
-                except Exception:
-                    continue
-                stack = [data] if isinstance(data, (dict, list)) else []
-                while stack:
-                    nd = stack.pop()
-                    if isinstance(nd, dict):
-                        t = nd.get("Type")
-                        if t == "StringTable" and "StringTable" in nd and isinstance(nd.get("StringTable"), dict):
-                            st = nd.get("StringTable")
-                            ns = st.get("TableNamespace") if isinstance(st.get("TableNamespace"), str) else None
-                            keysmap = st.get("KeysToEntries") if isinstance(st.get("KeysToEntries"), dict) else {}
-                            if ns and isinstance(keysmap, dict):
-                                for k in keysmap.keys():
-                                    if k not in map_key_to_ns:
-                                        map_key_to_ns[k] = ns
-                        if "StringTable" in nd and isinstance(nd.get("StringTable"), dict):
-                            st = nd.get("StringTable")
-                            ns = st.get("TableNamespace") if isinstance(st.get("TableNamespace"), str) else None
-                            keysmap = st.get("KeysToEntries") if isinstance(st.get("KeysToEntries"), dict) else {}
-                            if ns and isinstance(keysmap, dict):
-                                for k in keysmap.keys():
-                                    if k not in map_key_to_ns:
-                                        map_key_to_ns[k] = ns
-                        for v in nd.values():
-                            if isinstance(v, (dict, list)):
-                                stack.append(v)
-                    elif isinstance(nd, list):
-                        for it in nd:
-                            if isinstance(it, (dict, list)):
-                                stack.append(it)
+        for file_path in iter_json_files(root):
+            try:
+                with open(file_path, "r", encoding="utf-8-sig") as f:
+                    txt = f.read()
+                    data = json.loads(txt)
+            except Exception:
+                continue
+            merge_stringtable_blocks(map_key_to_ns, find_stringtable_blocks(data))
     return map_key_to_ns
 
 def match_stringtable_namespace_for_key(final_key, key_to_ns):
@@ -291,6 +756,35 @@ def match_stringtable_namespace_for_key(final_key, key_to_ns):
             return ns, k
     return None, None
 
+_NS_SEPARATOR_RE = re.compile(r"[.:]")
+
+def build_stringtable_index(key_to_ns):
+    """
+    Індекс для match_stringtable_namespace_indexed: ключ StringTable -> (порядковий номер, namespace).
+    Порядковий номер зберігає правило "перший збіг у key_to_ns перемагає".
+    """
+    return {k: (order, ns) for order, (k, ns) in enumerate(key_to_ns.items())}
+
+def match_stringtable_namespace_indexed(final_key, st_index):
+    """
+    Те саме, що match_stringtable_namespace_for_key, але без перебору всієї мапи:
+    кандидати — сам ключ і кожен його хвіст після '.' або ':' (хвіст після '::' теж іде після ':').
+    """
+    if not final_key:
+        return None, None
+    best = None
+    hit = st_index.get(final_key)
+    if hit is not None:
+        best = (hit[0], hit[1], final_key)
+    for m in _NS_SEPARATOR_RE.finditer(final_key):
+        k = final_key[m.end():]
+        hit = st_index.get(k)
+        if hit is not None and (best is None or hit[0] < best[0]):
+            best = (hit[0], hit[1], k)
+    if best is None:
+        return None, None
+    return best[1], best[2]
+
 def make_localization_key(table_id: str, key: str) -> str:
     """
     Генерує універсальний ключ для локалізації: {TableIdLastSegment}::{Key}
@@ -301,14 +795,16 @@ def make_localization_key(table_id: str, key: str) -> str:
     return f"{last_segment}::{key}"
 
 # ---------------- Обробники вузлів ----------------
-def handle_dialog_line(node, parent, parent_key, ancestry, file_path, dialog_ancestor):
+def handle_dialog_line(node, parent, parent_key, frame, file_path, dialog_ancestor=None):
     """
-    Обробляє DialogueText-підвузол у DialogAsset Lines.
+    Обробляє DialogueText-підвузол у DialogAsset Lines (dialog_ancestor — типово frame.dialog).
     Адреса буде на першому місці в context; EmotionalState не обробляється.
     """
     if not isinstance(node, dict):
         return None, None, None, None
-    key_candidate = get_key_from_context(node, parent, ancestry)
+    if dialog_ancestor is None:
+        dialog_ancestor = frame.dialog
+    key_candidate = get_key_from_context(node, parent, frame)
     if not key_candidate:
         return None, None, None, None
     source = node.get("SourceString", "")
@@ -322,7 +818,7 @@ def handle_dialog_line(node, parent, parent_key, ancestry, file_path, dialog_anc
     # dialog name
     dialog_name = dialog_ancestor.get("Name") if isinstance(dialog_ancestor, dict) else "null"
     speaker_field = speaker_name if speaker_name else "null"
-    objpath = find_objectpath_in_ancestry(ancestry)
+    objpath = frame.objectpath()
     relpath = objpath if objpath else relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
     # Префіксувати Namespace, якщо він є у вузлі
     ns_val = node.get("Namespace") if isinstance(node.get("Namespace"), str) else None
@@ -336,14 +832,14 @@ def handle_dialog_line(node, parent, parent_key, ancestry, file_path, dialog_anc
     ])
     return final_key, effective_source, "", context
 
-def handle_property_node(node, parent, parent_key, ancestry, file_path):
+def handle_property_node(node, parent, parent_key, frame, file_path):
     if not isinstance(node, dict):
         return None, None, None, None
-    key_candidate = get_key_from_context(node, parent, ancestry)
+    key_candidate = get_key_from_context(node, parent, frame)
     if not key_candidate:
         return None, None, None, None
     # Спроба сформувати ключ через TableId, якщо доступний
-    tableid_val = find_tableid_in_ancestry(node, ancestry)
+    tableid_val = find_tableid_in_ancestry(node, frame)
     if isinstance(tableid_val, str) and tableid_val:
         final_key = make_localization_key(tableid_val, key_candidate)
     else:
@@ -356,15 +852,15 @@ def handle_property_node(node, parent, parent_key, ancestry, file_path):
     localized = node.get("LocalizedString", "")
     # Використовувати локалізований текст, якщо він є
     effective_source = localized if localized else source
-    top_name = find_ancestor_value(ancestry, "Name") or find_ancestor_value(ancestry, "name") or "null"
+    top_name = frame.ancestor_value("Name") or frame.ancestor_value("name") or "null"
     prop_name = parent_key if isinstance(parent_key, str) else "null"
-    objpath = find_objectpath_in_ancestry(ancestry)
+    objpath = frame.objectpath()
     relpath = objpath if objpath else relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
     # Адреса на перше місце в контексті (без Localized)
     context = "\n".join([relpath if relpath else file_path, f"Name: {top_name}", str(prop_name)])
     return final_key, effective_source, "", context
 
-def handle_user_defined_enum(node, parent, parent_key, ancestry, file_path):
+def handle_user_defined_enum(node, parent, parent_key, frame, file_path):
     if not isinstance(node, dict):
         return None, None, None, None
     hash_key = node.get("Key") or node.get("key")
@@ -375,14 +871,10 @@ def handle_user_defined_enum(node, parent, parent_key, ancestry, file_path):
     enumerator_name = None
     if isinstance(parent, dict) and "Key" in parent and isinstance(parent.get("Key"), str):
         enumerator_name = parent.get("Key")
-    enum_ancestor = None
-    for anc_obj, _ in reversed(ancestry):
-        if isinstance(anc_obj, dict) and anc_obj.get("Type") == "UserDefinedEnum":
-            enum_ancestor = anc_obj
-            break
+    enum_ancestor = frame.user_enum
     enum_name = enum_ancestor.get("Name") if enum_ancestor is not None else None
     context_parts = []
-    objpath = find_objectpath_in_ancestry(ancestry)
+    objpath = frame.objectpath()
     relpath = objpath if objpath else relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
     # Адреса на перше місце
     if relpath:
@@ -394,9 +886,11 @@ def handle_user_defined_enum(node, parent, parent_key, ancestry, file_path):
     context = "\n".join(context_parts) if context_parts else (relpath if relpath else file_path)
     return hash_key, effective_source, "", context
 
-def handle_data_table(node, parent, parent_key, ancestry, file_path, data_table_ancestor):
+def handle_data_table(node, parent, parent_key, frame, file_path, data_table_ancestor=None):
     if not isinstance(node, dict):
         return None, None, None, None
+    if data_table_ancestor is None:
+        data_table_ancestor = frame.data_table
     full_key = node.get("Key") or node.get("key")
     source = node.get("SourceString", "")
     localized = node.get("LocalizedString", "") or ""
@@ -407,20 +901,14 @@ def handle_data_table(node, parent, parent_key, ancestry, file_path, data_table_
     if inline_ns:
         prefix = f"{inline_ns}::"
     else:
-        tableid_val = find_tableid_in_ancestry(node, ancestry)
+        tableid_val = find_tableid_in_ancestry(node, frame)
         table_short = extract_table_short_from_tableid(tableid_val) if tableid_val else None
         prefix = f"{table_short}::" if table_short else ""
     table_name = data_table_ancestor.get("Name") if isinstance(data_table_ancestor, dict) else None
-    row_name = None
-    for i, (obj, key_in_parent) in enumerate(ancestry):
-        if key_in_parent == "Rows":
-            if i+1 < len(ancestry):
-                _, row_key = ancestry[i+1]
-                row_name = row_key
-            break
+    row_name = frame.row_name
     field_name = parent_key if isinstance(parent_key, str) else None
     context_parts = []
-    objpath = find_objectpath_in_ancestry(ancestry)
+    objpath = frame.objectpath()
     relpath = objpath if objpath else relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
     # Адреса на перше місце
     if relpath:
@@ -438,7 +926,7 @@ def handle_data_table(node, parent, parent_key, ancestry, file_path, data_table_
     final_key = (prefix + full_key) if full_key else None
     return final_key, effective_source, "", context
 
-def handle_script_textconst(node, parent, parent_key, ancestry, file_path):
+def handle_script_textconst(node, parent, parent_key, frame, file_path):
     # Універсально дістає Value.SourceString.Value, Namespace.Value, KeyString.Value (чи просто рядок)
     if not isinstance(node, dict):
         return None, None, None, None
@@ -479,14 +967,113 @@ def handle_script_textconst(node, parent, parent_key, ancestry, file_path):
         if isinstance(source_val, dict):
             deeper = source_val.get('Value')
             source_val = deeper if isinstance(deeper, str) else ""
-    prop_name = find_property_name_in_ancestry(ancestry)
+    prop_name = frame.property_name()
     name_field = prop_name if prop_name is not None else "null"
-    objpath = find_objectpath_in_ancestry(ancestry)
+    objpath = frame.objectpath()
     relpath = objpath if objpath else relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
     # Без Localized у контексті
     context = "\n".join([relpath if relpath else file_path, f"Name: {name_field}"])
     return final_key, source_val, "", context
 
+# ---------------- Реєстр обробників ----------------
+# Обробник вузла з SourceString вибирається за (asset_type, форма): asset_type — Type ассету-предка
+# (NodeFrame.asset_type; DialogAsset > DataTable > UserDefinedEnum, далі найближчий зареєстрований Type,
+# None — жодного), форма — "textconst" (вузол або предок має KeyString і Namespace) чи "plain".
+# Ланцюжки для Type будуються один раз і кешуються: обробники цього Type у порядку реєстрації, далі
+# загальні (asset_type None). Обробник повертає (key, source, translation, context); якщо key порожній
+# або source не текст, on_miss вирішує: "next" — наступний обробник, "skip" — вузол без рядка,
+# "error" — RuntimeError UNEXPECTED. Вичерпаний ланцюжок — UNEXPECTED BLOCK.
+# Новий клас ассетів реєструється без зміни extract_candidates, напр.:
+#   @HANDLER_REGISTRY.handler("widget", asset_types=("WidgetBlueprintGeneratedClass",))
+#   def handle_widget(node, parent, parent_key, frame, file_path): ...
+HANDLER_SHAPES = ("plain", "textconst")
+HANDLER_MISS = ("next", "skip", "error")
+
+class HandlerSpec:
+    __slots__ = ("kind", "handler", "asset_types", "shapes", "always_match", "on_miss", "error", "requires_source")
+
+    def __init__(self, kind, handler, asset_types, shapes, always_match, on_miss, error, requires_source):
+        self.kind = kind
+        self.handler = handler
+        self.asset_types = asset_types
+        self.shapes = shapes
+        self.always_match = always_match
+        self.on_miss = on_miss
+        self.error = error
+        self.requires_source = requires_source
+
+class HandlerRegistry:
+    """
+    Реєстр обробників: specs у порядку реєстрації, type_rank — пріоритет Type для NodeFrame.asset_type
+    (більший перемагає будь-якого предка, серед рівних — найближчий), chains — кеш ланцюжків
+    {asset_type: (ланцюжок "plain", ланцюжок "textconst")}; елемент ланцюжка — кортеж
+    (handler, kind, always_match, on_miss, requires_source, error). Після зміни spec.handler напряму
+    кеш треба скинути (chains.clear()).
+    """
+
+    def __init__(self):
+        self.specs = []
+        self.type_rank = {}
+        self.chains = {}
+
+    def register(self, kind, handler, asset_types=(None,), shapes=HANDLER_SHAPES, always_match=False,
+                 on_miss="next", error=None, requires_source=False, rank=0):
+        """
+        Додає обробник у кінець ланцюжків asset_types × shapes. kind потрапляє в кандидатів (і --stats);
+        always_match — namespace StringTable підбирається і для ключів з '::'; error — опис вузла для
+        on_miss="error"; requires_source — обробник пробується лише для вузлів з власним SourceString;
+        rank — пріоритет asset_types; тип, що входить у кілька реєстрацій, отримує найбільший з них
+        (порядок реєстрації не важить).
+        """
+        if on_miss not in HANDLER_MISS:
+            raise ValueError(f"невідомий on_miss {on_miss!r} (доступні: {', '.join(HANDLER_MISS)})")
+        for shape in shapes:
+            if shape not in HANDLER_SHAPES:
+                raise ValueError(f"невідома форма вузла {shape!r} (доступні: {', '.join(HANDLER_SHAPES)})")
+        for asset_type in asset_types:
+            if asset_type is not None:
+                self.type_rank[asset_type] = max(self.type_rank.get(asset_type, rank), rank)
+        spec = HandlerSpec(kind, handler, tuple(asset_types), tuple(shapes), always_match, on_miss, error, requires_source)
+        self.specs.append(spec)
+        self.chains.clear()
+        return spec
+
+    def handler(self, kind, **options):
+        """Декоратор для register: @HANDLER_REGISTRY.handler("widget", asset_types=(...,))."""
+        def decorator(fn):
+            self.register(kind, fn, **options)
+            return fn
+        return decorator
+
+    def unregister(self, kind):
+        self.specs = [spec for spec in self.specs if spec.kind != kind]
+        self.chains.clear()
+
+    def chain_pair(self, asset_type):
+        """(ланцюжок "plain", ланцюжок "textconst") для asset_type; будується при першому зверненні."""
+        pair = self.chains.get(asset_type)
+        if pair is None:
+            pair = []
+            for shape in HANDLER_SHAPES:
+                own = [spec for spec in self.specs if asset_type in spec.asset_types and shape in spec.shapes]
+                common = [] if asset_type is None else [
+                    spec for spec in self.specs if None in spec.asset_types and shape in spec.shapes and spec not in own]
+                pair.append(tuple((spec.handler, spec.kind, spec.always_match, spec.on_miss, spec.requires_source, spec.error)
+                                  for spec in own + common))
+            pair = self.chains[asset_type] = tuple(pair)
+        return pair
+
+HANDLER_REGISTRY = HandlerRegistry()
+# Вбудовані обробники в порядку колишнього if-ланцюжка: діалог має пріоритет, property-like властивості —
+# поза EX_TextConst і DataTable, DataTable/UserDefinedEnum без ключа — помилка, далі Script/EX_TextConst.
+HANDLER_REGISTRY.register("dialog", handle_dialog_line, asset_types=("DialogAsset",), on_miss="skip", rank=3)
+HANDLER_REGISTRY.register("property", handle_property_node, asset_types=(None, "UserDefinedEnum"), shapes=("plain",))
+HANDLER_REGISTRY.register("datatable", handle_data_table, asset_types=("DataTable",), always_match=True,
+                          on_miss="error", error="DataTable-елемент без key", rank=2)
+HANDLER_REGISTRY.register("enum", handle_user_defined_enum, asset_types=("UserDefinedEnum",), always_match=True,
+                          on_miss="error", error="UserDefinedEnum-елемент без hash", rank=1)
+HANDLER_REGISTRY.register("script", handle_script_textconst, always_match=True, on_miss="skip", requires_source=True)
+
 def get_text(src):
     if isinstance(src, str):
         return src
@@ -494,140 +1081,1437 @@ def get_text(src):
         return src['Value']
     return None
 
+# ---------------- JSON-бекенди ----------------
+# Прискорені декодери (orjson, simdjson) розбирають байти напряму. Вони суворіші за stdlib
+# (NaN, Infinity, 1e400, одиночні сурогати \ud800 — помилка), тож будь-яка їхня помилка означає
+# повторний розбір через stdlib: результат і текст повідомлень про помилки ті самі.
+JSON_BACKENDS = ("auto", "stdlib", "orjson", "simdjson")
+# orjson мовчки перетворює цілі поза int64/uint64 на float — такі файли декодує stdlib
+_LONG_INT_RE = re.compile(rb"\d{19}")
+
+def resolve_json_backend(name):
+    """Назва бекенду, яким реально декодуватимуться файли (auto — перший встановлений)."""
+    available = {"stdlib": True, "orjson": orjson is not None, "simdjson": simdjson is not None}
+    if name == "auto":
+        return next(b for b in ("orjson", "simdjson", "stdlib") if available[b])
+    if name not in available:
+        raise ValueError(f"невідомий JSON-бекенд {name!r}")
+    if not available[name]:
+        raise ValueError(f"JSON-бекенд {name!r} не встановлено (pip install {'pysimdjson' if name == 'simdjson' else name})")
+    return name
+
+def fast_json_loads(view, backend):
+    """Декодує байти прискореним бекендом; None — якщо цей вміст слід віддати stdlib."""
+    try:
+        if backend == "orjson":
+            if _LONG_INT_RE.search(view) is not None:
+                return None
+            return orjson.loads(view)
+        if backend == "simdjson":
+            return simdjson.loads(view)
+    except Exception:
+        return None
+    return None
+
 # ---------------- Файл-обробка ----------------
-def process_file(path, writer, key_to_ns, emitted_keys):
-    with open(path, "r", encoding="utf-8-sig") as f:
-        original_text = f.read()
+def decode_json_bytes(raw, path, json_backend="stdlib"):
+    """
+    (text, data) з байтів файлу (bytes або mmap) без проміжної копії: BOM відкидається через
+    memoryview, '\\r\\n' і '\\r' стають '\\n' — той самий текст, що дає open(encoding="utf-8-sig").
+    З прискореним json_backend текст не створюється взагалі: повертається (None, data).
+    """
+    start = 3 if raw[:3] == b"\xef\xbb\xbf" else 0
+    if json_backend != "stdlib":
+        with memoryview(raw) as view:
+            data = fast_json_loads(view[start:], json_backend)
+        if data is not None:
+            return None, data
+    with memoryview(raw) as view:
+        original_text = str(view[start:], "utf-8")
+    if "\r" in original_text:
+        original_text = original_text.replace("\r\n", "\n").replace("\r", "\n")
     try:
         data = json.loads(original_text)
     except json.JSONDecodeError as e:
         raise RuntimeError(f"ERROR: Не вдалося розпарсити JSON у файлі {path}: {e}")
-    search_start_pos = 0
-    for node, parent, parent_key, ancestry in find_source_nodes(data):
-        dialog_ancestor = None
-        data_table_ancestor = None
-        user_enum_ancestor = None
-        for anc_obj, _ in reversed(ancestry):
-            if isinstance(anc_obj, dict):
-                t = anc_obj.get("Type")
-                if t == "DialogAsset" and dialog_ancestor is None:
-                    dialog_ancestor = anc_obj
-                if t == "DataTable" and data_table_ancestor is None:
-                    data_table_ancestor = anc_obj
-                if t == "UserDefinedEnum" and user_enum_ancestor is None:
-                    user_enum_ancestor = anc_obj
-
-        # Визначаємо, чи вузол в контексті EX_TextConst
-        in_textconst_context = (
-            (isinstance(node, dict) and ("KeyString" in node and "Namespace" in node))
-            or any(
-                isinstance(a_obj, dict) and ("KeyString" in a_obj and "Namespace" in a_obj)
-                for a_obj, _ in ancestry
-            )
-        )
+    return original_text, data
+
+def load_json_file(path, json_backend="stdlib"):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return decode_json_bytes(raw, path, json_backend)
+
+# Обробники, що дають рядки (kind кандидата); рядки зі StringTable дописуються окремо як "stringtable"
+CANDIDATE_KINDS = ("dialog", "property", "datatable", "enum", "script")
 
-        # Якщо ми в межах DialogAsset, обробляємо як діалогну лінію (має пріоритет)
-        if dialog_ancestor is not None:
-            key, source, translation, context = handle_dialog_line(node, parent, parent_key, ancestry, path, dialog_ancestor)
+def extract_candidates(data, path, original_text=None, source_nodes=None, prune=None):
+    """
+    Генерує рядки-кандидати (key, source, translation, context, always_match, kind) без
+    прив'язки до StringTable: always_match=False означає, що namespace підбирається
+    лише для ключів без '::'; kind — обробник, що дав рядок (CANDIDATE_KINDS).
+    Непередбачені блоки піднімають RuntimeError; номер рядка для повідомлення шукається
+    лише тоді (див. locate_source_string). source_nodes — готовий ітератор find_source_nodes(data)
+    (наприклад, з вимірюванням часу для --stats), інакше обхід іде з профілем відсікання prune.
+    Однакові context у межах файлу — один рядок. Ланцюжок обробників вузла — один пошук у HANDLER_REGISTRY за asset_type кадру і форма вузла.
+    """
+    searched_values = []
+    # однакові context (адреса + Name/Speaker) у рядків одного ассету — один об'єкт у пам'яті
+    contexts = {}
+    if source_nodes is None:
+        source_nodes = find_source_nodes(data, prune=prune)
+    chains = HANDLER_REGISTRY.chains
+    for node, parent, parent_key, frame in source_nodes:
+        # Чи вузол в контексті EX_TextConst (індекс ланцюжка: 0 — "plain", 1 — "textconst")
+        textconst = frame.textconst or (isinstance(node, dict) and "KeyString" in node and "Namespace" in node)
+        pair = chains.get(frame.asset_type)
+        if pair is None:
+            pair = HANDLER_REGISTRY.chain_pair(frame.asset_type)
+        for handler, kind, always_match, on_miss, requires_source, error in pair[textconst]:
+            if requires_source and not (isinstance(node, dict) and "SourceString" in node):
+                continue
+            key, source, translation, context = handler(node, parent, parent_key, frame, path)
             src_val = get_text(source)
             if key and src_val is not None:
-                final_key = key
-                if "::" not in final_key:
-                    ns, matched = match_stringtable_namespace_for_key(final_key, key_to_ns)
-                    if ns:
-                        final_key = f"{ns}::{matched}"
-                if final_key not in emitted_keys:
-                    writer.writerow([final_key, src_val, translation, context])
-                    emitted_keys.add(final_key)
-                _, match_pos = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-                if match_pos is not None:
-                    search_start_pos = match_pos + 1
-                continue
+                yield key, src_val, translation, contexts.setdefault(context, context), always_match, kind
+                searched_values.append(node.get("SourceString", ""))
+                break
+            if on_miss == "skip":
+                break
+            if on_miss == "error":
+                line_no = locate_source_string(path, searched_values, node.get("SourceString", ""), original_text)
+                if line_no is None:
+                    raise RuntimeError(f"UNEXPECTED: у файлі {path} знайдено {error} (не вдалось знайти номер рядка)")
+                else:
+                    raise RuntimeError(f"UNEXPECTED: у файлі {path} знайдено {error} (рядок {line_no})")
+        else:
+            # Непередбачений блок з SourceString — повідомляємо і зупиняємо
+            line_no = locate_source_string(path, searched_values, node.get("SourceString", ""), original_text)
+            if line_no is None:
+                raise RuntimeError(f"UNEXPECTED BLOCK: файл {path}, неочікуваний блок з SourceString (не вдалось знайти номер рядка)")
             else:
-                continue
+                raise RuntimeError(f"UNEXPECTED BLOCK: файл {path}, рядок {line_no})")
 
-        # property-like (DisplayName, DeathMenuText, SelectedKeyName тощо)
-        # Пропускаємо, якщо це EX_TextConst-контекст або ми всередині DataTable
-        if not in_textconst_context and data_table_ancestor is None:
-            key_prop, source_prop, trans_prop, ctx_prop = handle_property_node(node, parent, parent_key, ancestry, path)
-            src_val = get_text(source_prop)
-            if key_prop and src_val is not None:
-                final_key = key_prop
-                if "::" not in final_key:
-                    ns, matched = match_stringtable_namespace_for_key(final_key, key_to_ns)
-                    if ns:
-                        final_key = f"{ns}::{matched}"
-                if final_key not in emitted_keys:
-                    writer.writerow([final_key, src_val, trans_prop, ctx_prop])
-                    emitted_keys.add(final_key)
-                _, match_pos = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-                if match_pos is not None:
-                    search_start_pos = match_pos + 1
-                continue
+def resolve_candidate_key(candidate, st_index):
+    """Остаточний ключ кандидата: з namespace StringTable, якщо ключ збігається з її ключем."""
+    final_key = candidate[0]
+    if candidate[4] or "::" not in final_key:
+        ns, matched = match_stringtable_namespace_indexed(final_key, st_index)
+        if ns:
+            final_key = f"{ns}::{matched}"
+    return final_key
 
-        # DataTable
-        if data_table_ancestor is not None:
-            key, source, translation, context = handle_data_table(node, parent, parent_key, ancestry, path, data_table_ancestor)
-            src_val = get_text(source)
-            if not key or src_val is None:
-                line_no, _ = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-                if line_no is None:
-                    raise RuntimeError(f"UNEXPECTED: у файлі {path} знайдено DataTable-елемент без key (не вдалось знайти номер рядка)")
+def emit_candidate(candidate, writer, st_index, emitted_keys):
+    """Пише рядок кандидата; повертає False, якщо такий ключ уже був записаний."""
+    final_key = resolve_candidate_key(candidate, st_index)
+    if final_key in emitted_keys:
+        return False
+    writer.writerow([final_key, candidate[1], candidate[2], candidate[3]])
+    emitted_keys.add(final_key)
+    return True
+
+def process_file(path, writer, key_to_ns, emitted_keys):
+    original_text, data = load_json_file(path)
+    st_index = build_stringtable_index(key_to_ns)
+    for candidate in extract_candidates(data, path, original_text):
+        emit_candidate(candidate, writer, st_index, emitted_keys)
+
+# ---------------- Однопрохідний рушій ----------------
+# Байтові маркери префільтра: файл без жодного з них (меші, матеріали, анімації) не дає ні кандидатів,
+# ні StringTable-блоків, тож його можна не декодувати. Ключі JSON з \u-екрануванням не розпізнаються.
+TEXT_MARKERS = (b"SourceString", b"StringTable")
+
+def has_text_markers(buf):
+    return any(buf.find(marker) != -1 for marker in TEXT_MARKERS)
+
+def scan_data(path, data, file_stats=None, prune=None):
+    stages = file_stats["stages"] if file_stats is not None else None
+    with timed_stage(stages, "stringtables"):
+        blocks = find_stringtable_blocks(data)
+    source_nodes = None
+    if file_stats is not None:
+        file_stats["nodes"] = count_nodes(data)
+        # лічильники могли лишитись від невдалого потокового розбору цього ж файлу
+        file_stats["visited"] = file_stats["pruned"] = 0
+        source_nodes = timed_source_nodes(data, file_stats, prune)
+    candidates = []
+    try:
+        with timed_stage(stages, "extract"):
+            for candidate in extract_candidates(data, path, source_nodes=source_nodes, prune=prune):
+                candidates.append(candidate)
+    except Exception as e:
+        return blocks, candidates, e
+    return blocks, candidates, None
+
+def scan_file(path, stream_threshold=None, json_backend="stdlib", file_stats=None, prune=None):
+    """
+    Читає і декодує файл рівно один раз. Повертає (stringtable_blocks, candidates, error):
+    error — виняток, який process_file підняв би після запису candidates (або None).
+    Файли від stream_threshold байтів (типово STREAM_THRESHOLD) розбираються потоково;
+    решта декодується json_backend (див. resolve_json_backend). prune — профіль відсікання піддерев.
+    """
+    if stream_threshold is None:
+        stream_threshold = STREAM_THRESHOLD
+    stages = file_stats["stages"] if file_stats is not None else None
+    try:
+        if os.path.getsize(path) >= stream_threshold:
+            with timed_stage(stages, "stream"):
+                return scan_file_streaming(path, prune=prune, counts=file_stats)
+    except (OSError, ValueError):
+        # Порожній чи пошкоджений файл: звичайний розбір дасть те саме повідомлення про помилку, що й раніше
+        pass
+    try:
+        # Текст файлу не тримаємо: для діагностики помилок його буде перечитано
+        with timed_stage(stages, "decode"):
+            _, data = load_json_file(path, json_backend)
+    except Exception as e:
+        return [], [], e
+    return scan_data(path, data, file_stats, prune)
+
+def scan_file_prefiltered(path, stream_threshold=None, prefilter=True, json_backend="stdlib", file_stats=None,
+                          prune=None):
+    """
+    scan_file з байтовим префільтром. Повертає (результат scan_file, skipped_bytes): файл
+    відображається через mmap, і якщо в ньому немає TEXT_MARKERS, він не декодується —
+    skipped_bytes тоді дорівнює його розміру, інакше None. Файл з маркерами декодується
+    прямо з того самого mmap.
+    """
+    if stream_threshold is None:
+        stream_threshold = STREAM_THRESHOLD
+    stages = file_stats["stages"] if file_stats is not None else None
+    if prefilter:
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return ([], [], None), 0
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    with timed_stage(stages, "prefilter"):
+                        found = has_text_markers(buf)
+                    if not found:
+                        return ([], [], None), size
+                    if size < stream_threshold:
+                        try:
+                            with timed_stage(stages, "decode"):
+                                _, data = decode_json_bytes(buf, path, json_backend)
+                        except Exception as e:
+                            return ([], [], e), None
+                        return scan_data(path, data, file_stats, prune), None
+        except (OSError, ValueError):
+            # Неможливо відобразити файл — помилку покаже звичайний розбір
+            pass
+    return scan_file(path, stream_threshold, json_backend, file_stats, prune), None
+
+def scan_file_entry(path, stream_threshold=None, prefilter=True, json_backend="stdlib", collect_stats=False,
+                    prune=None):
+    """
+    Одиниця роботи для scan_files: (результат scan_file, skipped_bytes, file_stats).
+    file_stats (лише з collect_stats) — час етапів і лічильники файлу для RunStats.
+    """
+    if not collect_stats:
+        return scan_file_prefiltered(path, stream_threshold, prefilter, json_backend, prune=prune) + (None,)
+    file_stats = new_file_stats(path)
+    wall, cpu = time.perf_counter(), time.process_time()
+    result, skipped = scan_file_prefiltered(path, stream_threshold, prefilter, json_backend, file_stats, prune)
+    file_stats["wall"] = time.perf_counter() - wall
+    file_stats["cpu"] = time.process_time() - cpu
+    file_stats["candidates"] = len(result[1])
+    return result, skipped, file_stats
+
+def scan_files(paths, jobs=1, stream_threshold=None, prefilter=True, json_backend="stdlib", collect_stats=False,
+               prune=None):
+    """
+    Застосовує scan_file_entry до paths (у пулі процесів при jobs > 1); порядок результатів — як у paths.
+    Повертає [(результат scan_file, skipped_bytes, file_stats)].
+    """
+    scan = partial(scan_file_entry, stream_threshold=stream_threshold, prefilter=prefilter,
+                   json_backend=json_backend, collect_stats=collect_stats, prune=prune)
+    if jobs > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(scan, paths, chunksize=chunksize))
+    return [scan(file_path) for file_path in paths]
+
+def scan_roots(roots, jobs=1, cache=None, cache_hash=False, stream_threshold=None, prefilter=True,
+               json_backend="stdlib", stats=None, verbose=True, manifest=None, prune=None):
+    """
+    Перша фаза: один обхід тек і одне декодування кожного файлу.
+    Повертає (files_by_root, results, key_to_ns), де files_by_root — [(root, [file_path, ...])],
+    results — {file_path: результат scan_file}.
+    При jobs > 1 файли розподіляються між процесами; результати збираються в порядку
+    sorted_walk, тож StringTable-мапа і вихідний CSV ті самі, що й при послідовному запуску.
+    З cache (див. open_scan_cache) декодуються лише змінені файли; з prefilter — лише ті,
+    що містять TEXT_MARKERS (див. scan_file_entry). stats (RunStats) збирає час етапів для --stats.
+    verbose=False — без підсумків префільтра і кешу в stdout (для iter_rows). manifest (FileManifest) —
+    уже готовий обхід тек (див. build_manifest); без нього теки обходяться тут. prune (PruneProfile) —
+    відсікання піддерев під час обходу; кеш має бути відкритий з тим самим профілем (open_scan_cache).
+    """
+    stages = stats.stages if stats is not None else None
+    with timed_stage(stages, "walk_dirs"):
+        if manifest is None:
+            manifest = build_manifest(roots)
+        files_by_root = [(root, manifest.files(root)) for root in roots]
+        unique_paths = list(dict.fromkeys(p for _, paths in files_by_root for p in paths))
+    results = {}
+    stale_paths = unique_paths
+    if cache is not None:
+        stale_paths = []
+        fingerprints = {}
+        with timed_stage(stages, "cache_lookup"):
+            for file_path in unique_paths:
+                cached, fingerprint = cache_lookup(cache, file_path, cache_hash, manifest.stat(file_path))
+                if cached is not None:
+                    results[file_path] = cached
                 else:
-                    raise RuntimeError(f"UNEXPECTED: у файлі {path} знайдено DataTable-елемент без key (рядок {line_no})")
-            ns, matched = match_stringtable_namespace_for_key(key, key_to_ns)
-            final_key = f"{ns}::{matched}" if ns else key
-            if final_key not in emitted_keys:
-                writer.writerow([final_key, src_val, translation, context])
-                emitted_keys.add(final_key)
-            _, match_pos = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-            if match_pos is not None:
-                search_start_pos = match_pos + 1
-            continue
+                    stale_paths.append(file_path)
+                    fingerprints[file_path] = fingerprint
+    skipped_files = skipped_bytes = 0
+    with timed_stage(stages, "scan"):
+        scanned = scan_files(stale_paths, jobs, stream_threshold, prefilter, json_backend,
+                             collect_stats=stats is not None, prune=prune)
+    for file_path, (result, skipped, file_stats) in zip(stale_paths, scanned):
+        results[file_path] = result
+        if skipped is not None:
+            skipped_files += 1
+            skipped_bytes += skipped
+        if file_stats is not None and skipped is None:
+            stats.add_file(file_stats)
+    if stats is not None:
+        stats.files_total = len(unique_paths)
+        stats.cached_files = len(unique_paths) - len(stale_paths)
+        stats.skipped_files = skipped_files
+        stats.skipped_bytes = skipped_bytes
+    if prefilter and verbose:
+        print(f"Префільтр: без SourceString/StringTable пропущено {skipped_files} з {len(stale_paths)} файлів "
+              f"({skipped_bytes / (1024 * 1024):.1f} МБ не декодувались).")
+    if cache is not None:
+        with timed_stage(stages, "cache_store"):
+            cache_store(cache, [(p, fingerprints[p], results[p]) for p in stale_paths], unique_paths)
+        if verbose:
+            print(f"Кеш: без змін {len(unique_paths) - len(stale_paths)} з {len(unique_paths)} файлів, розібрано {len(stale_paths)}.")
+    key_to_ns = {}
+    with timed_stage(stages, "merge_stringtables"):
+        for file_path in unique_paths:
+            merge_stringtable_blocks(key_to_ns, results[file_path][0])
+    return files_by_root, results, key_to_ns
 
-        # UserDefinedEnum
-        if user_enum_ancestor is not None:
-            key, source, translation, context = handle_user_defined_enum(node, parent, parent_key, ancestry, path)
-            src_val = get_text(source)
-            if not key or src_val is None:
-                line_no, _ = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-                if line_no is None:
-                    raise RuntimeError(f"UNEXPECTED: у файлі {path} знайдено UserDefinedEnum-елемент без hash (не вдалось знайти номер рядка)")
+# ---------------- Рядки результату ----------------
+# Рядок у тому вигляді, в якому він потрапляє в CSV (key, source, Translation, context), плюс JSON-файл,
+# з якого його взято, і обробник, що його дав (CANDIDATE_KINDS або "stringtable").
+ExtractedRow = namedtuple("ExtractedRow", ("key", "source", "translation", "context", "path", "kind"))
+
+CSV_HEADER = ["key", "source", "Translation", "context"]
+
+def iter_result_rows(files_by_root, results, st_index, stats=None):
+    """
+    Друга фаза: підбір namespace і ExtractedRow з пам'яті в порядку обходу, потім рядки
+    StringTable, яких ще не було. Дублікати ключів відкидаються. Якщо розбір файлу завершився
+    помилкою, видає його рядки до помилки і піднімає її (як process_file).
+    """
+    emitted_keys = set()
+    for root, paths in files_by_root:
+        if not os.path.isdir(root):
+            print(f"WARNING: шлях {root} не є текою, пропускаю.")
+            continue
+        for file_path in paths:
+            _, candidates, error = results[file_path]
+            for candidate in candidates:
+                if stats is None:
+                    final_key = resolve_candidate_key(candidate, st_index)
                 else:
-                    raise RuntimeError(f"UNEXPECTED: у файлі {path} знайдено UserDefinedEnum-елемент без hash (рядок {line_no})")
-            ns, matched = match_stringtable_namespace_for_key(key, key_to_ns)
-            final_key = f"{ns}::{matched}" if ns else key
-            if final_key not in emitted_keys:
-                writer.writerow([final_key, src_val, translation, context])
+                    wall, cpu = time.perf_counter(), time.process_time()
+                    final_key = resolve_candidate_key(candidate, st_index)
+                    stats.add("namespace", time.perf_counter() - wall, time.process_time() - cpu)
+                    stats.count_row(candidate[5], final_key not in emitted_keys)
+                if final_key in emitted_keys:
+                    continue
                 emitted_keys.add(final_key)
-            _, match_pos = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-            if match_pos is not None:
-                search_start_pos = match_pos + 1
+                yield ExtractedRow(final_key, candidate[1], candidate[2], candidate[3], file_path, candidate[5])
+            if error is not None:
+                # той самий об'єкт помилки лишається в results (--watch): без старого traceback
+                raise error.with_traceback(None)
+    # Після обробки всіх файлів — додатково згенерувати рядки зі StringTable, якщо їх ще не було.
+    # Час stringtable_rows — лише побудова ключа й context (як namespace), без часу споживача між yield.
+    for root, paths in files_by_root:
+        for file_path in paths:
+            for ns, keysmap in results[file_path][0]:
+                for k, v in keysmap.items():
+                    if stats is not None:
+                        wall, cpu = time.perf_counter(), time.process_time()
+                    # Якщо немає TableNamespace — формуємо ключ без префікса
+                    final_key = f"{ns}::{k}" if ns else k
+                    if final_key in emitted_keys:
+                        if stats is not None:
+                            stats.add("stringtable_rows", time.perf_counter() - wall, time.process_time() - cpu)
+                            stats.count_row("stringtable", False)
+                        continue
+                    source_val = v if isinstance(v, str) else str(v)
+                    relpath = relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
+                    context = relpath if relpath else file_path
+                    emitted_keys.add(final_key)
+                    if stats is not None:
+                        stats.add("stringtable_rows", time.perf_counter() - wall, time.process_time() - cpu)
+                        stats.count_row("stringtable", True)
+                    yield ExtractedRow(final_key, source_val, "", context, file_path, "stringtable")
+
+def iter_rows(roots, jobs=1, cache=None, stream_threshold=None, prefilter=True, json_backend="auto", prune=DEFAULT_PRUNE):
+    """
+    Програмний інтерфейс екстрактора: ті самі рядки, що потрапили б у CSV, як ExtractedRow,
+    без запису і повторного читання CSV. roots — тека або список тек; cache — шлях до
+    SQLite-кешу розбору (див. --cache). Рядки видаються після розбору всіх файлів (namespace
+    залежить від усіх StringTable). Непередбачений блок піднімає RuntimeError після рядків,
+    що йому передували. prune — профіль відсікання піддерев (ім'я, PruneProfile або None/"off").
+    """
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    roots = [os.path.abspath(root) for root in roots]
+    json_backend = resolve_json_backend(json_backend)
+    prune = resolve_prune_profile(prune)
+    conn = open_scan_cache(cache, prune_signature(prune)) if cache is not None else None
+    try:
+        files_by_root, results, key_to_ns = scan_roots(
+            roots, jobs=jobs, cache=conn, stream_threshold=stream_threshold, prefilter=prefilter,
+            json_backend=json_backend, verbose=False, prune=prune,
+        )
+    finally:
+        if conn is not None:
+            conn.close()
+    yield from iter_result_rows(files_by_root, results, build_stringtable_index(key_to_ns))
+
+class TextColumn:
+    """
+    Стовпчик рядків в одному bytearray (UTF-8) з масивом кінців: близько байта на символ замість
+    окремого str (з ~50 байтами заголовка) на кожне значення. Рядок декодується при читанні.
+    """
+    __slots__ = ("_blob", "_ends")
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._ends = array("Q")
+
+    def append(self, value):
+        # surrogatepass: JSON допускає одиночні сурогати (\ud800), їх теж треба повернути як є
+        self._blob += value.encode("utf-8", "surrogatepass")
+        self._ends.append(len(self._blob))
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, index):
+        start = self._ends[index - 1] if index > 0 else 0
+        return self._blob[start:self._ends[index]].decode("utf-8", "surrogatepass")
+
+    def __iter__(self):
+        blob = self._blob
+        start = 0
+        for end in self._ends:
+            yield blob[start:end].decode("utf-8", "surrogatepass")
+            start = end
+
+class RowStore:
+    """
+    Компактне сховище рядків (десятки тисяч рядків повного дампу) по стовпчиках. key і source —
+    TextColumn; translation, path, kind і рядки context (адреса ассету, "Name: ...", ...) —
+    номери в спільному пулі інтернованих рядків (array 'I'), тож адреса, спільна для тисяч рядків
+    одного ассету, лежить у пам'яті один раз, а повний context збирається лише при читанні рядка.
+    Дублікати ключів дозволені (як у CSV); find повертає перший рядок з ключем.
+    """
+    __slots__ = ("keys", "sources", "_translations", "_paths", "_kinds", "_context_parts", "_context_ends",
+                 "_strings", "_string_ids", "_first_index", "_irregular")
+
+    def __init__(self, rows=()):
+        self.keys = TextColumn()
+        self.sources = TextColumn()
+        self._translations = array("I")
+        self._paths = array("I")
+        self._kinds = array("I")
+        # номери рядків context усіх рядків підряд; _context_ends[i] — кінець частин рядка i
+        self._context_parts = array("I")
+        self._context_ends = array("Q")
+        self._strings = []
+        self._string_ids = {}
+        # ключ -> перший номер рядка; будується при першому find
+        self._first_index = None
+        # рядки CSV не з чотирьох стовпчиків: номер -> повний список значень
+        self._irregular = {}
+        for row in rows:
+            self.append(*row)
+
+    def _intern(self, value):
+        strings = self._strings
+        string_id = self._string_ids.setdefault(value, len(strings))
+        if string_id == len(strings):
+            strings.append(value)
+        return string_id
+
+    def append(self, key, source, translation="", context="", path="", kind=""):
+        """Додає рядок і повертає його номер."""
+        index = len(self.keys)
+        intern = self._intern
+        self.keys.append(key)
+        self.sources.append(source)
+        self._translations.append(intern(translation))
+        context_parts = self._context_parts
+        for part in context.split("\n"):
+            context_parts.append(intern(part))
+        self._context_ends.append(len(context_parts))
+        self._paths.append(intern(path))
+        self._kinds.append(intern(kind))
+        if self._first_index is not None:
+            self._first_index.setdefault(key, index)
+        return index
+
+    def append_values(self, values, path="", kind=""):
+        """Додає рядок CSV (список значень будь-якої довжини); values(index) поверне його без змін."""
+        if len(values) == 4:
+            return self.append(*values, path=path, kind=kind)
+        padded = list(values[:4]) + [""] * (4 - len(values))
+        index = self.append(*padded, path=path, kind=kind)
+        self._irregular[index] = list(values)
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def find(self, key):
+        """Номер першого рядка з ключем key або None."""
+        if self._first_index is None:
+            self._first_index = {}
+            for index, row_key in enumerate(self.keys):
+                self._first_index.setdefault(row_key, index)
+        return self._first_index.get(key)
+
+    def context(self, index):
+        start = self._context_ends[index - 1] if index > 0 else 0
+        return "\n".join([self._strings[i] for i in self._context_parts[start:self._context_ends[index]]])
+
+    def row(self, index):
+        return ExtractedRow(self.keys[index], self.sources[index], self._strings[self._translations[index]],
+                            self.context(index), self._strings[self._paths[index]], self._strings[self._kinds[index]])
+
+    def values(self, index):
+        """Значення рядка для CSV: key, source, Translation, context (або збережений рядок CSV як є)."""
+        irregular = self._irregular.get(index)
+        if irregular is not None:
+            return list(irregular)
+        return [self.keys[index], self.sources[index], self._strings[self._translations[index]], self.context(index)]
+
+    def __iter__(self):
+        return (self.row(index) for index in range(len(self.keys)))
+
+# ---------------- Інкрементальний кеш ----------------
+# Кеш зберігає результат scan_file для кожного файлу: StringTable-блоки і кандидати з "сирими"
+# ключами, ДО підбору namespace. Тому зміна StringTable-мапи не потребує інвалідації записів
+# незмінених файлів: мапа і підбір namespace щоразу перебудовуються з усіх блоків у порядку обходу.
+# Файли, розбір яких завершився помилкою, не кешуються. При зміні логіки екстракції збільшуйте
+# SCAN_CACHE_VERSION — старий кеш буде скинуто.
+SCAN_CACHE_VERSION = "2"
+
+def open_scan_cache(cache_path, options=None):
+    """
+    Відкриває кеш розбору. options — опис налаштувань, від яких залежать кандидати (prune_signature;
+    типово — профілю DEFAULT_PRUNE); якщо він не збігається з тим, з яким кеш заповнювався, записи
+    файлів скидаються.
+    """
+    if options is None:
+        options = prune_signature(resolve_prune_profile(DEFAULT_PRUNE))
+    conn = sqlite3.connect(cache_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files ("
+        "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, blocks TEXT, candidates TEXT)"
+    )
+    meta = dict(conn.execute("SELECT name, value FROM meta WHERE name IN ('version', 'options')"))
+    if meta.get("version") != SCAN_CACHE_VERSION or meta.get("options", "off") != options:
+        conn.execute("DELETE FROM files")
+        conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                         (("version", SCAN_CACHE_VERSION), ("options", options)))
+        conn.commit()
+    return conn
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_lookup(conn, path, use_hash=False, stat=_MISSING):
+    """
+    Повертає (результат scan_file з кешу або None, відбиток (size, mtime_ns, digest) поточного файлу).
+    Збіг — однакові size і mtime; з use_hash також однаковий sha1 при зміненому mtime.
+    stat — (size, mtime_ns) з маніфесту (None — файл недоступний); без нього файл stat-иться тут.
+    """
+    if stat is _MISSING:
+        stat = stat_pair(path)
+    if stat is None:
+        return None, None
+    st_size, st_mtime_ns = stat
+    row = conn.execute(
+        "SELECT size, mtime_ns, digest, blocks, candidates FROM files WHERE path = ?", (path,)
+    ).fetchone()
+    digest = None
+    if row is not None:
+        size, mtime_ns, old_digest, blocks, candidates = row
+        hit = size == st_size and mtime_ns == st_mtime_ns
+        if not hit and use_hash and old_digest and size == st_size:
+            digest = file_digest(path)
+            hit = digest == old_digest
+            if hit:
+                conn.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (st_mtime_ns, path))
+        if hit:
+            blocks = [(ns, keysmap) for ns, keysmap in json.loads(blocks)]
+            candidates = [tuple(c) for c in json.loads(candidates)]
+            return (blocks, candidates, None), (st_size, st_mtime_ns, old_digest)
+    if use_hash and digest is None:
+        digest = file_digest(path)
+    return None, (st_size, st_mtime_ns, digest)
+
+def cache_store(conn, entries, live_paths):
+    """entries — [(path, відбиток, результат scan_file)]; записи для файлів поза live_paths видаляються."""
+    rows = []
+    for path, fingerprint, (blocks, candidates, error) in entries:
+        if fingerprint is None or error is not None:
+            conn.execute("DELETE FROM files WHERE path = ?", (path,))
             continue
+        size, mtime_ns, digest = fingerprint
+        rows.append((
+            path, size, mtime_ns, digest,
+            json.dumps(blocks, ensure_ascii=False),
+            json.dumps(candidates, ensure_ascii=False),
+        ))
+    conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+    live = set(live_paths)
+    gone = [(p,) for (p,) in conn.execute("SELECT path FROM files") if p not in live]
+    conn.executemany("DELETE FROM files WHERE path = ?", gone)
+    conn.commit()
 
-        # Script/EX_TextConst (універсальний)
-        if isinstance(node, dict) and "SourceString" in node:
-            key, source, translation, context = handle_script_textconst(node, parent, parent_key, ancestry, path)
-            src_val = get_text(source)
-            if key and src_val is not None:
-                ns, matched = match_stringtable_namespace_for_key(key, key_to_ns)
-                final_key = f"{ns}::{matched}" if ns else key
-                # yield якщо final_key має :: або не порожній (залишаємо FastTravelFailReason), навіть якщо Namespace порожній
-                if ("::" in str(final_key) or final_key) and final_key not in emitted_keys:
-                    writer.writerow([final_key, src_val, translation, context])
-                    emitted_keys.add(final_key)
-                _, match_pos = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-                if match_pos is not None:
-                    search_start_pos = match_pos + 1
+# ---------------- SQLite-вивід (--format sqlite) ----------------
+# Ті самі рядки, що й у CSV, в індексованій базі: entries (порядок рядків — id) з посиланням на
+# нормалізовану таблицю assets (JSON-файл і його адреса після UnleashedPrototype/Content).
+# key_suffix — частина ключа після '::' (як compare_csv_keys.split_key) або NULL для порожнього ключа.
+# Індекси на key, key_suffix, source і asset_id будуються після вставки всіх рядків.
+OUTPUT_FORMATS = ("csv", "jsonl", "sqlite")
+OUTPUT_DB_VERSION = "1"
+OUTPUT_DB_BATCH = 10000
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+
+def key_suffix(key):
+    """Суфікс ключа для порівнянь: після першого '::' ключа без пробілів з країв; None — порожній ключ."""
+    key = key.strip()
+    if not key:
+        return None
+    return key.split("::", 1)[1] if "::" in key else key
+
+def create_output_db(path):
+    conn = sqlite3.connect(path)
+    # файл пишеться цілком і потім атомарно замінює попередній — журнал не потрібен
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE assets (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, relpath TEXT)")
+    conn.execute(
+        "CREATE TABLE entries (id INTEGER PRIMARY KEY, key TEXT NOT NULL, key_suffix TEXT, source TEXT, "
+        "translation TEXT, context TEXT, asset_id INTEGER REFERENCES assets (id), kind TEXT)"
+    )
+    conn.execute("INSERT INTO meta (name, value) VALUES ('version', ?)", (OUTPUT_DB_VERSION,))
+    return conn
+
+def write_rows_sqlite(conn, rows, stats=None):
+    """
+    Вставляє рядки (ExtractedRow) пакетами по OUTPUT_DB_BATCH в одній транзакції, потім будує
+    індекси. Помилка ітератора (непередбачений блок) повертається, рядки до неї лишаються в базі.
+    """
+    stages = stats.stages if stats is not None else None
+    asset_ids = {}
+    batch = []
+    error = None
+
+    def flush():
+        with timed_stage(stages, "sqlite_write"):
+            conn.executemany("INSERT INTO entries (key, key_suffix, source, translation, context, asset_id, kind) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        batch.clear()
+
+    try:
+        for row in rows:
+            asset_id = asset_ids.get(row.path)
+            if asset_id is None:
+                relpath = relative_after_markers(row.path, markers=("UnleashedPrototype", "Content"))
+                asset_id = asset_ids[row.path] = conn.execute(
+                    "INSERT INTO assets (path, relpath) VALUES (?, ?)", (row.path, relpath)).lastrowid
+            batch.append((row.key, key_suffix(row.key), row.source, row.translation, row.context, asset_id, row.kind))
+            if len(batch) >= OUTPUT_DB_BATCH:
+                flush()
+    except Exception as e:
+        error = e
+    flush()
+    with timed_stage(stages, "sqlite_index"):
+        conn.execute("CREATE INDEX entries_key ON entries (key)")
+        conn.execute("CREATE INDEX entries_key_suffix ON entries (key_suffix)")
+        conn.execute("CREATE INDEX entries_source ON entries (source)")
+        conn.execute("CREATE INDEX entries_asset ON entries (asset_id)")
+        conn.commit()
+    return error
+
+# ---------------- Запис результату ----------------
+# CSV і JSONL серіалізуються у фоновому потоці: головний потік підбирає namespace і складає пакети по
+# OUTPUT_BATCH_ROWS рядків у чергу з OUTPUT_QUEUE_BATCHES місць (пам'ять не росте, якщо диск повільніший),
+# потік-записувач пише їх через буфер OUTPUT_BUFFER. Стиснення (gzip/lzma за розширенням .gz/.xz/.lzma)
+# теж іде в ньому і відпускає GIL. Результат пишеться у тимчасовий файл і замінює попередній лише після
+# успішного запису; рядки до помилки лишаються поруч (partial_output_path), а не замість готового файлу.
+# На одному ядрі потоку нема з чим перекриватись — там пакети пишуться прямо в головному потоці.
+OUTPUT_COMPRESSORS = {".gz": partial(gzip.open, compresslevel=6), ".xz": lzma.open, ".lzma": lzma.open}
+OUTPUT_BUFFER = 4 * 1024 * 1024
+OUTPUT_BATCH_ROWS = 4096
+OUTPUT_QUEUE_BATCHES = 8
+OUTPUT_THREADED = (os.cpu_count() or 1) > 1
+
+def output_compressor(path):
+    """gzip.open/lzma.open за розширенням шляху або None — без стиснення."""
+    return OUTPUT_COMPRESSORS.get(os.path.splitext(path)[1].lower())
+
+def partial_output_path(out_path):
+    """Куди лишаються рядки до помилки: parsed.csv -> parsed.partial.csv, parsed.jsonl.gz -> parsed.partial.jsonl.gz."""
+    stem, compressed_ext = out_path, ""
+    if output_compressor(out_path) is not None:
+        stem, compressed_ext = os.path.splitext(out_path)
+    root, ext = os.path.splitext(stem)
+    return f"{root}.partial{ext}{compressed_ext}"
+
+def open_text_output(path, compressor=None):
+    """Текстовий потік UTF-8 (без перетворення '\\n') з буфером OUTPUT_BUFFER, опційно стиснутий."""
+    if compressor is None:
+        return open(path, "w", newline="", encoding="utf-8", buffering=OUTPUT_BUFFER)
+    return io.TextIOWrapper(io.BufferedWriter(compressor(path, "wb"), OUTPUT_BUFFER), encoding="utf-8", newline="")
+
+class AsyncRowWriter:
+    """
+    Фоновий потік, що викликає write_batch(batch) для пакетів із черги. put блокується, коли черга
+    повна, і одразу піднімає помилку потоку, якщо запис уже впав; close дочікується запису всіх
+    пакетів і теж піднімає цю помилку. threaded=False — write_batch викликається прямо в put.
+    """
+
+    def __init__(self, write_batch, maxsize=OUTPUT_QUEUE_BATCHES, threaded=True):
+        self.write_batch = write_batch
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            # після помилки черга лише спорожнюється, щоб put не заблокувався назавжди
+            if self.error is None:
+                try:
+                    self.write_batch(batch)
+                except BaseException as e:
+                    self.error = e
+
+    def put(self, batch):
+        if self.error is not None:
+            raise self.error
+        if self.thread is None:
+            self.write_batch(batch)
+        else:
+            self.queue.put(batch)
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+def write_rows_async(stream, output_format, rows, stats=None, threaded=OUTPUT_THREADED):
+    """
+    Пише заголовок і рядки (ExtractedRow) у stream у форматі csv або jsonl через AsyncRowWriter.
+    Помилка ітератора rows (непередбачений блок) повертається — рядки до неї вже записані;
+    помилка запису піднімається.
+    """
+    if output_format == "jsonl":
+        fields = ExtractedRow._fields
+
+        def serialize(batch):
+            stream.write("".join(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n" for row in batch))
+    else:
+        writer = csv.writer(stream)
+        writer.writerow(CSV_HEADER)
+
+        def serialize(batch):
+            writer.writerows(row[:4] for row in batch)
+
+    def timed_serialize(batch):
+        # час самого потоку-записувача (thread_time), а не процесу
+        wall, cpu = time.perf_counter(), time.thread_time()
+        serialize(batch)
+        stats.add("output_write", time.perf_counter() - wall, time.thread_time() - cpu)
+
+    write_batch = timed_serialize if stats is not None else serialize
+    writer_thread = AsyncRowWriter(write_batch, threaded=threaded)
+    error = None
+    batch = []
+    try:
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= OUTPUT_BATCH_ROWS:
+                    writer_thread.put(batch)
+                    batch = []
+        except Exception as e:
+            error = e
+        if batch:
+            writer_thread.put(batch)
+    finally:
+        writer_thread.close()
+    return error
+
+def write_output(out_path, output_format, files_by_root, results, st_index, stats=None, keep_partial=True):
+    """
+    Пише рядки у out_path у форматі output_format (csv, jsonl — стиснуті за розширенням, див.
+    output_compressor; sqlite) через тимчасовий файл, який замінює out_path (os.replace) лише після
+    успішного запису. Повертає помилку розбору/запису або None. При помилці out_path не змінюється:
+    з keep_partial рядки до помилки лишаються у partial_output_path(out_path), інакше видаляються.
+    """
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    rows = iter_result_rows(files_by_root, results, st_index, stats)
+    try:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if output_format == "sqlite":
+            conn = create_output_db(tmp_path)
+            try:
+                error = write_rows_sqlite(conn, rows, stats)
+            finally:
+                conn.close()
+        else:
+            with open_text_output(tmp_path, output_compressor(out_path)) as stream:
+                error = write_rows_async(stream, output_format, rows, stats)
+    except Exception as e:
+        error = e
+    except BaseException:
+        # Ctrl+C: недописаний тимчасовий файл не лишаємо
+        discard_file(tmp_path)
+        raise
+    if error is not None:
+        if keep_partial:
+            try:
+                os.replace(tmp_path, partial_output_path(out_path))
+            except OSError:
+                discard_file(tmp_path)
+        else:
+            discard_file(tmp_path)
+        return error
+    try:
+        os.replace(tmp_path, out_path)
+    except OSError as e:
+        discard_file(tmp_path)
+        return e
+    return None
+
+def discard_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def is_output_db(path):
+    """Чи це база SQLite (а не CSV) — за сигнатурою на початку файлу."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(_SQLITE_MAGIC)) == _SQLITE_MAGIC
+    except OSError:
+        return False
+
+def connect_output_db(path):
+    """Підключення до бази --format sqlite лише для читання."""
+    return sqlite3.connect(Path(os.path.abspath(path)).as_uri() + "?mode=ro", uri=True)
+
+def iter_output_db_rows(path):
+    """Рядки бази --format sqlite як ExtractedRow у порядку запису."""
+    conn = connect_output_db(path)
+    try:
+        query = ("SELECT e.key, e.source, e.translation, e.context, a.path, e.kind "
+                 "FROM entries e LEFT JOIN assets a ON a.id = e.asset_id ORDER BY e.id")
+        for key, source, translation, context, asset_path, kind in conn.execute(query):
+            yield ExtractedRow(key, source or "", translation or "", context or "", asset_path or "", kind or "")
+    finally:
+        conn.close()
+
+# ---------------- Статистика (--stats) ----------------
+# Етапи верхнього рівня (обхід тек, кеш, розбір, підбір namespace, запис CSV) міряються в головному
+# процесі; етапи окремих файлів (префільтр, декодування, StringTable, обхід find_source_nodes,
+# обробники) — там, де файл розбирався, і повертаються з file_stats навіть із процесів пулу.
+# Без --stats жоден з цих лічильників не вмикається.
+@contextmanager
+def timed_stage(stages, name):
+    """Додає wall/CPU-час блоку до stages[name] = [wall, cpu]; stages=None — без вимірювання."""
+    if stages is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        entry = stages.setdefault(name, [0.0, 0.0])
+        entry[0] += time.perf_counter() - wall
+        entry[1] += time.process_time() - cpu
+
+def new_file_stats(path):
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return {"path": path, "bytes": size, "stages": {}, "nodes": 0, "visited": 0, "pruned": 0, "source_nodes": 0,
+            "candidates": 0, "wall": 0.0, "cpu": 0.0}
+
+def count_nodes(data):
+    """Кількість dict/list у дереві (для StreamedList — лише сам список, без повторного читання)."""
+    count = 0
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            count += 1
+            stack.extend(v for v in obj.values() if isinstance(v, (dict, list)))
+        elif isinstance(obj, list):
+            count += 1
+            stack.extend(v for v in obj if isinstance(v, (dict, list)))
+        elif isinstance(obj, StreamedList):
+            count += 1
+    return count
+
+def timed_source_nodes(data, file_stats, prune=None):
+    """
+    find_source_nodes(data), що додає час усередині обходу до етапу "walk" і рахує знайдені,
+    обійдені й відсічені (prune) вузли у file_stats.
+    """
+    nodes = find_source_nodes(data, prune=prune, counts=file_stats)
+    walk = file_stats["stages"].setdefault("walk", [0.0, 0.0])
+    while True:
+        wall, cpu = time.perf_counter(), time.process_time()
+        item = next(nodes, None)
+        walk[0] += time.perf_counter() - wall
+        walk[1] += time.process_time() - cpu
+        if item is None:
+            return
+        file_stats["source_nodes"] += 1
+        yield item
+
+class RunStats:
+    """
+    Зведення для --stats: wall/CPU-час етапів, вузли, рядки й дублікати (відкинуті через
+    emitted_keys) за видом обробника, найповільніші файли.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.file_stages = {}
+        self.files = []
+        self.files_total = 0
+        self.cached_files = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.rows = Counter()
+        self.duplicates = Counter()
+
+    def add(self, name, wall, cpu):
+        entry = self.stages.setdefault(name, [0.0, 0.0])
+        entry[0] += wall
+        entry[1] += cpu
+
+    def add_file(self, file_stats):
+        stages = file_stats["stages"]
+        # extract = обхід + обробники; обхід уже виміряно окремо
+        extract = stages.pop("extract", None)
+        if extract is not None:
+            walk = stages.get("walk", [0.0, 0.0])
+            stages["handlers"] = [extract[0] - walk[0], extract[1] - walk[1]]
+        for name, (wall, cpu) in stages.items():
+            entry = self.file_stages.setdefault(name, [0.0, 0.0])
+            entry[0] += wall
+            entry[1] += cpu
+        self.files.append(file_stats)
+
+    def count_row(self, kind, written):
+        if written:
+            self.rows[kind] += 1
+        else:
+            self.duplicates[kind] += 1
+
+    def report(self, top=10):
+        def stage_dict(stages):
+            return {name: {"wall_s": round(wall, 6), "cpu_s": round(cpu, 6)} for name, (wall, cpu) in stages.items()}
+        slowest = sorted(self.files, key=lambda s: s["wall"], reverse=True)[:top]
+        return {
+            "files": self.files_total,
+            "files_scanned": len(self.files),
+            "files_cached": self.cached_files,
+            "files_skipped": self.skipped_files,
+            "bytes_skipped": self.skipped_bytes,
+            "bytes_scanned": sum(s["bytes"] for s in self.files),
+            "stages": stage_dict(self.stages),
+            "file_stages": stage_dict(self.file_stages),
+            "nodes_total": sum(s["nodes"] for s in self.files),
+            "nodes_visited": sum(s["visited"] for s in self.files),
+            "subtrees_pruned": sum(s["pruned"] for s in self.files),
+            "source_nodes": sum(s["source_nodes"] for s in self.files),
+            "rows": dict(self.rows),
+            "rows_total": sum(self.rows.values()),
+            "duplicates_dropped": dict(self.duplicates),
+            "duplicates_total": sum(self.duplicates.values()),
+            "slowest_files": [
+                {"path": s["path"], "wall_s": round(s["wall"], 6), "cpu_s": round(s["cpu"], 6), "bytes": s["bytes"],
+                 "nodes": s["nodes"], "visited": s["visited"], "candidates": s["candidates"]}
+                for s in slowest
+            ],
+        }
+
+def print_stats_report(report):
+    print("\n--- Статистика ---")
+    total, visited = report["nodes_total"], report["nodes_visited"]
+    saved = f"{100.0 * (total - visited) / total:.1f}%" if total else "—"
+    print(f"Файлів: {report['files']} (розібрано {report['files_scanned']}, з кешу {report['files_cached']}, "
+          f"пропущено префільтром {report['files_skipped']}); вузлів {total}, обійдено {visited} "
+          f"(відсічено піддерев {report['subtrees_pruned']}, менше на {saved}), з SourceString {report['source_nodes']}")
+    for title, stages in (("Етапи", report["stages"]), ("Етапи файлів (сума)", report["file_stages"])):
+        print(f"{title}:")
+        for name, t in sorted(stages.items(), key=lambda item: -item[1]["wall_s"]):
+            print(f"  {name:<20} wall {t['wall_s']:9.3f} с   cpu {t['cpu_s']:9.3f} с")
+    rows = ", ".join(f"{kind} {n}" for kind, n in sorted(report["rows"].items())) or "—"
+    dups = ", ".join(f"{kind} {n}" for kind, n in sorted(report["duplicates_dropped"].items())) or "—"
+    print(f"Рядків: {report['rows_total']} ({rows}); дублікатів відкинуто: {report['duplicates_total']} ({dups})")
+    if report["slowest_files"]:
+        print("Найповільніші файли:")
+        for s in report["slowest_files"]:
+            print(f"  {s['wall_s']:8.3f} с  {s['bytes'] / 1024:9.1f} КБ  вузлів {s['nodes']:>7} "
+                  f"(обійдено {s['visited']:>7})  {s['path']}")
+
+def profile_single_file(path, out_path, stream_threshold=None, json_backend="stdlib", top=25, prune=None):
+    """cProfile розбору одного файлу (без префільтра і кешу): pstats у out_path і топ функцій у stdout."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        scan_file_entry(path, stream_threshold, prefilter=False, json_backend=json_backend, prune=prune)
+    finally:
+        profiler.disable()
+    profiler.dump_stats(out_path)
+    print(f"\n--- cProfile: {path} ---")
+    pstats.Stats(profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(top)
+    print(f"Профіль збережено у: {out_path}")
+
+def verify_pruning(paths, prune, stream_threshold=None, prefilter=True, json_backend="stdlib", top=20):
+    """
+    --verify-prune: кожен файл розбирається двічі — без відсікання і з профілем prune — і порівнюються
+    StringTable-блоки, кандидати та помилка (з них однозначно складаються рядки результату).
+    Друкує розбіжності, обійдені вузли в обох режимах і час обходу з обробниками; повертає
+    список файлів з розбіжностями.
+    """
+    def error_signature(error):
+        return None if error is None else (type(error).__name__, str(error))
+
+    visited = {False: 0, True: 0}
+    walk = {False: 0.0, True: 0.0}
+    pruned = checked = skipped = 0
+    differing = []
+    for path in paths:
+        results = {}
+        for on in (False, True):
+            file_stats = new_file_stats(path)
+            results[on], skipped_bytes = scan_file_prefiltered(path, stream_threshold, prefilter, json_backend,
+                                                               file_stats, prune if on else None)
+            visited[on] += file_stats["visited"]
+            stages = file_stats["stages"]
+            walk[on] += sum(stages[name][0] for name in ("extract", "stream") if name in stages)
+            if on:
+                pruned += file_stats["pruned"]
+        if skipped_bytes is not None:
+            skipped += 1
+            continue
+        checked += 1
+        (blocks_off, candidates_off, error_off), (blocks_on, candidates_on, error_on) = results[False], results[True]
+        if (blocks_off != blocks_on or candidates_off != candidates_on
+                or error_signature(error_off) != error_signature(error_on)):
+            differing.append((path, len(candidates_off), len(candidates_on)))
+    saved = f"{100.0 * (visited[False] - visited[True]) / visited[False]:.1f}%" if visited[False] else "—"
+    print(f"\n--- Перевірка відсікання (профіль {prune.name}) ---")
+    print(f"Файлів розібрано: {checked} (пропущено префільтром {skipped}); з розбіжностями: {len(differing)}")
+    print(f"Вузлів обійдено: без відсікання {visited[False]}, з відсіканням {visited[True]} (менше на {saved}); "
+          f"відсічено піддерев {pruned}")
+    print(f"Обхід і обробники: без відсікання {walk[False]:.3f} с, з відсіканням {walk[True]:.3f} с")
+    for path, count_off, count_on in differing[:top]:
+        print(f"  РОЗБІЖНІСТЬ: {path} (кандидатів без відсікання {count_off}, з відсіканням {count_on})")
+    if len(differing) > top:
+        print(f"  ... і ще {len(differing) - top}")
+    return [path for path, _, _ in differing]
+
+# ---------------- Потоковий розбір великих файлів ----------------
+# Файли від STREAM_THRESHOLD байтів не декодуються цілком. Файл відображається через mmap, а
+# JSON-масиви, більші за STREAM_PIECE_BUDGET, стають StreamedList: елементи декодуються по одному,
+# коли обхід до них доходить, і звільняються після обробки. Масиви в ancestry не дають жодного
+# контексту обробникам (Type, TableId, ключі, ObjectPath беруться лише з dict), тому результат
+# той самий, що й при повному декодуванні. Словники, більші за бюджет, збираються поелементно з тими
+# самими відкладеними масивами всередині; великий dict без масивів (наприклад величезні Rows)
+# усе ж тримається в пам'яті цілком.
+STREAM_THRESHOLD = 64 * 1024 * 1024
+STREAM_PIECE_BUDGET = 4 * 1024 * 1024
+
+_STREAM_STRUCT_RE = re.compile(rb'["\[\]{}]')
+_STREAM_STRING_TAIL_RE = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_STREAM_SCALAR_RE = re.compile(rb'[^\s,\]}]+')
+_STREAM_WS_RE = re.compile(rb'[ \t\r\n]*')
+
+class StreamSyntaxError(ValueError):
+    pass
+
+def stream_skip_ws(buf, pos):
+    return _STREAM_WS_RE.match(buf, pos).end()
+
+def stream_value_end(buf, pos, limit=None):
+    """
+    Кінець JSON-значення, що починається в pos, без декодування (лише дужки і рядки).
+    Якщо задано limit і значення не закінчується до нього — повертає None.
+    """
+    c = buf[pos:pos + 1]
+    if c == b'"':
+        m = _STREAM_STRING_TAIL_RE.match(buf, pos + 1)
+        if m is None:
+            raise StreamSyntaxError(f"незакритий рядок на позиції {pos}")
+        return m.end()
+    if c not in (b"[", b"{"):
+        m = _STREAM_SCALAR_RE.match(buf, pos)
+        if m is None:
+            raise StreamSyntaxError(f"очікувалось значення на позиції {pos}")
+        return m.end()
+    depth = 0
+    p = pos
+    while True:
+        m = _STREAM_STRUCT_RE.search(buf, p)
+        if m is None or (limit is not None and m.start() > limit):
+            if m is None and limit is None:
+                raise StreamSyntaxError(f"незакрите значення з позиції {pos}")
+            if m is None and len(buf) <= limit:
+                raise StreamSyntaxError(f"незакрите значення з позиції {pos}")
+            return None
+        p = m.end()
+        ch = buf[m.start()]
+        if ch == 0x22:
+            t = _STREAM_STRING_TAIL_RE.match(buf, p)
+            if t is None:
+                raise StreamSyntaxError(f"незакритий рядок на позиції {m.start()}")
+            p = t.end()
+        elif ch in (0x5B, 0x7B):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return p
+
+def stream_decode(buf, start, end):
+    try:
+        return json.loads(buf[start:end])
+    except ValueError as e:
+        raise StreamSyntaxError(f"позиція {start}: {e}")
+
+def stream_text_chunk(buf, start, size):
+    """
+    buf[start:start + size] як текст. Обрізаний наприкінці багатобайтовий UTF-8 символ
+    відкидається. Повертає (text, byte_end).
+    """
+    end = min(len(buf), start + size)
+    if end < len(buf):
+        k = end
+        while k > start and end - k < 3 and (buf[k - 1] & 0xC0) == 0x80:
+            k -= 1
+        if k > start and buf[k - 1] >= 0xC0:
+            lead = buf[k - 1]
+            need = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+            if end - (k - 1) < need:
+                end = k - 1
+    try:
+        return buf[start:end].decode("utf-8"), end
+    except UnicodeDecodeError as e:
+        raise StreamSyntaxError(f"позиція {start}: {e}")
+
+def stream_load(buf, pos, budget):
+    """
+    Значення з позиції pos: звичайний Python-об'єкт, якщо воно не більше budget байтів,
+    інакше StreamedList (масив) або dict, зібраний поелементно. Повертає (value, end);
+    для StreamedList end = None — його знає сам список після повного обходу (StreamedList.end).
+    """
+    end = stream_value_end(buf, pos, limit=pos + budget)
+    if end is not None:
+        return stream_decode(buf, pos, end), end
+    c = buf[pos:pos + 1]
+    if c == b"[":
+        return StreamedList(buf, pos, budget), None
+    if c == b"{":
+        return stream_load_dict(buf, pos, budget)
+    end = stream_value_end(buf, pos)
+    return stream_decode(buf, pos, end), end
+
+def stream_load_dict(buf, pos, budget):
+    obj = {}
+    p = stream_skip_ws(buf, pos + 1)
+    if buf[p:p + 1] == b"}":
+        return obj, p + 1
+    while True:
+        if buf[p:p + 1] != b'"':
+            raise StreamSyntaxError(f"очікувався ключ на позиції {p}")
+        key_end = stream_value_end(buf, p)
+        key = stream_decode(buf, p, key_end)
+        p = stream_skip_ws(buf, key_end)
+        if buf[p:p + 1] != b":":
+            raise StreamSyntaxError(f"очікувалась ':' на позиції {p}")
+        value_pos = stream_skip_ws(buf, p + 1)
+        obj[key], p = stream_load(buf, value_pos, budget)
+        if p is None:
+            p = stream_value_end(buf, value_pos)
+        p = stream_skip_ws(buf, p)
+        c = buf[p:p + 1]
+        if c == b"}":
+            return obj, p + 1
+        if c != b",":
+            raise StreamSyntaxError(f"очікувалась ',' або '}}' на позиції {p}")
+        p = stream_skip_ws(buf, p + 1)
+
+_STREAM_CHUNK = 1024 * 1024
+_STREAM_DECODER = json.JSONDecoder()
+# Після елемента масиву в коректному JSON може йти лише пробіл, ',' або ']'
+_STREAM_ITEM_END = frozenset(" \t\r\n,]")
+
+class StreamedList:
+    """
+    Відкладений JSON-масив у буфері (mmap): елементи декодуються по одному під час обходу.
+    Для обробників це не dict, тож як предок він не дає контексту — так само, як list.
+    """
+    __slots__ = ("buf", "start", "budget", "end")
+
+    def __init__(self, buf, start, budget):
+        self.buf = buf
+        self.start = start
+        self.budget = budget
+        self.end = None  # відомий після повного обходу
+
+    def __bool__(self):
+        return self.buf[stream_skip_ws(self.buf, self.start + 1):][:1] != b"]"
+
+    def __repr__(self):
+        # Лише для рідкісного випадку, коли масив потрапляє в текст context (як str(list))
+        return repr(streamed_json_default(self))
+
+    def value_end(self):
+        if self.end is None:
+            self.end = stream_value_end(self.buf, self.start)
+        return self.end
+
+    def iter_spans(self):
+        buf = self.buf
+        p = stream_skip_ws(buf, self.start + 1)
+        if buf[p:p + 1] == b"]":
+            self.end = p + 1
+            return
+        while True:
+            end = stream_value_end(buf, p, limit=p + self.budget)
+            if end is None:
+                end = stream_value_end(buf, p)
+            yield p, end
+            p = stream_skip_ws(buf, end)
+            c = buf[p:p + 1]
+            if c == b"]":
+                self.end = p + 1
+                return
+            if c != b",":
+                raise StreamSyntaxError(f"очікувалась ',' або ']' на позиції {p}")
+            p = stream_skip_ws(buf, p + 1)
+
+    def iter_items(self):
+        """
+        (індекс, елемент) по черзі. Дрібні елементи декодуються з текстових шматків через
+        JSONDecoder.raw_decode (швидкість C-парсера); елемент, що не вміщується в бюджет,
+        іде через stream_load.
+        """
+        buf, budget = self.buf, self.budget
+        size_total = len(buf)
+        p = stream_skip_ws(buf, self.start + 1)
+        if buf[p:p + 1] == b"]":
+            self.end = p + 1
+            return
+        text, t_end, t_ascii, i = "", p, True, 0
+        idx = 0
+        while True:
+            value = end = None
+            chunk = None
+            while True:
+                if i < len(text):
+                    try:
+                        value, j = _STREAM_DECODER.raw_decode(text, i)
+                    except ValueError:
+                        j = None
+                    # шматок міг обрізати число ("-55." чи "1e" дають префікс "-55"/"1"): поки це не
+                    # останній шматок, значення приймається лише перед роздільником, інакше читаємо далі
+                    if j is not None and (t_end == size_total or (j < len(text) and text[j] in _STREAM_ITEM_END)):
+                        end = p + (j - i if t_ascii else len(text[i:j].encode("utf-8")))
+                        break
+                    if t_end == size_total:
+                        raise StreamSyntaxError(f"некоректне значення на позиції {p}")
+                if chunk is not None and chunk >= budget:
+                    break
+                chunk = min(budget, max(_STREAM_CHUNK, 2 * (t_end - p), 2 * (chunk or 0)))
+                text, t_end = stream_text_chunk(buf, p, chunk)
+                t_ascii = len(text) == t_end - p
+                i = 0
+            if end is None:
+                text, t_end, i = "", p, 0
+                value, end = stream_load(buf, p, budget)
+            yield idx, value
+            idx += 1
+            if end is None:
+                end = value.value_end()
+            q = stream_skip_ws(buf, end)
+            c = buf[q:q + 1]
+            if c == b"]":
+                self.end = q + 1
+                return
+            if c != b",":
+                raise StreamSyntaxError(f"очікувалась ',' або ']' на позиції {q}")
+            next_p = stream_skip_ws(buf, q + 1)
+            # роздільники — ASCII, тож зсув у байтах дорівнює зсуву в символах
+            i = j + (next_p - end) if text else 0
+            p = next_p
+
+    def iter_reversed(self):
+        starts = array("q", (start for start, _ in self.iter_spans()))
+        for start in reversed(starts):
+            yield stream_load(self.buf, start, self.budget)[0]
+
+def streamed_json_default(obj):
+    if isinstance(obj, StreamedList):
+        return stream_decode(obj.buf, obj.start, obj.value_end())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def materialize_streamed(value):
+    """Копія value, де всі StreamedList декодовано (поки mmap ще відкритий)."""
+    if isinstance(value, StreamedList):
+        return streamed_json_default(value)
+    if isinstance(value, dict):
+        return {k: materialize_streamed(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [materialize_streamed(v) for v in value]
+    return value
+
+def stream_validate(value):
+    """Повний прохід по відкладених масивах: синтаксична помилка десь далі піднімає StreamSyntaxError."""
+    if isinstance(value, StreamedList):
+        for _, item in value.iter_items():
+            stream_validate(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            stream_validate(item)
+
+def scan_file_streaming(path, budget=None, prune=None, counts=None):
+    """
+    Потоковий варіант scan_file для великих файлів (той самий формат результату).
+    Синтаксичні помилки JSON піднімають StreamSyntaxError — тоді scan_file повторює звичайний розбір.
+    prune і counts — як у find_source_nodes (відкладені масиви відсікаються лише за ключем).
+    """
+    if budget is None:
+        budget = STREAM_PIECE_BUDGET
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        pos = 3 if buf[:3] == b"\xef\xbb\xbf" else 0
+        pos = stream_skip_ws(buf, pos)
+        data, root_end = stream_load(buf, pos, budget)
+        blocks = []
+        if buf.find(b'"StringTable"') != -1:
+            blocks = [(ns, materialize_streamed(keysmap)) for ns, keysmap in find_stringtable_blocks(data)]
+        candidates = []
+        error = None
+        source_nodes = find_source_nodes(data, prune=prune, counts=counts)
+        try:
+            for candidate in extract_candidates(data, path, source_nodes=source_nodes):
+                # ключ може бути не рядком (тоді помилка виникне вже при записі) — не лишаємо посилань на mmap
+                if not isinstance(candidate[0], str):
+                    candidate = (materialize_streamed(candidate[0]),) + candidate[1:]
+                candidates.append(candidate)
+        except StreamSyntaxError:
+            raise
+        except Exception as e:
+            error = e
+            # Звичайний розбір упав би ще на json.load, якщо файл далі зіпсований — перевіряємо решту
+            stream_validate(data)
+        # Обрізаний або зіпсований експорт не повинен дати часткових рядків: решта файлу — лише пробіли
+        if root_end is None:
+            root_end = data.value_end()
+        if stream_skip_ws(buf, root_end) != len(buf):
+            raise StreamSyntaxError(f"зайві дані після позиції {root_end}")
+        return blocks, candidates, error
+
+# ---------------- Режим стеження (--watch) ----------------
+# Після першого запуску стан лишається в пам'яті: результат scan_file кожного файлу (StringTable-блоки
+# і кандидати з сирими ключами) та його відбиток (розмір, mtime). Теки опитуються кожні interval
+# секунд; змінені й нові файли розбираються повторно, видалені вилучаються. Після змін StringTable-мапа
+# і CSV перебудовуються з пам'яті (порядок рядків і відкидання дублікатів — як при повному запуску),
+# результат (CSV або SQLite) пишеться у тимчасовий файл і атомарно замінює попередній. Якщо розбір файлу падає (наприклад,
+# експорт ще пишеться), старий CSV лишається, а файл буде розібрано знову після наступної зміни.
+def poll_roots(roots, fingerprints, manifest=None):
+    """
+    Поточний стан тек: (files_by_root, відбитки, змінені чи нові шляхи, видалені шляхи).
+    Відбитки — (size, mtime_ns) з маніфесту; manifest — уже готовий обхід, без нього теки обходяться тут.
+    """
+    if manifest is None:
+        manifest = build_manifest(roots)
+    files_by_root = [(root, manifest.files(root)) for root in roots]
+    current = {}
+    for _, paths in files_by_root:
+        for path in paths:
+            if path not in current:
+                current[path] = manifest.stat(path)
+    changed = [path for path, fingerprint in current.items() if fingerprints.get(path) != fingerprint]
+    removed = [path for path in fingerprints if path not in current]
+    return files_by_root, current, changed, removed
+
+def watch_roots(roots, out_path, files_by_root, results, fingerprints, interval=1.0, jobs=1,
+                stream_threshold=None, prefilter=True, json_backend="stdlib", output_format="csv", prune=None):
+    """
+    Цикл --watch до Ctrl+C. fingerprints — відбитки, зняті ДО першого розбору, щоб зміна під час
+    нього теж була помічена.
+    """
+    print(f"\nСтежу за змінами (опитування кожні {interval:g} с). Ctrl+C — вихід.")
+    try:
+        while True:
+            time.sleep(interval)
+            new_files_by_root, current, changed, removed = poll_roots(roots, fingerprints)
+            if not changed and not removed:
                 continue
+            started = time.perf_counter()
+            scanned = scan_files(changed, jobs, stream_threshold, prefilter, json_backend, prune=prune)
+            for path, (result, _, _) in zip(changed, scanned):
+                results[path] = result
+            for path in removed:
+                results.pop(path, None)
+            files_by_root = new_files_by_root
+            fingerprints = current
+            key_to_ns = {}
+            for path in dict.fromkeys(p for _, paths in files_by_root for p in paths):
+                merge_stringtable_blocks(key_to_ns, results[path][0])
+            error = write_output(out_path, output_format, files_by_root, results,
+                                 build_stringtable_index(key_to_ns), keep_partial=False)
+            stamp = time.strftime("%H:%M:%S")
+            if error is None:
+                print(f"[{stamp}] змінено {len(changed)}, видалено {len(removed)} файлів; "
+                      f"результат оновлено за {time.perf_counter() - started:.2f} с.")
             else:
-                continue
-        # Непередбачений блок з SourceString — повідомляємо і зупиняємо
-        line_no, _ = find_line_number(original_text, node.get("SourceString", ""), start_pos=search_start_pos)
-        if line_no is None:
-            raise RuntimeError(f"UNEXPECTED BLOCK: файл {path}, неочікуваний блок з SourceString (не вдалось знайти номер рядка)")
-        else:
-            raise RuntimeError(f"UNEXPECTED BLOCK: файл {path}, рядок {line_no})")
+                print(f"[{stamp}] результат не оновлено: {str(error) or type(error).__name__}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nСтеження зупинено.")
 
 # ---------------- CLI / GUI ----------------
 def choose_directory_with_gui():
@@ -639,8 +2523,12 @@ def choose_directory_with_gui():
     root.destroy()
     return directory or None
 
-def collect_roots_from_argv_or_gui(args):
-    dropped_paths = [p for p in sys.argv[1:] if not p.startswith("-")] if len(sys.argv) > 1 else []
+def collect_roots_from_argv_or_gui(args, remaining=None):
+    # remaining — аргументи, що не належать опціям (перетягнуті теки/файли); значення опцій на кшталт
+    # --stats out.json не повинні ставати коренями обходу
+    if remaining is None:
+        remaining = sys.argv[1:]
+    dropped_paths = [p for p in remaining if not p.startswith("-")]
     roots = []
     if dropped_paths:
         for p in dropped_paths:
@@ -662,83 +2550,121 @@ def collect_roots_from_argv_or_gui(args):
 def main():
     parser = argparse.ArgumentParser(description="Парсить JSON і витягує SourceString у CSV")
     parser.add_argument("--root", "-r", help="Коренева тека для обходу (як не вказано, можна перетягнути теку на файл)")
-    parser.add_argument("--out", "-o", default="parsed.csv", help="Шлях до CSV файлу результату.")
+    parser.add_argument("--out", "-o", help="Шлях до файлу результату (типово parsed.csv, parsed.jsonl або parsed.sqlite); "
+                                            "csv і jsonl з розширенням .gz/.xz пишуться стиснутими.")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Формат результату: csv, jsonl (рядок — об'єкт з key, source, translation, context, path, kind) "
+                             "або sqlite (індексована база: ключ, суфікс ключа, текст, ассет).")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Кількість процесів для розбору JSON (0 — за кількістю ядер).")
+    parser.add_argument("--cache", nargs="?", const="", default=None,
+                        help="Інкрементальний кеш розбору (SQLite). Без значення — <out>.cache.sqlite поруч з CSV.")
+    parser.add_argument("--stream-threshold", type=float, default=STREAM_THRESHOLD / (1024 * 1024),
+                        help="Розмір файлу (МБ), від якого JSON розбирається потоково з обмеженою пам'яттю.")
+    parser.add_argument("--cache-hash", action="store_true",
+                        help="Перевіряти sha1 вмісту файлів зі зміненим mtime перед повторним розбором.")
+    parser.add_argument("--no-prefilter", action="store_true",
+                        help="Декодувати всі JSON, навіть без SourceString/StringTable (тоді й зіпсований файл без тексту зупиняє обробку).")
+    parser.add_argument("--json-backend", choices=JSON_BACKENDS, default="auto",
+                        help="Декодер JSON: auto — orjson або simdjson, якщо встановлені, інакше stdlib.")
+    parser.add_argument("--stats", nargs="?", const="", default=None,
+                        help="Звіт про час етапів, вузли, рядки за обробниками і найповільніші файли; "
+                             "JSON — у вказаний файл (без значення — <out>.stats.json).")
+    parser.add_argument("--stats-top", type=int, default=10, help="Скільки найповільніших файлів показати у --stats.")
+    parser.add_argument("--profile-file", help="Профілювати cProfile розбір одного JSON-файлу (результат — <out>.prof).")
+    parser.add_argument("--watch", action="store_true",
+                        help="Після запуску стежити за теками і переписувати результат (атомарно) після кожної зміни JSON.")
+    parser.add_argument("--watch-interval", type=float, default=1.0, help="Інтервал опитування тек для --watch, с.")
+    parser.add_argument("--manifest", nargs="?", const="", default=None,
+                        help="Зберігати маніфест тек (JSON) між запусками: теки з незміненим mtime не перечитуються. "
+                             "Без значення — <out>.manifest.json.")
+    parser.add_argument("--walk-threads", type=int, default=WALK_THREADS,
+                        help="Кількість потоків для обходу тек (os.scandir/stat).")
+    parser.add_argument("--prune", choices=PRUNE_CHOICES, default=DEFAULT_PRUNE,
+                        help="Профіль відсікання піддерев без тексту: lossless — лише масиви скалярів (без втрат); "
+                             "ue — ще й меші, криві, параметри матеріалів (припущення, перевіряйте --verify-prune); "
+                             "off — обходити все.")
+    parser.add_argument("--prune-config", help="Власний профіль відсікання (JSON: skip_keys, skip_types, scalar_lists, min_scalar_list).")
+    parser.add_argument("--verify-prune", action="store_true",
+                        help="Розібрати кожен файл з відсіканням і без, порівняти результат і показати, скільки вузлів не обійдено.")
     args, remaining = parser.parse_known_args()
+    try:
+        json_backend = resolve_json_backend(args.json_backend)
+        prune = load_prune_profile(args.prune_config) if args.prune_config else resolve_prune_profile(args.prune)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.verify_prune and prune is None:
+        parser.error("--verify-prune потребує профілю відсікання (--prune або --prune-config)")
 
-    roots = collect_roots_from_argv_or_gui(args)
+    roots = collect_roots_from_argv_or_gui(args, remaining)
+    out_path = args.out or f"parsed.{args.format}"
+    if args.format == "sqlite" and output_compressor(out_path) is not None:
+        parser.error("--format sqlite не підтримує стиснення (.gz/.xz)")
 
-    # перший прохід: збір string-table
-    key_to_ns = collect_stringtables(roots)
+    # перший прохід: єдине читання/декодування файлів, збір string-table і кандидатів
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    stats = RunStats() if args.stats is not None else None
+    stream_threshold = int(args.stream_threshold * 1024 * 1024)
+    cache = None
+    if args.cache is not None:
+        cache = open_scan_cache(args.cache or os.path.abspath(out_path) + ".cache.sqlite", prune_signature(prune))
+    manifest_path = None
+    previous_manifest = None
+    if args.manifest is not None:
+        manifest_path = args.manifest or os.path.abspath(out_path) + ".manifest.json"
+        previous_manifest = FileManifest.load(manifest_path)
+    with timed_stage(stats.stages if stats is not None else None, "walk_dirs"):
+        manifest = build_manifest(roots, args.walk_threads, previous_manifest)
+    if manifest_path is not None:
+        manifest.save(manifest_path)
+    if args.verify_prune:
+        if cache is not None:
+            cache.close()
+        paths = list(dict.fromkeys(p for root in roots for p in manifest.files(root)))
+        differing = verify_pruning(paths, prune, stream_threshold, not args.no_prefilter, json_backend)
+        sys.exit(1 if differing else 0)
+    fingerprints = poll_roots(roots, {}, manifest)[1] if args.watch else None
+    try:
+        files_by_root, results, key_to_ns = scan_roots(
+            roots, jobs=jobs, cache=cache, cache_hash=args.cache_hash,
+            stream_threshold=stream_threshold, prefilter=not args.no_prefilter,
+            json_backend=json_backend, stats=stats, manifest=manifest, prune=prune,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    st_index = build_stringtable_index(key_to_ns)
 
-    out_csv = args.out
     had_error = False
-    emitted_keys = set()
-    try:
-        with open(out_csv, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["key", "source", "Translation", "context"])
-            for root in roots:
-                if not os.path.isdir(root):
-                    print(f"WARNING: шлях {root} не є текою, пропускаю.")
-                    continue
-                for dirpath, dirs, files in sorted_walk(root):
-                    for fname in files:
-                        if not fname.lower().endswith(".json"):
-                            continue
-                        file_path = os.path.join(dirpath, fname)
-                        try:
-                            process_file(file_path, writer, key_to_ns, emitted_keys)
-                        except RuntimeError as rexc:
-                            print(str(rexc), file=sys.stderr)
-                            had_error = True
-                            raise
-            # Після обробки всіх файлів — додатково згенерувати рядки зі StringTable, якщо їх ще не було
-            for root in roots:
-                for dirpath, dirs, files in sorted_walk(root):
-                    for fname in files:
-                        if not fname.lower().endswith(".json"):
-                            continue
-                        file_path = os.path.join(dirpath, fname)
-                        try:
-                            with open(file_path, "r", encoding="utf-8-sig") as fjson:
-                                txt = fjson.read()
-                            data = json.loads(txt)
-                        except Exception:
-                            continue
-                        stack = [data] if isinstance(data, (dict, list)) else []
-                        while stack:
-                            nd = stack.pop()
-                            if isinstance(nd, dict) and "StringTable" in nd and isinstance(nd.get("StringTable"), dict):
-                                st = nd.get("StringTable")
-                                ns = st.get("TableNamespace") if isinstance(st.get("TableNamespace"), str) else None
-                                keysmap = st.get("KeysToEntries") if isinstance(st.get("KeysToEntries"), dict) else {}
-                                if isinstance(keysmap, dict):
-                                    for k, v in keysmap.items():
-                                        # Якщо немає TableNamespace — формуємо ключ без префікса
-                                        final_key = f"{ns}::{k}" if ns else k
-                                        if final_key in emitted_keys:
-                                            continue
-                                        source_val = v if isinstance(v, str) else str(v)
-                                        relpath = relative_after_markers(file_path, markers=("UnleashedPrototype", "Content"))
-                                        context = relpath if relpath else file_path
-                                        writer.writerow([final_key, source_val, "", context])
-                                        emitted_keys.add(final_key)
-                            if isinstance(nd, dict):
-                                for vv in nd.values():
-                                    if isinstance(vv, (dict, list)):
-                                        stack.append(vv)
-                            elif isinstance(nd, list):
-                                for it in nd:
-                                    if isinstance(it, (dict, list)):
-                                        stack.append(it)
-    except Exception:
-        pass
+    # другий прохід: лише підбір namespace і запис з пам'яті
+    error = write_output(out_path, args.format, files_by_root, results, st_index, stats)
+    if error is not None:
+        # RuntimeError — уже сформоване повідомлення (непередбачений блок, зіпсований JSON)
+        print(str(error) if isinstance(error, RuntimeError) else f"ERROR: {type(error).__name__}: {error}", file=sys.stderr)
+        had_error = True
+
+    if stats is not None:
+        report = stats.report(args.stats_top)
+        print_stats_report(report)
+        stats_path = args.stats or os.path.abspath(out_path) + ".stats.json"
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Звіт статистики записано у: {stats_path}")
+    if args.profile_file:
+        profile_single_file(os.path.abspath(args.profile_file), os.path.abspath(out_path) + ".prof",
+                            stream_threshold, json_backend, prune=prune)
 
     print("\n--- Робота завершена ---")
     if had_error:
         print("Обробка припинена через помилку (див. вище).")
+        print(f"Рядки до помилки: {os.path.abspath(partial_output_path(out_path))}; "
+              f"{os.path.abspath(out_path)} не змінено.")
     else:
-        print(f"Результат записано у: {os.path.abspath(out_csv)}")
+        print(f"Результат записано у: {os.path.abspath(out_path)}")
+
+    if args.watch:
+        watch_roots(roots, out_path, files_by_root, results, fingerprints, args.watch_interval, jobs,
+                    stream_threshold, not args.no_prefilter, json_backend, args.format, prune)
+        return
 
     try:
         input("\nНатисніть Enter, щоб вийти...")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+texture_export.py
+
+Пакетний експорт локалізованих екранів з ssr_texture_prjs/*.psd у TGA/PNG для мода: зведене
+зображення PSD (усі видимі шари) зберігається поруч із PSD (або в --out-dir) з тим самим іменем.
+Файли обробляються пулом процесів; кеш за хешем вмісту PSD (blake2b, як у texture_manifest.py)
+пропускає PSD, що не змінились з попереднього експорту і чиї результати на місці. Наприкінці —
+таблиця часу по файлах (відкриття і зведення, запис кожного формату).
+
+Типово експортуються екрани DiningScreen, SalvageStation, Elevators, повідомлення ServBot і
+GRAFFITI_* (LOCALIZED_SCREENS); --pattern задає власні маски, --all — усі PSD теки.
+
+Залежності: Pillow (обов'язково) і psd-tools (зведення шарів). Без psd-tools береться збережене
+у PSD зведене зображення через Pillow — воно є лише у файлах з "Maximize Compatibility".
+
+Використання:
+  python texture_export.py [ssr_texture_prjs] [--formats tga,png] [-j 4] [--pattern "T_*Screen*"]
+                           [--all] [--out-dir DIR] [--force] [--rle]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from texture_manifest import SCRIPT_DIR, content_digest
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from psd_tools import PSDImage
+    from psd_tools.constants import ColorMode
+except ImportError:
+    PSDImage = ColorMode = None
+
+DEFAULT_FOLDER = os.path.join(SCRIPT_DIR, "ssr_texture_prjs")
+DEFAULT_CACHE = os.path.join(SCRIPT_DIR, "texture_export_cache.json")
+CACHE_VERSION = 1
+EXPORT_FORMATS = {"tga": "TGA", "png": "PNG"}
+LOCALIZED_SCREENS = ("T_DiningScreen_*", "T_SalvageStation*", "Texture_Elevators_*",
+                     "Texture_ServBot_ScreenMessages*", "GRAFFITI_*")
+
+
+# ---------------- Кеш ----------------
+class CachedExport(NamedTuple):
+    size: int
+    mtime_ns: int
+    digest: str
+    options: str
+    # {формат: [ім'я результату, size, mtime_ns]}
+    outputs: Dict[str, List]
+
+
+def load_cache(path: str) -> Dict[str, CachedExport]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    try:
+        return {path: CachedExport(**entry) for path, entry in data.get("files", {}).items()}
+    except TypeError:
+        return {}
+
+
+def save_cache(path: str, cache: Dict[str, CachedExport]):
+    data = {"version": CACHE_VERSION, "files": {p: entry._asdict() for p, entry in sorted(cache.items())}}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def outputs_intact(outputs: Dict[str, List]) -> bool:
+    """Чи всі записані раніше результати лишились такими, якими їх записано (size, mtime)."""
+    for name, size, mtime_ns in outputs.values():
+        try:
+            st = os.stat(name)
+        except OSError:
+            return False
+        if st.st_size != size or st.st_mtime_ns != mtime_ns:
+            return False
+    return True
+
+
+# ---------------- Експорт ----------------
+class ExportJob(NamedTuple):
+    psd_path: str
+    outputs: Dict[str, str]
+    rle: bool
+
+
+class ExportResult(NamedTuple):
+    psd_path: str
+    width: int
+    height: int
+    mode: str
+    # {етап: секунди}: "open" — читання і зведення шарів, далі по етапу на кожен формат
+    timings: Dict[str, float]
+    error: Optional[str]
+
+
+def flatten_psd(path: str):
+    """Зведене зображення PSD (PIL.Image): psd-tools, якщо встановлено, інакше збережене зведення через Pillow."""
+    if PSDImage is not None:
+        psd = PSDImage.open(path)
+        image = psd.composite()
+        if image is None:
+            return psd.topil()
+        # Перший додатковий канал RGB-документа (Alpha 1) зведення не враховує, а Photoshop пише його
+        # в альфу 32-бітного TGA — без нього експорт вийшов би 24-бітним
+        if image.mode == "RGB" and psd.color_mode == ColorMode.RGB and psd.channels > 3:
+            alpha = psd.topil(channel=3)
+            if alpha is not None and alpha.size == image.size:
+                image.putalpha(alpha)
+        return image
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+def export_psd(job: ExportJob) -> ExportResult:
+    """Одиниця роботи пулу: зводить PSD і пише кожен формат через тимчасовий файл і os.replace."""
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    try:
+        image = flatten_psd(job.psd_path)
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        timings["open"] = time.perf_counter() - started
+        for fmt, out_path in job.outputs.items():
+            stage = time.perf_counter()
+            tmp_path = out_path + ".tmp"
+            params = {"rle": True} if fmt == "tga" and job.rle else {}
+            image.save(tmp_path, format=EXPORT_FORMATS[fmt], **params)
+            os.replace(tmp_path, out_path)
+            timings[fmt] = time.perf_counter() - stage
+    except Exception as e:
+        return ExportResult(job.psd_path, 0, 0, "", timings, f"{type(e).__name__}: {e}")
+    return ExportResult(job.psd_path, image.width, image.height, image.mode, timings, None)
+
+
+def select_psds(folder: str, patterns: Tuple[str, ...]) -> List[str]:
+    """PSD теки, що відповідають хоча б одній масці (без урахування регістру); порожні patterns — усі."""
+    lowered = [pattern.lower() for pattern in patterns]
+    paths = []
+    for name in sorted(os.listdir(folder), key=str.lower):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != ".psd":
+            continue
+        if lowered and not any(fnmatch.fnmatchcase(stem.lower(), pattern) or fnmatch.fnmatchcase(name.lower(), pattern)
+                               for pattern in lowered):
+            continue
+        paths.append(os.path.join(folder, name))
+    return paths
+
+
+def plan_exports(paths: List[str], formats: Tuple[str, ...], out_dir: Optional[str], options: str, rle: bool,
+                 cache: Dict[str, CachedExport], force: bool) -> Tuple[List[ExportJob], List[str], Dict[str, Tuple]]:
+    """
+    (завдання, пропущені PSD, {PSD: (size, mtime_ns, digest)}). PSD пропускається, якщо його хеш і
+    options ті самі, що в кеші, а результати не змінювались; хеш перераховується лише при зміні size/mtime.
+    """
+    jobs, skipped, fingerprints = [], [], {}
+    for path in paths:
+        st = os.stat(path)
+        cached = cache.get(path)
+        if cached is not None and (cached.size, cached.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            digest = cached.digest
+        else:
+            digest = content_digest(path)
+        fingerprints[path] = (st.st_size, st.st_mtime_ns, digest)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        outputs = {fmt: os.path.join(out_dir or os.path.dirname(path), f"{stem}.{fmt}") for fmt in formats}
+        if (not force and cached is not None and cached.digest == digest and cached.options == options
+                and {fmt: out[0] for fmt, out in cached.outputs.items()} == outputs and outputs_intact(cached.outputs)):
+            skipped.append(path)
+            continue
+        jobs.append(ExportJob(path, outputs, rle))
+    return jobs, skipped, fingerprints
+
+
+def run_exports(jobs: List[ExportJob], workers: int) -> List[ExportResult]:
+    """export_psd для кожного завдання (у пулі процесів при workers > 1); порядок — як у jobs."""
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            return list(pool.map(export_psd, jobs))
+    return [export_psd(job) for job in jobs]
+
+
+def print_timings(results: List[ExportResult], formats: Tuple[str, ...], skipped: int, elapsed: float):
+    header = f"{'PSD':<44} {'Ш x В':>11} {'зведення':>9}" + "".join(f" {fmt:>8}" for fmt in formats) + f" {'разом':>8}"
+    print(header)
+    work = 0.0
+    for result in sorted(results, key=lambda r: -sum(r.timings.values())):
+        total = sum(result.timings.values())
+        work += total
+        name = os.path.basename(result.psd_path)
+        if result.error is not None:
+            print(f"{name:<44} ПОМИЛКА: {result.error}")
+            continue
+        cells = "".join(f" {result.timings.get(fmt, 0.0):8.3f}" for fmt in formats)
+        print(f"{name:<44} {f'{result.width}x{result.height}':>11} {result.timings.get('open', 0.0):9.3f}{cells} {total:8.3f}")
+    failed = sum(1 for result in results if result.error is not None)
+    print(f"\nЕкспортовано: {len(results) - failed}, без змін (кеш): {skipped}, з помилкою: {failed}")
+    print(f"Час: {elapsed:.2f} с (сума по файлах {work:.2f} с)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Паралельний експорт PSD у TGA/PNG з кешем за хешем вмісту.")
+    parser.add_argument("folder", nargs="?", default=DEFAULT_FOLDER, help="Тека з PSD")
+    parser.add_argument("--formats", default="tga", help=f"Формати через кому ({', '.join(EXPORT_FORMATS)})")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Кількість процесів (0 — за кількістю ядер)")
+    parser.add_argument("--pattern", action="append", default=[],
+                        help="Маска імені PSD (можна кілька разів); типово — локалізовані екрани LOCALIZED_SCREENS")
+    parser.add_argument("--all", action="store_true", help="Експортувати всі PSD теки")
+    parser.add_argument("--out-dir", help="Куди писати результати (типово поруч із PSD)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="JSON-кеш хешів PSD і записаних результатів")
+    parser.add_argument("--force", action="store_true", help="Експортувати все, не зважаючи на кеш")
+    parser.add_argument("--rle", action="store_true", help="TGA зі стисненням RLE")
+    args = parser.parse_args()
+
+    formats = tuple(dict.fromkeys(fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()))
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            parser.error(f"невідомий формат {fmt!r} (доступні: {', '.join(EXPORT_FORMATS)})")
+    if not formats:
+        parser.error("--formats: потрібен хоча б один формат")
+    if Image is None:
+        print("ERROR: для експорту потрібен Pillow (pip install pillow psd-tools)", file=sys.stderr)
+        sys.exit(2)
+    if PSDImage is None:
+        print("WARNING: psd-tools не встановлено — береться збережене в PSD зведене зображення (Pillow).",
+              file=sys.stderr)
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"ERROR: Теку не знайдено: {folder}", file=sys.stderr)
+        sys.exit(2)
+    out_dir = os.path.abspath(args.out_dir) if args.out_dir else None
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    paths = select_psds(folder, () if args.all else tuple(args.pattern) or LOCALIZED_SCREENS)
+    # від цих налаштувань залежить вміст результатів: інші налаштування — повторний експорт
+    options = ",".join(["psd-tools" if PSDImage is not None else "pillow"] + (["rle"] if args.rle else []))
+    cache = load_cache(args.cache)
+    jobs, skipped, fingerprints = plan_exports(paths, formats, out_dir, options, args.rle, cache, args.force)
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    results = run_exports(jobs, workers)
+    for job, result in zip(jobs, results):
+        if result.error is not None:
+            cache.pop(result.psd_path, None)
+            continue
+        outputs = {}
+        for fmt, out_path in job.outputs.items():
+            st = os.stat(out_path)
+            outputs[fmt] = [out_path, st.st_size, st.st_mtime_ns]
+        cache[result.psd_path] = CachedExport(*fingerprints[result.psd_path], options, outputs)
+    save_cache(args.cache, cache)
+    print(f"PSD для експорту: {len(paths)} (маски: {'усі' if args.all else ', '.join(args.pattern or LOCALIZED_SCREENS)})")
+    print_timings(results, formats, len(skipped), time.perf_counter() - started)
+    return 1 if any(result.error is not None for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+texture_manifest.py
+
+Маніфест текстурних проєктів (типово ssr_texture_prjs/): для кожного PSD, TGA, DDS і PNG —
+розмір, mtime, хеш вмісту (blake2b) і дані заголовка без декодування пікселів: ширина, висота,
+канали, формат пікселів (режим PSD, тип TGA, FourCC/DXGI DDS, тип кольору PNG), кількість мипів.
+Файли групуються за іменем без розширення (T_PatchDispenserLCD.psd/.png/.tga/.dds) і звіт позначає:
+ - empty   — файл нульового розміру;
+ - broken  — заголовок не розпізнано;
+ - missing — PSD без жодного експорту (або без потрібних форматів, див. --require);
+ - stale   — PSD новіший за експорт;
+ - size    — розміри експорту не збігаються з PSD.
+Файли читаються паралельно в пулі потоків. Маніфест (JSON) водночас є кешем: файл з тими самими
+розміром і mtime не перечитується, тож повторний запуск — лише stat теки.
+
+Використання:
+  python texture_manifest.py [ssr_texture_prjs] [-o texture_manifest.json] [--require tga,png]
+                             [--threads 8] [--rehash]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FOLDER = os.path.join(SCRIPT_DIR, "ssr_texture_prjs")
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIR, "texture_manifest.json")
+MANIFEST_VERSION = 1
+TEXTURE_EXTS = (".psd", ".tga", ".dds", ".png")
+EXPORT_KINDS = ("tga", "dds", "png")
+HEADER_BYTES = 256
+HASH_CHUNK = 1 << 20
+THREADS = 8
+
+
+# ---------------- Заголовки ----------------
+class TextureHeader(NamedTuple):
+    width: int
+    height: int
+    channels: int
+    pixel_format: str
+    mips: int
+
+
+class HeaderError(ValueError):
+    pass
+
+
+PSD_COLOR_MODES = {0: "Bitmap", 1: "Grayscale", 2: "Indexed", 3: "RGB", 4: "CMYK", 7: "Multichannel",
+                   8: "Duotone", 9: "Lab"}
+TGA_IMAGE_TYPES = {1: "ColorMapped", 2: "TrueColor", 3: "Grayscale", 9: "ColorMapped-RLE",
+                   10: "TrueColor-RLE", 11: "Grayscale-RLE"}
+PNG_COLOR_TYPES = {0: ("Gray", 1), 2: ("RGB", 3), 3: ("Indexed", 1), 4: ("GrayAlpha", 2), 6: ("RGBA", 4)}
+# Канали за FourCC (старий заголовок DDS) і за DXGI_FORMAT (розширений заголовок DX10)
+DDS_FOURCC_CHANNELS = {"DXT1": 3, "DXT2": 4, "DXT3": 4, "DXT4": 4, "DXT5": 4, "ATI1": 1, "BC4U": 1, "BC4S": 1,
+                       "ATI2": 2, "BC5U": 2, "BC5S": 2}
+DXGI_FORMATS = {
+    2: ("R32G32B32A32_FLOAT", 4), 10: ("R16G16B16A16_FLOAT", 4), 28: ("R8G8B8A8_UNORM", 4),
+    29: ("R8G8B8A8_UNORM_SRGB", 4), 61: ("R8_UNORM", 1), 71: ("BC1_UNORM", 4), 72: ("BC1_UNORM_SRGB", 4),
+    74: ("BC2_UNORM", 4), 77: ("BC3_UNORM", 4), 78: ("BC3_UNORM_SRGB", 4), 80: ("BC4_UNORM", 1),
+    83: ("BC5_UNORM", 2), 87: ("B8G8R8A8_UNORM", 4), 91: ("B8G8R8A8_UNORM_SRGB", 4), 95: ("BC6H_UF16", 3),
+    98: ("BC7_UNORM", 4), 99: ("BC7_UNORM_SRGB", 4),
+}
+DDSD_MIPMAPCOUNT = 0x20000
+DDPF_ALPHAPIXELS = 0x1
+DDPF_FOURCC = 0x4
+DDPF_RGB = 0x40
+DDPF_LUMINANCE = 0x20000
+
+
+def read_psd_header(head: bytes) -> TextureHeader:
+    # "8BPS", версія (1 — PSD, 2 — PSB), 6 зарезервованих байтів, канали, висота, ширина, біти, режим
+    if len(head) < 26 or head[:4] != b"8BPS":
+        raise HeaderError("немає сигнатури 8BPS")
+    version, channels, height, width, depth, mode = struct.unpack(">H6xHIIHH", head[4:26])
+    if version not in (1, 2):
+        raise HeaderError(f"невідома версія PSD {version}")
+    kind = "PSB" if version == 2 else "PSD"
+    return TextureHeader(width, height, channels, f"{PSD_COLOR_MODES.get(mode, f'mode{mode}')} {depth}-bit {kind}", 1)
+
+
+def read_tga_header(head: bytes) -> TextureHeader:
+    # 18 байтів: довжина ID, тип палітри, тип зображення, опис палітри (5), початок (4), ширина, висота, біти, дескриптор
+    if len(head) < 18:
+        raise HeaderError("заголовок TGA коротший за 18 байтів")
+    _, colormap_type, image_type = head[0], head[1], head[2]
+    width, height, depth, descriptor = struct.unpack("<HHBB", head[12:18])
+    if image_type not in TGA_IMAGE_TYPES or colormap_type not in (0, 1) or depth not in (8, 15, 16, 24, 32):
+        raise HeaderError(f"невідомий тип TGA {image_type} ({depth} біт)")
+    alpha_bits = descriptor & 0x0F
+    if image_type in (3, 11):
+        channels = 2 if alpha_bits else 1
+    elif image_type in (1, 9):
+        channels = 1
+    else:
+        channels = 4 if alpha_bits or depth == 32 else 3
+    return TextureHeader(width, height, channels, f"{TGA_IMAGE_TYPES[image_type]} {depth}-bit", 1)
+
+
+def read_dds_header(head: bytes) -> TextureHeader:
+    # "DDS ", DDS_HEADER (124 байти, формат пікселів зі зсуву 76), опційно DDS_HEADER_DXT10 (20 байтів)
+    if len(head) < 128 or head[:4] != b"DDS ":
+        raise HeaderError("немає сигнатури DDS")
+    size, flags, height, width, _, _, mips = struct.unpack("<7I", head[4:32])
+    if size != 124:
+        raise HeaderError(f"розмір заголовка DDS {size} замість 124")
+    pf_flags, fourcc, bit_count = struct.unpack("<I4sI", head[80:92])
+    mips = mips if flags & DDSD_MIPMAPCOUNT and mips else 1
+    if pf_flags & DDPF_FOURCC:
+        code = fourcc.decode("ascii", "replace")
+        if code == "DX10":
+            if len(head) < 148:
+                raise HeaderError("немає розширеного заголовка DX10")
+            dxgi = struct.unpack("<I", head[128:132])[0]
+            name, channels = DXGI_FORMATS.get(dxgi, (f"DXGI_{dxgi}", 4))
+            return TextureHeader(width, height, channels, name, mips)
+        return TextureHeader(width, height, DDS_FOURCC_CHANNELS.get(code, 4), code, mips)
+    alpha = 1 if pf_flags & DDPF_ALPHAPIXELS else 0
+    if pf_flags & DDPF_LUMINANCE:
+        return TextureHeader(width, height, 1 + alpha, f"L{bit_count}", mips)
+    if pf_flags & DDPF_RGB:
+        return TextureHeader(width, height, 3 + alpha, f"RGB{'A' if alpha else ''}{bit_count}", mips)
+    raise HeaderError(f"невідомий формат пікселів DDS (flags {pf_flags:#x})")
+
+
+def read_png_header(head: bytes) -> TextureHeader:
+    # сигнатура (8), далі перший чанк — IHDR: довжина, тип, ширина, висота, біти, тип кольору
+    if len(head) < 26 or head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR":
+        raise HeaderError("немає сигнатури PNG/IHDR")
+    width, height, depth, color_type = struct.unpack(">IIBB", head[16:26])
+    if color_type not in PNG_COLOR_TYPES:
+        raise HeaderError(f"невідомий тип кольору PNG {color_type}")
+    name, channels = PNG_COLOR_TYPES[color_type]
+    return TextureHeader(width, height, channels, f"{name} {depth}-bit", 1)
+
+
+HEADER_READERS = {"psd": read_psd_header, "tga": read_tga_header, "dds": read_dds_header, "png": read_png_header}
+
+
+# ---------------- Записи маніфесту ----------------
+class TextureEntry(NamedTuple):
+    name: str
+    kind: str
+    size: int
+    mtime_ns: int
+    digest: str
+    width: Optional[int]
+    height: Optional[int]
+    channels: Optional[int]
+    pixel_format: Optional[str]
+    mips: Optional[int]
+    error: Optional[str]
+
+
+def texture_kind(name: str) -> Optional[str]:
+    ext = os.path.splitext(name)[1].lower()
+    return ext[1:] if ext in TEXTURE_EXTS else None
+
+
+def content_digest(path: str) -> str:
+    """Хеш вмісту файлу (той самий, що в маніфесті), читання по HASH_CHUNK."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_texture(path: str, kind: str, stat: os.stat_result) -> TextureEntry:
+    """Заголовок і хеш вмісту одного файлу; читання потоком по HASH_CHUNK, пікселі не декодуються."""
+    name = os.path.basename(path)
+    h = hashlib.blake2b(digest_size=16)
+    head = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            if len(head) < HEADER_BYTES:
+                head += chunk[:HEADER_BYTES - len(head)]
+            h.update(chunk)
+    header, error = None, None
+    if not head:
+        error = "порожній файл"
+    else:
+        try:
+            header = HEADER_READERS[kind](head)
+        except (HeaderError, struct.error) as e:
+            error = str(e)
+    values = header if header is not None else (None,) * len(TextureHeader._fields)
+    return TextureEntry(name, kind, stat.st_size, stat.st_mtime_ns, h.hexdigest(), *values, error)
+
+
+def load_manifest(path: str, folder: str) -> Dict[str, TextureEntry]:
+    """Записи попереднього маніфесту folder за іменем файлу; порожньо, якщо його немає, версія чи тека інші."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION or data.get("folder") != folder:
+        return {}
+    try:
+        return {entry["name"]: TextureEntry(**entry) for entry in data.get("files", ())}
+    except TypeError:
+        return {}
+
+
+def save_manifest(path: str, folder: str, entries: Iterable[TextureEntry], issues: List[Tuple[str, str, str]]):
+    data = {
+        "version": MANIFEST_VERSION,
+        "folder": folder,
+        "files": [entry._asdict() for entry in entries],
+        "issues": [{"name": name, "flag": flag, "detail": detail} for name, flag, detail in issues],
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def build_texture_manifest(folder: str, previous: Optional[Dict[str, TextureEntry]] = None,
+                           threads: int = THREADS) -> Tuple[List[TextureEntry], int]:
+    """
+    Записи всіх текстур теки (за іменем без урахування регістру) і кількість перечитаних файлів.
+    Запис з previous з тими самими size і mtime_ns береться без читання файлу.
+    """
+    previous = previous or {}
+    entries: Dict[str, TextureEntry] = {}
+    stale: List[Tuple[str, str, os.stat_result]] = []
+    with os.scandir(folder) as it:
+        for dir_entry in it:
+            kind = texture_kind(dir_entry.name)
+            if kind is None or not dir_entry.is_file():
+                continue
+            stat = dir_entry.stat()
+            old = previous.get(dir_entry.name)
+            if old is not None and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                entries[dir_entry.name] = old
+            else:
+                stale.append((dir_entry.path, kind, stat))
+    if stale:
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+            # hashlib і читання файлів відпускають GIL — потоків досить
+            for entry in pool.map(lambda item: scan_texture(*item), stale):
+                entries[entry.name] = entry
+    return sorted(entries.values(), key=lambda entry: entry.name.lower()), len(stale)
+
+
+# ---------------- Перевірки ----------------
+def group_by_stem(entries: Iterable[TextureEntry]) -> Dict[str, Dict[str, TextureEntry]]:
+    """{стовбур імені (без регістру): {вид: запис}}; порядок — як у entries."""
+    groups: Dict[str, Dict[str, TextureEntry]] = {}
+    for entry in entries:
+        stem = os.path.splitext(entry.name)[0].lower()
+        groups.setdefault(stem, {})[entry.kind] = entry
+    return groups
+
+
+def find_issues(entries: List[TextureEntry], require: Tuple[str, ...] = ()) -> List[Tuple[str, str, str]]:
+    """
+    (ім'я, прапорець, деталі) для порожніх і нерозпізнаних файлів, PSD без експортів (або без форматів
+    require), експортів, старших за PSD, і експортів з іншими розмірами.
+    """
+    issues = []
+    for entry in entries:
+        if entry.size == 0:
+            issues.append((entry.name, "empty", "файл нульового розміру"))
+        elif entry.error is not None:
+            issues.append((entry.name, "broken", entry.error))
+    for stem, group in group_by_stem(entries).items():
+        source = group.get("psd")
+        if source is None:
+            continue
+        exports = [group[kind] for kind in EXPORT_KINDS if kind in group]
+        if not exports and not require:
+            issues.append((source.name, "missing", "немає жодного експорту (tga/dds/png)"))
+        for kind in require:
+            if kind not in group:
+                issues.append((source.name, "missing", f"немає {os.path.splitext(source.name)[0]}.{kind}"))
+        for export in exports:
+            if export.size == 0:
+                continue
+            if export.mtime_ns < source.mtime_ns:
+                issues.append((export.name, "stale", f"{source.name} змінено пізніше"))
+            if (source.width is not None and export.width is not None
+                    and (export.width, export.height) != (source.width, source.height)):
+                issues.append((export.name, "size", f"{export.width}x{export.height}, у PSD "
+                                                    f"{source.width}x{source.height}"))
+    return issues
+
+
+def print_report(entries: List[TextureEntry], issues: List[Tuple[str, str, str]], rescanned: int, elapsed: float):
+    print(f"{'Файл':<48} {'Розмір':>10} {'Ш x В':>11} {'Кан.':>4} {'Мипи':>4}  Формат")
+    for entry in entries:
+        dims = f"{entry.width}x{entry.height}" if entry.width is not None else "—"
+        print(f"{entry.name:<48} {entry.size:>10} {dims:>11} {entry.channels or '—':>4} {entry.mips or '—':>4}  "
+              f"{entry.pixel_format or entry.error}")
+    print(f"\nФайлів: {len(entries)}; перечитано {rescanned}, з маніфесту {len(entries) - rescanned}; "
+          f"час: {elapsed:.2f} с")
+    if not issues:
+        print("Проблем не знайдено.")
+        return
+    counts: Dict[str, int] = {}
+    for _, flag, _ in issues:
+        counts[flag] = counts.get(flag, 0) + 1
+    print("Проблеми: " + ", ".join(f"{flag} {n}" for flag, n in sorted(counts.items())))
+    for name, flag, detail in issues:
+        print(f"  [{flag}] {name}: {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Маніфест PSD/TGA/DDS/PNG: заголовки, хеші, застарілі й порожні експорти.")
+    parser.add_argument("folder", nargs="?", default=DEFAULT_FOLDER, help="Тека з текстурними проєктами")
+    parser.add_argument("-o", "--out", default=DEFAULT_MANIFEST, help="JSON-маніфест (він же кеш для повторних запусків)")
+    parser.add_argument("--require", default="",
+                        help="Формати, обов'язкові для кожного PSD, через кому (напр. tga,png); типово — будь-який експорт")
+    parser.add_argument("--threads", type=int, default=THREADS, help="Кількість потоків читання")
+    parser.add_argument("--rehash", action="store_true", help="Перечитати всі файли, не довіряючи маніфесту")
+    args = parser.parse_args()
+    require = tuple(kind.strip().lower() for kind in args.require.split(",") if kind.strip())
+    for kind in require:
+        if kind not in EXPORT_KINDS:
+            parser.error(f"невідомий формат експорту {kind!r} (доступні: {', '.join(EXPORT_KINDS)})")
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"ERROR: Теку не знайдено: {folder}", file=sys.stderr)
+        sys.exit(2)
+
+    started = time.perf_counter()
+    previous = {} if args.rehash else load_manifest(args.out, folder)
+    entries, rescanned = build_texture_manifest(folder, previous, args.threads)
+    issues = find_issues(entries, require)
+    save_manifest(args.out, folder, entries, issues)
+    print_report(entries, issues, rescanned, time.perf_counter() - started)
+    print(f"Маніфест: {os.path.abspath(args.out)}")
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())